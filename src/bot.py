@@ -25,6 +25,7 @@ from src.handlers.watering.water import regar_handler
 from src.handlers.watering.consult_watering import consultar_riego_handler
 from src.handlers.watering.change_watering import cambiar_riego_handler
 from src.handlers.watering.change_frequency import cambiar_frecuencia_handler
+from src.handlers.watering.upcoming_watering import proximos_riegos_handler
 
 # Horas
 from src.handlers.hours.register_hours_today import register_hours_today_handler
@@ -32,8 +33,52 @@ from src.handlers.hours.register_hours_with_date import registrar_horas_con_fech
 from src.handlers.hours.hours_summary import horas_cumplidas_handler
 from src.handlers.hours.delete_hours import eliminar_horas_handler
 
+# Administración
+from src.handlers.admin import perfil_handler, memoria_handler, contador_perfil_handler, GRUPO_CONTADOR_PERFIL
+
 from src.handlers.reminder import revisar_riegos
-from src.utils.storage import cargar_datos
+from src.utils.storage import cargar_datos, vaciar_guardados, cerrar_almacenamiento
+from src.utils.locks import ProcesadorPorUsuario
+from src.utils.scheduler import agenda_riegos, indice_vencimientos
+from src.utils.leader import lider, es_lider
+from src.utils.metrics import bot_metrics, volcar_metricas
+from src.utils.latency import SolicitudMedida
+from src.utils.exporter import exportador, iniciar_exportador
+import logging
+
+logger = logging.getLogger('plantas_bot')
+
+async def al_detener(app):
+    """Escribe los guardados pendientes antes de salir"""
+    await exportador.detener()
+    if Config.LEADER_ELECTION and not es_lider():
+        # Otra instancia tomó el liderazgo: sus datos mandan
+        logger.warning("Liderazgo perdido: se descartan los guardados pendientes")
+        return
+    await vaciar_guardados()
+    cerrar_almacenamiento()
+    bot_metrics.flush()
+    lider.soltar()
+
+async def renovar_liderazgo(context):
+    """Latido del líder. Si otra instancia tomó el arrendamiento, se detiene"""
+    if not lider.renovar():
+        logger.error(f"Liderazgo perdido frente a {lider.lider_actual}; deteniendo esta instancia")
+        context.application.stop_running()
+
+async def registrar_error(update, context):
+    """Errores que ningún handler atendió (también los de los jobs): se
+    anotan en el log y en las métricas de errores"""
+    usuario = getattr(update, 'effective_user', None)
+    texto = getattr(getattr(update, 'effective_message', None), 'text', None) or ''
+    if update is None:
+        comando = "job"
+    elif texto.startswith('/'):
+        comando = texto.split()[0][1:].split('@')[0]
+    else:
+        comando = "mensaje"
+    logger.error(f"Error no controlado en {comando}: {context.error}")
+    bot_metrics.record_error(usuario.id if usuario else None, comando, str(context.error))
 
 def run_bot():
     """Función principal mejorada para ejecutar el bot"""
@@ -46,12 +91,31 @@ def run_bot():
         Config.validate()
         logger.info("Configuración validada correctamente")
         
+        if Config.LEADER_ELECTION:
+            # En reserva hasta que no haya otra instancia activa
+            logger.info(f"Esperando el liderazgo ({lider.ruta})")
+            lider.esperar()
+            logger.info(f"Instancia líder: {lider.identificador}")
+            # Las métricas se leyeron al importar, quizá antes de que el líder
+            # anterior escribiera las suyas. Los datos, los avisos y la bandeja
+            # de salida se leen a partir de aquí
+            bot_metrics.recargar()
+
         # Cargar datos persistentes
         cargar_datos()
         logger.info("Datos cargados desde archivos JSON")
+        agenda_riegos.reconstruir()
+        indice_vencimientos.reconstruir()
+        logger.info(f"Agenda de riegos con {len(agenda_riegos)} plantas")
         
         # Crear aplicación del bot
-        app = ApplicationBuilder().token(Config.BOT_TOKEN).build()
+        # SolicitudMedida cuenta el tiempo de las respuestas en la latencia de cada comando
+        builder = ApplicationBuilder().token(Config.BOT_TOKEN).request(SolicitudMedida())
+        builder = builder.post_init(iniciar_exportador).post_shutdown(al_detener)
+        if Config.CONCURRENT_UPDATES > 1:
+            # Usuarios distintos en paralelo; cada usuario, en orden
+            builder = builder.concurrent_updates(ProcesadorPorUsuario(Config.CONCURRENT_UPDATES))
+        app = builder.build()
         
         # Registrar todos los handlers
         handlers = [
@@ -62,19 +126,34 @@ def run_bot():
             medir_handler, estatura_handler, eliminar_medida_handler,
             # Riego
             regar_handler, consultar_riego_handler, cambiar_riego_handler,
-            cambiar_frecuencia_handler,
+            cambiar_frecuencia_handler, proximos_riegos_handler,
             # Horas
             register_hours_today_handler, registrar_horas_con_fecha_handler,
-            horas_cumplidas_handler, eliminar_horas_handler
+            horas_cumplidas_handler, eliminar_horas_handler,
+            # Administración
+            perfil_handler, memoria_handler
         ]
         
         for handler in handlers:
             app.add_handler(handler)
         
+        app.add_error_handler(registrar_error)
+
+        # Después de los comandos: cuenta las actualizaciones de /perfil
+        app.add_handler(contador_perfil_handler, group=GRUPO_CONTADOR_PERFIL)
+        
         logger.info(f"Registrados {len(handlers)} handlers")
         
         # Agregar job de recordatorio de riego (cada minuto)
         app.job_queue.run_repeating(revisar_riegos, interval=60, first=10)
+        if Config.METRICS_FLUSH_S > 0:
+            app.job_queue.run_repeating(
+                volcar_metricas, interval=Config.METRICS_FLUSH_S, first=Config.METRICS_FLUSH_S
+            )
+        if Config.LEADER_ELECTION:
+            app.job_queue.run_repeating(
+                renovar_liderazgo, interval=Config.LEADER_HEARTBEAT_S, first=Config.LEADER_HEARTBEAT_S
+            )
         
         logger.info("Bot iniciado correctamente")
         print("🤖 Bot Plantas-SC está funcionando...")
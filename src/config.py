@@ -7,7 +7,67 @@ class Config:
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     TOTAL_HORAS_SERVICIO = int(os.getenv('TOTAL_HORAS_SERVICIO', '120'))
     DATA_DIR = os.getenv('DATA_DIR', 'data')
-    
+
+    # Persistencia: backend ('json', 'sqlite' o 'shards') y archivo de la base SQLite
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json')
+    SQLITE_FILE = os.getenv('SQLITE_FILE', 'plantas.db')
+
+    # Backend 'shards': usuarios que se mantienen en memoria como máximo
+    SHARD_CACHE_USERS = int(os.getenv('SHARD_CACHE_USERS', '1000'))
+
+    # Diario de mutaciones (backend JSON) y tamaño a partir del cual se compacta
+    STORAGE_JOURNAL = os.getenv('STORAGE_JOURNAL', 'false').lower() == 'true'
+    JOURNAL_MAX_BYTES = int(os.getenv('JOURNAL_MAX_BYTES', str(1024 * 1024)))
+    # fsync de cada anexado al diario (desactivarlo es más rápido pero un corte de luz puede perder cambios)
+    JOURNAL_FSYNC = os.getenv('JOURNAL_FSYNC', 'true').lower() == 'true'
+
+    # Serializador de los archivos de datos: 'auto' (orjson si está instalado), 'orjson' o 'json'
+    STORAGE_SERIALIZER = os.getenv('STORAGE_SERIALIZER', 'auto')
+
+    # Caché binaria de arranque (backend JSON) junto a los archivos de datos.
+    # Usa pickle: solo debe activarse si nadie más que el bot puede escribir en DATA_DIR
+    STARTUP_CACHE = os.getenv('STARTUP_CACHE', 'false').lower() == 'true'
+
+    # Actualizaciones atendidas en paralelo (las de un mismo usuario van en orden); 1 = secuencial
+    CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '1'))
+
+    # Envío de recordatorios: envíos simultáneos y límites de la Bot API (mensajes por segundo)
+    REMINDER_CONCURRENCY = int(os.getenv('REMINDER_CONCURRENCY', '8'))
+    REMINDER_RATE_GLOBAL = float(os.getenv('REMINDER_RATE_GLOBAL', '30'))
+    REMINDER_RATE_CHAT = float(os.getenv('REMINDER_RATE_CHAT', '1'))
+    REMINDER_MAX_RETRIES = int(os.getenv('REMINDER_MAX_RETRIES', '3'))
+
+    # Bandeja de salida de recordatorios: intentos antes de descartar y espera base (se duplica en cada fallo)
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '6'))
+    OUTBOX_BACKOFF_S = float(os.getenv('OUTBOX_BACKOFF_S', '60'))
+
+    # Varias instancias: elección de líder con un archivo de arrendamiento (segundos de validez y de latido)
+    LEADER_ELECTION = os.getenv('LEADER_ELECTION', 'false').lower() == 'true'
+    LEADER_LEASE_S = float(os.getenv('LEADER_LEASE_S', '30'))
+    LEADER_HEARTBEAT_S = float(os.getenv('LEADER_HEARTBEAT_S', '10'))
+
+    # Métricas: segundos entre volcados de data/metrics.json (0 = escribir en cada comando)
+    METRICS_FLUSH_S = float(os.getenv('METRICS_FLUSH_S', '60'))
+    # Conteo de usuarios distintos: 'exact' (sets por día) o 'hll' (HyperLogLog, memoria fija)
+    METRICS_UNIQUE_MODE = os.getenv('METRICS_UNIQUE_MODE', 'exact')
+    # Errores recientes en memoria; los anteriores van a data/errores/ (un .jsonl.gz por día).
+    # Con 0 cada error se archiva directamente
+    METRICS_ERROR_BUFFER = int(os.getenv('METRICS_ERROR_BUFFER', '200'))
+    METRICS_ERROR_RETENTION_DAYS = int(os.getenv('METRICS_ERROR_RETENTION_DAYS', '30'))
+
+    # Endpoint /metrics para Prometheus en HTTP local (puerto 0 = desactivado)
+    METRICS_HTTP_PORT = int(os.getenv('METRICS_HTTP_PORT', '0'))
+    METRICS_HTTP_HOST = os.getenv('METRICS_HTTP_HOST', '127.0.0.1')
+
+    # Depuración: comprobar las estadísticas incrementales con un recuento completo en cada consulta
+    STATS_VERIFY = os.getenv('STATS_VERIFY', 'false').lower() == 'true'
+
+    # Administradores (ids de Telegram separados por comas) que pueden usar /perfil y /memoria
+    ADMIN_IDS = {int(i) for i in os.getenv('ADMIN_IDS', '').split(',') if i.strip()}
+
+    # Guardado diferido: ventana en milisegundos para agrupar escrituras (0 = inmediato)
+    SAVE_DELAY_MS = int(os.getenv('SAVE_DELAY_MS', '0'))
+
     @classmethod
     def validate(cls):
         if not cls.BOT_TOKEN:
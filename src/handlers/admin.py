@@ -0,0 +1,104 @@
+import io
+from telegram import Update
+from telegram.ext import CommandHandler, ContextTypes, TypeHandler
+from src.utils.decorators import admin_only, handle_errors
+from src.utils.metrics import bot_metrics
+from src.utils import profiling
+from src.utils.profiling import iniciar_perfil, monitor_memoria, terminar_perfil
+from src.utils.storage import obtener_estadisticas
+from src.utils.validators import CommandValidator, ValidationError
+import logging
+
+logger = logging.getLogger('plantas_bot')
+
+# Grupo posterior al de los comandos: cuenta cada actualización ya atendida
+GRUPO_CONTADOR_PERFIL = 1
+
+async def _enviar_informe(bot, chat_id, texto, nombre, titulo):
+    """Envía un informe largo como documento de texto"""
+    documento = io.BytesIO(texto.encode('utf-8'))
+    await bot.send_document(chat_id, document=documento, filename=nombre, caption=titulo)
+
+async def _entregar_perfil(bot):
+    resultado = terminar_perfil()
+    if resultado is None:
+        return
+    perfil, informe = resultado
+    logger.info(f"Perfil terminado tras {perfil.actualizaciones} actualización(es)")
+    await _enviar_informe(bot, perfil.chat_id, informe, "perfil.txt", "📊 Perfil de CPU")
+
+@handle_errors
+@admin_only
+async def perfil(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Perfila con cProfile las próximas N actualizaciones o N segundos"""
+    if context.args and context.args[0].lower() == 'parar':
+        if profiling.perfil_actual is None:
+            await update.message.reply_text("ℹ️ No hay ningún perfil en curso.")
+        else:
+            await _entregar_perfil(context.bot)
+        return
+
+    try:
+        tipo, cantidad = CommandValidator.validate_profile_args(context.args)
+    except ValidationError as e:
+        await update.message.reply_text(f"❌ {str(e)}")
+        return
+
+    if iniciar_perfil(tipo, cantidad, update.effective_chat.id, update.update_id) is None:
+        await update.message.reply_text("❌ Ya hay un perfil en curso. Usa /perfil parar para terminarlo.")
+        return
+
+    # Un cierre programado de un perfil anterior no debe cortar este
+    for job in context.job_queue.get_jobs_by_name("perfil"):
+        job.schedule_removal()
+    if tipo == 'segundos':
+        context.job_queue.run_once(terminar_perfil_programado, cantidad, name="perfil")
+    logger.info(f"Perfil iniciado por {update.effective_user.id}: {cantidad} {tipo}")
+    await update.message.reply_text(
+        f"⏱️ Perfilando las próximas {cantidad} {tipo}. Recibirás el informe al terminar."
+    )
+
+async def terminar_perfil_programado(context: ContextTypes.DEFAULT_TYPE):
+    """Job que cierra un perfil por tiempo"""
+    await _entregar_perfil(context.bot)
+
+async def contar_actualizacion(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Cuenta las actualizaciones atendidas mientras hay un perfil en curso"""
+    if profiling.perfil_actual is not None and profiling.perfil_actual.contar(update.update_id):
+        await _entregar_perfil(context.bot)
+
+def estructuras_en_memoria():
+    """Elementos de las estructuras principales de storage y metrics"""
+    estructuras = {f"storage.{clave}": valor for clave, valor in obtener_estadisticas().items()}
+    for clave, valor in bot_metrics.metrics.items():
+        if hasattr(valor, '__len__'):
+            estructuras[f"metrics.{clave}"] = len(valor)
+    estructuras["metrics.sketches"] = sum(
+        len(v) for k, v in bot_metrics.sketches.items() if k != "total"
+    )
+    return estructuras
+
+@handle_errors
+@admin_only
+async def memoria(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Instantánea de memoria con tracemalloc comparada con la anterior"""
+    if context.args and context.args[0].lower() == 'parar':
+        monitor_memoria.detener()
+        await update.message.reply_text("🛑 Seguimiento de memoria detenido.")
+        return
+
+    if not monitor_memoria.activo:
+        monitor_memoria.iniciar(estructuras_en_memoria())
+        await update.message.reply_text(
+            "🧠 Seguimiento de memoria iniciado. Vuelve a usar /memoria para ver qué creció "
+            "y /memoria parar para detenerlo (tracemalloc ralentiza el bot mientras está activo)."
+        )
+        return
+
+    informe = monitor_memoria.comparar(estructuras_en_memoria())
+    await _enviar_informe(context.bot, update.effective_chat.id, informe,
+                          "memoria.txt", "🧠 Crecimiento de memoria")
+
+perfil_handler = CommandHandler("perfil", perfil)
+memoria_handler = CommandHandler("memoria", memoria)
+contador_perfil_handler = TypeHandler(Update, contar_actualizacion)
@@ -20,6 +20,7 @@ HELP_SECTIONS = {
         "   /consultarRiego <nombre> - Consultar frecuencia y último riego de una planta\n"
         "   /cambiarRiego <nombre> <YYYY-MM-DD> - Cambiar la fecha del último riego\n"
         "   /cambiarFrecuencia <nombre> <días> - Cambiar la frecuencia de riego\n"
+        "   /proximosRiegos [días] - Ver riegos atrasados y de los próximos días\n"
     ),
     "4": (
         "🕒 *Seguimiento de horas de Servicio Comunitario* 🕒\n"
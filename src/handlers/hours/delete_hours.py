@@ -3,7 +3,8 @@ from telegram.ext import CommandHandler, ContextTypes
 from datetime import datetime
 from src.utils.decorators import handle_errors
 from src.utils.validators import CommandValidator, ValidationError
-from src.utils.storage import horas_por_usuario, guardar_datos, TOTAL_HORAS
+from src.utils import repository
+from src.utils.storage import TOTAL_HORAS
 
 @handle_errors
 async def eliminar_horas(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -26,24 +27,16 @@ async def eliminar_horas(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❗ {str(e)}")
         return
 
-    registros = horas_por_usuario.get(user_id, [])
-    for registro in registros:
-        if registro["fecha"] == fecha:
-            if registro["horas"] <= horas:
-                registros.remove(registro)
-            else:
-                registro["horas"] -= horas
-            guardar_datos()
-            break
-    else:
+    if not repository.restar_horas(user_id, fecha, horas):
         await update.message.reply_text("No hay horas registradas para esa fecha.")
         return
 
-    total = sum(r["horas"] for r in registros)
+    registros = repository.obtener_horas(user_id)
+    total = repository.total_horas(user_id)
     faltan = max(0, TOTAL_HORAS - total)
     resumen = "🕒 Horas cumplidas:\n"
-    for r in sorted(registros, key=lambda x: x["fecha"]):
-        resumen += f"{r['fecha']}: {r['horas']} horas\n"
+    for r in sorted(registros, key=lambda x: x.fecha):
+        resumen += f"{r.fecha}: {r.horas} horas\n"
     resumen += f"\nTotal: {total} horas\n"
     if faltan == 0 or total >= TOTAL_HORAS:
         resumen += "🎉 ¡Has culminado el Servicio Comunitario!"
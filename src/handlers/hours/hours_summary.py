@@ -1,19 +1,23 @@
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
-from src.utils.storage import horas_por_usuario, TOTAL_HORAS
+from src.utils import repository
+from src.utils.decorators import handle_errors, track_usage
+from src.utils.storage import TOTAL_HORAS
 
+@handle_errors
+@track_usage("horasCumplidas")
 async def horas_cumplidas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    registros = horas_por_usuario.get(user_id, [])
+    registros = repository.obtener_horas(user_id)
     if not registros:
         await update.message.reply_text("Aún no has registrado horas.")
         return
 
-    total = sum(r["horas"] for r in registros)
+    total = repository.total_horas(user_id)
     faltan = max(0, TOTAL_HORAS - total)
     resumen = "🕒 Horas cumplidas:\n"
-    for r in sorted(registros, key=lambda x: x["fecha"]):
-        resumen += f"{r['fecha']}: {r['horas']} horas\n"
+    for r in sorted(registros, key=lambda x: x.fecha):
+        resumen += f"{r.fecha}: {r.horas} horas\n"
     resumen += f"\nTotal: {total} horas\n"
     if faltan == 0 or total >= TOTAL_HORAS:
         resumen += "🎉 ¡Has culminado el Servicio Comunitario!"
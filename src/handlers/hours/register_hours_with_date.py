@@ -3,7 +3,8 @@ from telegram.ext import CommandHandler, ContextTypes
 from datetime import datetime
 from src.utils.decorators import handle_errors
 from src.utils.validators import CommandValidator, ValidationError
-from src.utils.storage import horas_por_usuario, guardar_datos, TOTAL_HORAS
+from src.utils import repository
+from src.utils.storage import TOTAL_HORAS
 import logging
 
 logger = logging.getLogger('plantas_bot')
@@ -29,21 +30,14 @@ async def registrar_horas_con_fecha(update: Update, context: ContextTypes.DEFAUL
         await update.message.reply_text(f"❗ {str(e)}")
         return
 
-    horas_por_usuario.setdefault(user_id, [])
-    for registro in horas_por_usuario[user_id]:
-        if registro["fecha"] == fecha:
-            registro["horas"] += horas
-            break
-    else:
-        horas_por_usuario[user_id].append({"fecha": fecha, "horas": horas})
-    guardar_datos()
+    repository.sumar_horas(user_id, fecha, horas)
 
-    total = sum(r["horas"] for r in horas_por_usuario[user_id])
+    total = repository.total_horas(user_id)
     faltan = max(0, TOTAL_HORAS - total)
     if faltan == 0 or total >= TOTAL_HORAS:
         msg = f"🎉 ¡Has culminado el Servicio Comunitario!\n\nResumen:\n"
-        for r in sorted(horas_por_usuario[user_id], key=lambda x: x["fecha"]):
-            msg += f"{r['fecha']}: {r['horas']} horas\n"
+        for r in sorted(repository.obtener_horas(user_id), key=lambda x: x.fecha):
+            msg += f"{r.fecha}: {r.horas} horas\n"
         msg += f"\nTotal: {total} horas"
     else:
         msg = f"✅ Registradas {horas} horas para {fecha}.\nTe faltan {faltan} horas para culminar el Servicio Comunitario."
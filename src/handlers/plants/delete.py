@@ -1,6 +1,6 @@
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
-from src.utils.storage import plantas_por_usuario, medidas_por_usuario, riego_por_usuario, guardar_datos
+from src.utils import repository
 from src.utils.validators import CommandValidator, ValidationError
 from src.utils.decorators import handle_errors, track_usage
 import logging
@@ -19,7 +19,7 @@ async def eliminar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         plant_name = CommandValidator.validate_delete_command_args(context.args)
         
         # Validar que el usuario tenga plantas
-        user_plants = plantas_por_usuario.get(user_id, [])
+        user_plants = repository.nombres_plantas(user_id)
         valid_plants = CommandValidator.validate_user_has_plants(user_plants)
         
         # Validar que la planta exista
@@ -29,33 +29,10 @@ async def eliminar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         bulk_info = CommandValidator.validate_bulk_deletion(plant_name, valid_plants)
         
         # Validar impacto de la eliminación
-        related_data = {
-            'measurements': medidas_por_usuario,
-            'watering': riego_por_usuario
-        }
-        impact = CommandValidator.validate_deletion_impact(plant_to_delete, user_id, related_data)
+        impact = repository.impacto_eliminacion(user_id, plant_to_delete)
         
-        # Proceder con la eliminación
-        plantas_antes = len(plantas_por_usuario[user_id])
-        
-        # Eliminar todas las ocurrencias del nombre de planta
-        plantas_por_usuario[user_id] = [p for p in plantas_por_usuario[user_id] if p.strip().lower() != plant_name.lower()]
-        
-        plantas_despues = len(plantas_por_usuario[user_id])
-        plantas_eliminadas = plantas_antes - plantas_despues
-        
-        # Limpiar datos relacionados si existen
-        if impact['has_related_data']:
-            # Limpiar medidas
-            if user_id in medidas_por_usuario and plant_to_delete in medidas_por_usuario[user_id]:
-                del medidas_por_usuario[user_id][plant_to_delete]
-            
-            # Limpiar registros de riego
-            if user_id in riego_por_usuario and plant_to_delete in riego_por_usuario[user_id]:
-                del riego_por_usuario[user_id][plant_to_delete]
-        
-        # Guardar cambios
-        guardar_datos()
+        # Eliminar todas las ocurrencias del nombre de planta con sus datos relacionados
+        plantas_eliminadas = repository.eliminar_planta(user_id, plant_name)
         
         # Preparar mensaje de confirmación
         if bulk_info['is_bulk']:
@@ -72,7 +49,7 @@ async def eliminar(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 mensaje += f"\n💧 {impact['watering_records']} registros de riego"
         
         # Añadir estadísticas finales
-        plantas_restantes = len(plantas_por_usuario[user_id])
+        plantas_restantes = len(repository.nombres_plantas(user_id))
         mensaje += f"\n\n🌱 Plantas restantes: {plantas_restantes}"
         
         if plantas_restantes == 0:
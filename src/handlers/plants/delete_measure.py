@@ -2,7 +2,7 @@ from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import (
     CommandHandler, MessageHandler, ConversationHandler, filters, ContextTypes
 )
-from src.utils.storage import plantas_por_usuario, medidas_por_usuario, guardar_datos
+from src.utils import repository
 from src.utils.validators import CommandValidator, ValidationError
 from src.utils.decorators import handle_errors, track_usage
 import logging
@@ -18,7 +18,7 @@ async def eliminar_medida_inicio(update: Update, context: ContextTypes.DEFAULT_T
     user_id = update.effective_user.id
 
     # Validar que el usuario tenga plantas registradas
-    plantas = plantas_por_usuario.get(user_id, [])
+    plantas = repository.nombres_plantas(user_id)
     plantas_validas = []
 
     # Solo incluir plantas que tengan al menos una medida registrada
@@ -27,8 +27,7 @@ async def eliminar_medida_inicio(update: Update, context: ContextTypes.DEFAULT_T
             planta_validada = CommandValidator.validate_plant_name(planta)
             if planta_validada.strip():
                 # Verifica que la planta tenga medidas
-                medidas = medidas_por_usuario.get(user_id, {}).get(planta_validada, [])
-                if medidas:
+                if repository.contar_medidas(user_id, planta_validada):
                     plantas_validas.append(planta_validada)
         except ValidationError:
             logger.warning(f"Planta inválida encontrada para usuario {user_id}: {planta}")
@@ -62,6 +61,7 @@ async def eliminar_medida_inicio(update: Update, context: ContextTypes.DEFAULT_T
     return ELEGIR_PLANTA
 
 @handle_errors
+@track_usage("eliminar_medida_planta")
 async def eliminar_medida_elegir_planta(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Procesa la selección de planta y muestra sus medidas"""
     user_id = update.effective_user.id
@@ -76,13 +76,7 @@ async def eliminar_medida_elegir_planta(update: Update, context: ContextTypes.DE
         planta_validada = CommandValidator.validate_plant_name(planta_input)
         
         # Verificar que la planta existe en la lista del usuario
-        plantas_usuario = plantas_por_usuario.get(user_id, [])
-        planta_encontrada = None
-        
-        for planta in plantas_usuario:
-            if planta.lower().strip() == planta_validada.lower().strip():
-                planta_encontrada = planta
-                break
+        planta_encontrada = repository.buscar_planta(user_id, planta_validada)
         
         if not planta_encontrada:
             await update.message.reply_text(
@@ -92,7 +86,7 @@ async def eliminar_medida_elegir_planta(update: Update, context: ContextTypes.DE
             return ELEGIR_PLANTA
         
         # Verificar que la planta tenga medidas
-        medidas = medidas_por_usuario.get(user_id, {}).get(planta_encontrada, [])
+        medidas = repository.obtener_medidas(user_id, planta_encontrada)
         
         if not medidas:
             await update.message.reply_text(
@@ -106,23 +100,12 @@ async def eliminar_medida_elegir_planta(update: Update, context: ContextTypes.DE
         medidas_validas = []
         for i, medida in enumerate(medidas):
             try:
-                # Si la medida es un diccionario (formato nuevo)
-                if isinstance(medida, dict):
-                    altura = medida.get('altura', 0)
-                    fecha = medida.get('fecha', 'Sin fecha')
-                    medidas_validas.append({
-                        'altura': float(altura),
-                        'fecha': fecha,
-                        'indice_original': i
-                    })
-                else:
-                    # Si la medida es un número (formato antiguo)
-                    altura_validada = CommandValidator.validate_measurement(str(medida))
-                    medidas_validas.append({
-                        'altura': altura_validada,
-                        'fecha': 'Sin fecha',
-                        'indice_original': i
-                    })
+                # Las medidas antiguas no tienen fecha
+                medidas_validas.append({
+                    'altura': float(medida.altura),
+                    'fecha': medida.fecha or 'Sin fecha',
+                    'indice_original': i
+                })
             except (ValidationError, ValueError, TypeError) as e:
                 logger.warning(f"Medida inválida encontrada para {planta_encontrada}: {medida}")
                 continue
@@ -175,6 +158,7 @@ async def eliminar_medida_elegir_planta(update: Update, context: ContextTypes.DE
         return ConversationHandler.END
 
 @handle_errors
+@track_usage("eliminar_medida_confirmar")
 async def eliminar_medida_confirmar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Confirma y elimina la medida seleccionada"""
     user_id = update.effective_user.id
@@ -218,16 +202,13 @@ async def eliminar_medida_confirmar(update: Update, context: ContextTypes.DEFAUL
         indice_original = medida_seleccionada['indice_original']
 
         # Eliminar la medida del almacenamiento
-        medidas_originales = medidas_por_usuario.get(user_id, {}).get(planta, [])
-        if indice_original >= len(medidas_originales):
+        if repository.eliminar_medida(user_id, planta, indice_original) is None:
             await update.message.reply_text(
                 "❌ Error: la medida ya no existe. El proceso se cancelará.",
                 reply_markup=ReplyKeyboardRemove()
             )
             return ConversationHandler.END
 
-        medida_eliminada = medidas_originales.pop(indice_original)
-        guardar_datos()
         context.user_data.clear()
 
         altura_eliminada = medida_seleccionada['altura']
@@ -235,7 +216,7 @@ async def eliminar_medida_confirmar(update: Update, context: ContextTypes.DEFAUL
         mensaje = f"✅ Medida eliminada exitosamente\n\n"
         mensaje += f"🌱 Planta: {planta}\n"
         mensaje += f"📏 Medida eliminada: {altura_eliminada} cm{fecha_info}\n\n"
-        mensaje += f"📊 Medidas restantes: {len(medidas_originales)}"
+        mensaje += f"📊 Medidas restantes: {repository.contar_medidas(user_id, planta)}"
 
         await update.message.reply_text(
             mensaje,
@@ -2,7 +2,7 @@ from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler
 from datetime import datetime
 from src.utils.validators import CommandValidator, ValidationError
-from src.utils.storage import plantas_por_usuario, medidas_por_usuario, guardar_datos
+from src.utils import repository
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,7 +16,7 @@ async def estatura_respuesta(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     try:
         # Verificar que el usuario tenga plantas registradas
-        plantas = plantas_por_usuario.get(user_id, [])
+        plantas = repository.nombres_plantas(user_id)
         if not plantas:
             await update.message.reply_text(
                 "🌱 No tienes plantas registradas.\n"
@@ -25,8 +25,7 @@ async def estatura_respuesta(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return
         
         # Verificar que haya medidas registradas
-        medidas_usuario = medidas_por_usuario.get(user_id, {})
-        if not medidas_usuario:
+        if not any(repository.contar_medidas(user_id, planta) for planta in plantas):
             await update.message.reply_text(
                 "📏 No tienes medidas registradas para ninguna planta.\n"
                 "Usa `/medir` para registrar medidas de tus plantas."
@@ -39,15 +38,14 @@ async def estatura_respuesta(update: Update, context: ContextTypes.DEFAULT_TYPE)
         for planta in plantas:
             if planta and planta.strip():  # Verificar que la planta no sea None o vacía
                 planta_limpia = planta.strip()
-                if planta_limpia in medidas_usuario and medidas_usuario[planta_limpia]:
+                ultima_medida = repository.ultima_medida(user_id, planta_limpia)
+                if ultima_medida:
                     plantas_con_medidas = True
-                    medidas = medidas_usuario[planta_limpia]
-                    ultima_medida = medidas[-1]  # Última medida registrada
                     
                     mensaje += f"🌱 {planta_limpia}:\n"
-                    mensaje += f"   📏 Altura actual: {ultima_medida['altura']} cm\n"
-                    mensaje += f"   📅 Última medición: {ultima_medida['fecha']}\n"
-                    mensaje += f"   📊 Total de medidas: {len(medidas)}\n\n"
+                    mensaje += f"   📏 Altura actual: {ultima_medida.altura} cm\n"
+                    mensaje += f"   📅 Última medición: {ultima_medida.fecha or 'Sin fecha'}\n"
+                    mensaje += f"   📊 Total de medidas: {repository.contar_medidas(user_id, planta_limpia)}\n\n"
         
         if not plantas_con_medidas:
             mensaje = "📏 La última estatura registrada:\n\n"
@@ -1,6 +1,6 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
-from src.utils.storage import plantas_por_usuario, guardar_datos
+from src.utils import repository
 from src.utils.validators import CommandValidator, ValidationError
 from src.utils.decorators import handle_errors, track_usage
 
@@ -24,25 +24,17 @@ async def registrar_planta(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Validar el nombre usando CommandValidator
         nombre_validado = CommandValidator.validate_plant_name(nombre_planta)
         
-        # Verificar si el usuario ya tiene plantas registradas
-        if user_id not in plantas_por_usuario:
-            plantas_por_usuario[user_id] = []
-        
-        # Verificar si la planta ya existe
-        if nombre_validado.lower() in [p.lower() for p in plantas_por_usuario[user_id]]:
+        # Registrar la planta si no existe ya
+        if repository.agregar_planta(user_id, nombre_validado) is None:
             await update.message.reply_text(
                 f"⚠️ Ya tienes una planta llamada '{nombre_validado}' registrada.\n"
                 "Usa `/verplantas` para ver todas tus plantas."
             )
             return
         
-        # Registrar la planta
-        plantas_por_usuario[user_id].append(nombre_validado)
-        guardar_datos()
-        
         await update.message.reply_text(
             f"🌱 ¡Planta '{nombre_validado}' registrada exitosamente!\n\n"
-            f"📋 Ahora tienes {len(plantas_por_usuario[user_id])} planta(s) registrada(s).\n"
+            f"📋 Ahora tienes {len(repository.nombres_plantas(user_id))} planta(s) registrada(s).\n"
             "Usa `/verplantas` para ver todas tus plantas."
         )
         
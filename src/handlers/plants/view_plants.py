@@ -1,10 +1,10 @@
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
-from src.utils.storage import plantas_por_usuario
+from src.utils import repository
 
 async def verplantas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    plantas = plantas_por_usuario.get(user_id, [])
+    plantas = repository.nombres_plantas(user_id)
     if not plantas:
         await update.message.reply_text("🌱 No tienes plantas registradas.")
         return
@@ -1,26 +1,94 @@
-from datetime import date, timedelta, datetime
-from src.utils.storage import riego_por_usuario, guardar_datos
+import logging
+from src.utils import repository
+from src.utils.delivery import enviar_mensaje, limitador_envios, repartir
+from src.utils.latency import cronometrar
+from src.utils.leader import es_lider
+from src.utils.metrics import bot_metrics
+from src.utils.outbox import clave_aviso, obtener_bandeja
+from src.utils.validators import ValidationError
+
+logger = logging.getLogger('plantas_bot')
+
+def _retraso(riego):
+    """Texto con los días de retraso del riego ('' si toca hoy)"""
+    try:
+        retraso = -riego.estado()['days_until_next']
+    except ValidationError:
+        return ""
+    return f" (atrasado {retraso} día(s))" if retraso > 0 else ""
+
+def mensaje_resumen(riegos):
+    """Un único mensaje con todas las plantas que toca regar"""
+    if len(riegos) == 1:
+        return f"🌱 Hoy toca regar '{riegos[0].planta}'!{_retraso(riegos[0])}"
+    lineas = [f"• {riego.planta}{_retraso(riego)}" for riego in riegos]
+    return f"🌱 Hoy toca regar {len(riegos)} plantas:\n" + "\n".join(lineas)
+
+def _fecha_aviso(user_id, planta):
+    """Fecha del aviso en texto (parte de su clave de idempotencia)"""
+    fecha = repository.fecha_recordatorio(user_id, planta)
+    return fecha.isoformat() if fecha else None
 
 async def revisar_riegos(context):
-    for user_id, plantas in riego_por_usuario.items():
-        for nombre_planta, datos in plantas.items():
-            frecuencia = datos.get("frecuencia")
-            ultimo_riego = datos.get("ultimo_riego")
-            if not frecuencia or not ultimo_riego:
-                continue
-            try:
-                fecha_ultimo = datetime.strptime(ultimo_riego, "%Y-%m-%d").date()
-            except Exception:
-                continue
-            proximo_riego = fecha_ultimo + timedelta(days=frecuencia)
-            if date.today() >= proximo_riego:
-                try:
-                    await context.bot.send_message(
-                        chat_id=user_id,
-                        text=f"🌱 Hoy toca regar '{nombre_planta}'!"
-                    )
-                    # Actualiza la fecha de último riego para evitar mensajes repetidos
-                    riego_por_usuario[user_id][nombre_planta]["ultimo_riego"] = date.today().isoformat()
-                    guardar_datos()
-                except Exception:
-                    continue
\ No newline at end of file
+    if not es_lider():
+        # Solo la instancia líder envía recordatorios
+        return
+    with cronometrar(lambda ns: bot_metrics.record_operation("revision_riegos", ns)):
+        await _revisar(context)
+
+async def _revisar(context):
+    """Encola los riegos vencidos y envía los avisos listos"""
+    bandeja = obtener_bandeja()
+    recordados = {}
+
+    # Solo los riegos vencidos según la agenda, no todas las plantas
+    for user_id, riego in repository.riegos_vencidos():
+        fecha = _fecha_aviso(user_id, riego.planta)
+        if not bandeja.encolar(user_id, riego.planta, fecha) and \
+                clave_aviso(user_id, riego.planta, fecha) in bandeja.enviados:
+            # Se avisó antes de un reinicio que no llegó a anotar el aviso
+            recordados.setdefault(user_id, []).append(riego.planta)
+
+    por_usuario = {}
+    for aviso in bandeja.listos():
+        clave = clave_aviso(aviso['user_id'], aviso['planta'], aviso['vence'])
+        riego = repository.obtener_riego(aviso['user_id'], aviso['planta'])
+        if riego is None or _fecha_aviso(aviso['user_id'], aviso['planta']) != aviso['vence']:
+            # Se regó, se cambió o se eliminó mientras esperaba
+            bandeja.cancelar(clave)
+            continue
+        por_usuario.setdefault(aviso['user_id'], []).append((clave, riego))
+
+    # Los avisos quedan en disco antes de enviarse
+    bandeja.guardar()
+    usuarios = list(por_usuario)
+    resultados = await repartir(
+        enviar_mensaje(context.bot, limitador_envios, user_id,
+                       mensaje_resumen([riego for _, riego in por_usuario[user_id]]))
+        for user_id in usuarios
+    )
+
+    fallidos = 0
+    for user_id, resultado in zip(usuarios, resultados):
+        for clave, riego in por_usuario[user_id]:
+            if not isinstance(resultado, Exception):
+                bandeja.confirmar(clave)
+                recordados.setdefault(user_id, []).append(riego.planta)
+            elif bandeja.fallar(clave, resultado):
+                logger.error(f"Recordatorio de '{riego.planta}' para {user_id} descartado: {resultado}")
+                bot_metrics.record_error(user_id, "recordatorio",
+                                         f"Recordatorio de '{riego.planta}' descartado: {resultado}")
+                # Ya salió de la agenda: sin esto no se volvería a recordar
+                repository.reprogramar_aviso(user_id, riego.planta)
+        if isinstance(resultado, Exception):
+            fallidos += 1
+            logger.warning(f"No se pudo enviar el recordatorio a {user_id}: {resultado}")
+    bandeja.purgar()
+    bandeja.guardar()
+
+    # Anota la fecha del aviso (no el riego) para no repetirlo hasta una
+    # frecuencia después, con una sola escritura para toda la revisión
+    repository.anotar_avisos(recordados)
+    if usuarios:
+        logger.info(f"Recordatorios de riego: {len(usuarios) - fallidos} usuarios avisados, "
+                    f"{fallidos} fallidos")
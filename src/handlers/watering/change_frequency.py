@@ -1,6 +1,6 @@
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
-from src.utils.storage import plantas_por_usuario, riego_por_usuario, guardar_datos
+from src.utils import repository
 from src.utils.validators import CommandValidator, ValidationError
 from src.utils.decorators import handle_errors, track_usage
 import logging
@@ -19,25 +19,19 @@ async def cambiar_frecuencia(update: Update, context: ContextTypes.DEFAULT_TYPE)
         plant_name, new_frequency = CommandValidator.validate_frequency_change_args(context.args)
         
         # Validar que la planta esté registrada
-        validated_plant = CommandValidator.validate_plant_is_registered(
-            plant_name, user_id, plantas_por_usuario
-        )
+        validated_plant = repository.exigir_planta(user_id, plant_name)
         
         # Validar que la planta tenga configuración de riego
-        watering_data = CommandValidator.validate_watering_exists(
-            validated_plant, user_id, riego_por_usuario
-        )
+        watering = repository.exigir_riego(user_id, validated_plant)
         
         # Obtener frecuencia anterior para comparación
-        old_frequency = watering_data["frecuencia"]
+        old_frequency = watering.frecuencia
         
         # Actualizar frecuencia
-        riego_por_usuario[user_id][validated_plant]["frecuencia"] = new_frequency
-        guardar_datos()
+        watering = repository.actualizar_riego(user_id, validated_plant, frecuencia=new_frequency)
         
         # Calcular nuevo estado de riego
-        updated_data = riego_por_usuario[user_id][validated_plant]
-        status_info = CommandValidator.calculate_watering_status(updated_data)
+        status_info = watering.estado()
         
         # Preparar mensaje de confirmación
         mensaje = f"✅ Frecuencia de riego actualizada\n\n"
@@ -1,8 +1,7 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
-from datetime import datetime, date
 from src.utils.validators import CommandValidator, ValidationError
-from src.utils.storage import riego_por_usuario, plantas_por_usuario, guardar_datos
+from src.utils import repository
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,16 +26,14 @@ async def cambiar_riego(update: Update, context: ContextTypes.DEFAULT_TYPE):
         validated_plant = CommandValidator.validate_plant_name(plant_name)
         
         # Validar que la planta esté registrada
-        validated_plant = CommandValidator.validate_plant_is_registered(
-            validated_plant, user_id, plantas_por_usuario
-        )
+        validated_plant = repository.exigir_planta(user_id, validated_plant)
         
         # Validar fecha
         validated_date = CommandValidator.validate_date(date_str)
         
         # Verificar que existe configuración de riego
-        if (user_id not in riego_por_usuario or 
-            validated_plant not in riego_por_usuario[user_id]):
+        watering = repository.obtener_riego(user_id, validated_plant)
+        if watering is None:
             await update.message.reply_text(
                 f"❌ No hay configuración de riego para '{validated_plant}'.\n"
                 f"Usa `/regar {validated_plant} <frecuencia>` para configurar el riego primero."
@@ -44,15 +41,12 @@ async def cambiar_riego(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         
         # Actualizar fecha de último riego
-        old_date = riego_por_usuario[user_id][validated_plant]["ultimo_riego"]
-        riego_por_usuario[user_id][validated_plant]["ultimo_riego"] = validated_date
-        
-        guardar_datos()
+        old_date = watering.ultimo_riego
+        watering = repository.actualizar_riego(user_id, validated_plant, ultimo_riego=validated_date)
         
         # Calcular próximo riego
-        frequency = riego_por_usuario[user_id][validated_plant]["frecuencia"]
-        next_date = datetime.strptime(validated_date, "%Y-%m-%d").date()
-        next_watering = next_date.replace(day=next_date.day + frequency)
+        frequency = watering.frecuencia
+        next_watering = watering.proximo_riego()
         
         mensaje = f"✅ Fecha de riego actualizada\n\n"
         mensaje += f"🌱 Planta: {validated_plant}\n"
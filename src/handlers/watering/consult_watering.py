@@ -1,6 +1,6 @@
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
-from src.utils.storage import plantas_por_usuario, riego_por_usuario
+from src.utils import repository
 from src.utils.validators import CommandValidator, ValidationError
 from src.utils.decorators import handle_errors, track_usage
 import logging
@@ -19,17 +19,13 @@ async def consultar_riego(update: Update, context: ContextTypes.DEFAULT_TYPE):
         plant_name = CommandValidator.validate_consult_watering_args(context.args)
         
         # Validar que la planta esté registrada
-        validated_plant = CommandValidator.validate_plant_is_registered(
-            plant_name, user_id, plantas_por_usuario
-        )
+        validated_plant = repository.exigir_planta(user_id, plant_name)
         
         # Validar que existan datos de riego
-        watering_data = CommandValidator.validate_watering_exists(
-            validated_plant, user_id, riego_por_usuario
-        )
+        watering = repository.exigir_riego(user_id, validated_plant)
         
         # Calcular estado de riego
-        status_info = CommandValidator.calculate_watering_status(watering_data)
+        status_info = watering.estado()
         
         # Preparar mensaje detallado
         mensaje = f"💧 Estado de riego de '{validated_plant}'\n\n"
@@ -0,0 +1,43 @@
+from datetime import date
+from telegram import Update
+from telegram.ext import CommandHandler, ContextTypes
+from src.utils import repository
+from src.utils.validators import CommandValidator, ValidationError
+from src.utils.decorators import handle_errors, track_usage
+import logging
+
+logger = logging.getLogger('plantas_bot')
+
+@handle_errors
+@track_usage("proximosRiegos")
+async def proximos_riegos(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Muestra los riegos atrasados y los que tocan en los próximos días"""
+    user_id = update.effective_user.id
+
+    try:
+        days = CommandValidator.validate_upcoming_days_args(context.args)
+    except ValidationError as e:
+        await update.message.reply_text(f"❌ {str(e)}")
+        return
+
+    hoy = date.today()
+    proximos = repository.proximos_riegos(user_id, days, hoy=hoy)
+    if not proximos:
+        await update.message.reply_text(
+            f"✅ No tienes riegos pendientes en los próximos {days} día(s)."
+        )
+        return
+
+    mensaje = f"💧 Riegos de los próximos {days} día(s):\n\n"
+    for riego, vence in proximos:
+        dias = (vence - hoy).days
+        if dias < 0:
+            mensaje += f"🚨 {riego.planta}: atrasado {-dias} día(s)\n"
+        elif dias == 0:
+            mensaje += f"⏰ {riego.planta}: hoy\n"
+        else:
+            mensaje += f"📅 {riego.planta}: {vence.isoformat()} (en {dias} día(s))\n"
+    mensaje += f"\nTotal: {len(proximos)} planta(s)."
+    await update.message.reply_text(mensaje)
+
+proximos_riegos_handler = CommandHandler("proximosRiegos", proximos_riegos)
@@ -1,7 +1,6 @@
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
-from datetime import date
-from src.utils.storage import plantas_por_usuario, riego_por_usuario, guardar_datos
+from src.utils import repository
 from src.utils.validators import CommandValidator, ValidationError
 from src.utils.decorators import handle_errors, track_usage
 import logging
@@ -20,35 +19,21 @@ async def regar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         plant_name, frequency = CommandValidator.validate_watering_setup_args(context.args)
         
         # Validar que la planta esté registrada
-        validated_plant = CommandValidator.validate_plant_is_registered(
-            plant_name, user_id, plantas_por_usuario
-        )
+        validated_plant = repository.exigir_planta(user_id, plant_name)
         
         # Verificar si ya existe configuración de riego
-        existing_watering = None
-        if (user_id in riego_por_usuario and 
-            validated_plant in riego_por_usuario[user_id]):
-            existing_watering = riego_por_usuario[user_id][validated_plant]
-        
-        # Inicializar estructura si no existe
-        if user_id not in riego_por_usuario:
-            riego_por_usuario[user_id] = {}
+        existing_watering = repository.obtener_riego(user_id, validated_plant)
         
         # Configurar riego
-        today = date.today().isoformat()
-        riego_por_usuario[user_id][validated_plant] = {
-            "frecuencia": frequency,
-            "ultimo_riego": today
-        }
-        
-        guardar_datos()
+        watering = repository.configurar_riego(user_id, validated_plant, frequency)
+        today = watering.ultimo_riego
         
         # Calcular próximo riego
-        next_watering = date.today().replace(day=date.today().day + frequency)
+        next_watering = watering.proximo_riego()
         
         # Preparar mensaje
         if existing_watering:
-            old_frequency = existing_watering.get("frecuencia", "desconocida")
+            old_frequency = existing_watering.frecuencia or "desconocida"
             mensaje = f"🔄 Configuración de riego actualizada\n\n"
             mensaje += f"🌱 Planta: {validated_plant}\n"
             mensaje += f"📅 Frecuencia anterior: cada {old_frequency} día(s)\n"
@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+from src.utils.serializer import deserializar
+
+SUFIJO_TEMPORAL = '.tmp'
+SUFIJO_RESPALDO = '.bak'
+
+def _sincronizar_directorio(directorio):
+    """Hace persistentes los renombrados dentro de un directorio"""
+    try:
+        fd = os.open(directorio or '.', os.O_RDONLY)
+    except OSError:
+        # Plataformas sin fsync de directorios (Windows)
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _conservar_generacion(ruta):
+    """Guarda la versión actual de un archivo como respaldo (.bak)"""
+    if not os.path.exists(ruta):
+        return
+    respaldo = ruta + SUFIJO_RESPALDO
+    temporal = respaldo + SUFIJO_TEMPORAL
+    try:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        os.link(ruta, temporal)
+    except OSError:
+        # Sistemas de archivos sin enlaces duros
+        shutil.copy2(ruta, temporal)
+    os.replace(temporal, respaldo)
+
+def escribir_atomico(archivos, conservar_anterior=True):
+    """Escribe varios archivos como una sola confirmación.
+
+    Todo se escribe primero en archivos temporales, que se sincronizan
+    seguidos antes de renombrarse sobre los definitivos; al final se
+    sincroniza cada directorio una sola vez. Si algo falla antes de los
+    renombrados, los archivos anteriores quedan intactos.
+
+    archivos: diccionario ruta -> contenido (str o bytes)
+    """
+    temporales = []
+    try:
+        for ruta, contenido in archivos.items():
+            temporal = ruta + SUFIJO_TEMPORAL
+            modo = 'wb' if isinstance(contenido, bytes) else 'w'
+            codificacion = None if isinstance(contenido, bytes) else 'utf-8'
+            with open(temporal, modo, encoding=codificacion) as f:
+                f.write(contenido)
+            temporales.append((temporal, ruta))
+
+        # fsync agrupado: todos los datos llegan al disco antes de renombrar
+        for temporal, _ in temporales:
+            fd = os.open(temporal, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+    except Exception:
+        for temporal, _ in temporales:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+        raise
+
+    for temporal, ruta in temporales:
+        if conservar_anterior:
+            _conservar_generacion(ruta)
+        os.replace(temporal, ruta)
+
+    for directorio in {os.path.dirname(ruta) for ruta in archivos}:
+        _sincronizar_directorio(directorio)
+
+def leer_json_con_respaldo(ruta):
+    """Lee un archivo JSON. Si falta o está corrupto recurre a la
+    generación anterior (.bak). Devuelve None si no hay ninguna válida"""
+    for candidato in (ruta, ruta + SUFIJO_RESPALDO):
+        try:
+            with open(candidato, 'rb') as f:
+                return deserializar(f.read())
+        except FileNotFoundError:
+            continue
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"Archivo de datos corrupto {candidato}: {e}")
+            if candidato == ruta:
+                # Conservar el archivo dañado para poder revisarlo
+                marca = datetime.now().strftime('%Y%m%d%H%M%S')
+                os.replace(ruta, f"{ruta}.corrupto-{marca}")
+    return None
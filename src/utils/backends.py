@@ -0,0 +1,601 @@
+import copy
+import os
+import sqlite3
+import threading
+
+from src.config import Config
+from src.utils.atomic import escribir_atomico, leer_json_con_respaldo
+from src.utils.journal import Diario
+from src.utils.serializer import serializar
+from src.utils.series import serializar_json, series_de_usuario
+from src.utils.startup_cache import escribir_cache, firma_archivo, leer_cache
+
+# Archivo JSON de cada dominio persistido
+ARCHIVOS_DOMINIO = {
+    'plantas': 'plantas.json',
+    'medidas': 'medidas.json',
+    'riego': 'riego.json',
+    'horas': 'horas.json',
+}
+
+# Caché binaria de los dominios para arrancar sin volver a leer los JSON
+ARCHIVO_CACHE = 'cache_inicio.pickle'
+
+def obtener_ruta_archivo(nombre_archivo):
+    """Obtiene la ruta completa del archivo de datos"""
+    return os.path.join(Config.DATA_DIR, nombre_archivo)
+
+def separar_clave(clave):
+    """Separa una clave de cambio en (user_id, planta). La planta es None
+    cuando el cambio afecta a todos los datos del usuario en el dominio"""
+    if isinstance(clave, tuple):
+        return clave
+    return clave, None
+
+def _fragmento(user_id, valor):
+    """'"user_id":valor' en JSON, para componer el archivo de un dominio"""
+    return serializar(str(user_id)) + b':' + serializar(valor, default=serializar_json)
+
+def convertir_medidas(medidas):
+    """Convierte en series compactas las medidas recién cargadas"""
+    for user_id, por_planta in medidas.items():
+        medidas[user_id] = series_de_usuario(por_planta)
+
+class Backend:
+    """Interfaz común de los backends de persistencia.
+
+    storage llama a capturar() en el hilo del bucle de eventos, a guardar()
+    (quizá desde el hilo auxiliar de guardado) y a confirmar() de vuelta en
+    el bucle una vez terminada la escritura.
+    """
+
+    nombre = None
+    # Bytes escritos desde que se creó (para las métricas de guardado)
+    bytes_escritos = 0
+
+    def cargar(self, datos):
+        """Llena los diccionarios de cada dominio"""
+        raise NotImplementedError
+
+    def riegos(self, datos):
+        """(user_id, riegos de sus plantas) de todos los usuarios con riego"""
+        return list(datos['riego'].items())
+
+    def guarda_por_claves(self):
+        """Indica si solo necesita los datos de los usuarios modificados"""
+        return True
+
+    def marcar(self, user_id):
+        """Aviso de que los datos de un usuario cambiaron"""
+
+    def capturar(self, datos, pendientes, copiar=False):
+        """Prepara los datos a guardar. Con copiar=True devuelve una copia
+        para que el hilo auxiliar no lea diccionarios que los handlers
+        siguen modificando"""
+        if not copiar:
+            return datos
+        copia = {}
+        for dominio, claves in pendientes.items():
+            if not claves or not self.guarda_por_claves():
+                copia[dominio] = copy.deepcopy(datos[dominio])
+                continue
+            usuarios = {separar_clave(clave)[0] for clave in claves}
+            copia[dominio] = {
+                user_id: copy.deepcopy(datos[dominio][user_id])
+                for user_id in usuarios if user_id in datos[dominio]
+            }
+        return copia
+
+    def guardar(self, lote, pendientes, operaciones=None):
+        """Persiste lo capturado. Devuelve los dominios guardados.
+        operaciones: dominio -> clave -> cambios hechos en esa planta, para
+        los backends que pueden escribir solo las filas afectadas"""
+        raise NotImplementedError
+
+    def confirmar(self, lote, guardados):
+        """Aviso de que terminó la escritura de un lote"""
+
+    def necesita_compactar(self):
+        """Indica si el backend necesita compactar su almacenamiento"""
+        return False
+
+    def guardar_cache(self, datos):
+        """Guarda lo necesario para acelerar el próximo arranque"""
+
+    def cerrar(self):
+        """Libera los recursos del backend"""
+
+class JSONBackend(Backend):
+    """Persistencia en un archivo JSON por dominio, con diario opcional"""
+
+    nombre = 'json'
+
+    def __init__(self):
+        # Hilo de compactación del diario en curso (si lo hay)
+        self._compactacion = None
+        # Sin diario, guardado diferido: dominio -> user_id -> fragmento JSON
+        # ('"id":valor') de cada usuario. Solo lo modifica el hilo de guardado
+        self._fragmentos = {}
+
+    def diario(self):
+        """Obtiene el diario de mutaciones del directorio de datos"""
+        return Diario(obtener_ruta_archivo('diario.jsonl'), default=serializar_json,
+                      sincronizar=Config.JOURNAL_FSYNC)
+
+    def cargar(self, datos):
+        """Carga los archivos JSON y reproduce el diario pendiente.
+
+        Los dominios cuyo archivo no cambió desde la última caché binaria se
+        toman de ella sin volver a leer el JSON.
+        """
+        cache = leer_cache(obtener_ruta_archivo(ARCHIVO_CACHE)) if Config.STARTUP_CACHE else {}
+        leidos = 0
+        for dominio, nombre_archivo in ARCHIVOS_DOMINIO.items():
+            ruta = obtener_ruta_archivo(nombre_archivo)
+            guardado = cache.get(dominio)
+            firma = firma_archivo(ruta)
+            if guardado is not None and firma is not None and guardado['firma'] == firma:
+                datos[dominio].clear()
+                datos[dominio].update(guardado['datos'])
+                continue
+
+            leidos += 1
+            # Si el archivo está dañado se usa la generación anterior
+            data = leer_json_con_respaldo(ruta)
+            if data is None:
+                datos[dominio].clear()
+            else:
+                datos[dominio].update({int(k): v for k, v in data.items()})
+
+        self._fragmentos.clear()
+        diario = self.diario()
+        reproducidas = 0
+        for entrada in diario.reproducir():
+            self._aplicar_entrada(datos, entrada)
+            reproducidas += 1
+        convertir_medidas(datos['medidas'])
+
+        # Volcar en las instantáneas lo recuperado del diario
+        if reproducidas:
+            self._escribir_instantaneas(datos)
+            diario.descartar()
+
+        if leidos or reproducidas:
+            self.guardar_cache(datos)
+
+    def _aplicar_entrada(self, datos, entrada):
+        """Aplica una entrada del diario sobre los diccionarios en memoria"""
+        if entrada.get('d') not in datos:
+            return
+        dominio = datos[entrada['d']]
+        user_id, planta, valor = entrada.get('u'), entrada.get('p'), entrada.get('v')
+        if user_id is None:
+            dominio.clear()
+            dominio.update({int(k): v for k, v in (valor or {}).items()})
+        elif planta is not None:
+            if valor is None:
+                dominio.get(user_id, {}).pop(planta, None)
+            else:
+                dominio.setdefault(user_id, {})[planta] = valor
+        elif valor is None:
+            dominio.pop(user_id, None)
+        else:
+            dominio[user_id] = valor
+
+    def _escribir_instantaneas(self, instantaneas):
+        """Escribe el archivo JSON de cada dominio indicado (datos o bytes ya
+        serializados) en una sola confirmación atómica. Devuelve los que se
+        escribieron"""
+        archivos = {}
+        for dominio, datos in instantaneas.items():
+            try:
+                contenido = datos if isinstance(datos, bytes) else serializar(datos, default=serializar_json)
+                archivos[obtener_ruta_archivo(ARCHIVOS_DOMINIO[dominio])] = (contenido, dominio)
+            except Exception as e:
+                print(f"Error guardando {dominio}: {e}")
+
+        try:
+            escribir_atomico({ruta: contenido for ruta, (contenido, _) in archivos.items()})
+        except Exception as e:
+            print(f"Error guardando instantáneas: {e}")
+            return []
+        self.bytes_escritos += sum(len(contenido) for contenido, _ in archivos.values())
+        return [dominio for _, dominio in archivos.values()]
+
+    def _entradas_diario(self, datos, modificados):
+        """Construye las entradas de diario de los cambios pendientes"""
+        entradas = []
+        for dominio, claves in modificados.items():
+            if not claves:
+                entradas.append({'d': dominio, 'u': None, 'v': datos[dominio]})
+                continue
+            for clave in claves:
+                user_id, planta = separar_clave(clave)
+                valor = datos[dominio].get(user_id)
+                if planta is None:
+                    entradas.append({'d': dominio, 'u': user_id, 'v': valor})
+                else:
+                    valor = valor.get(planta) if valor is not None else None
+                    entradas.append({'d': dominio, 'u': user_id, 'p': planta, 'v': valor})
+        return entradas
+
+    def guarda_por_claves(self):
+        """Indica si solo necesita los datos de los usuarios modificados"""
+        return Config.STORAGE_JOURNAL
+
+    def capturar(self, datos, pendientes, copiar=False):
+        """Sin diario, el guardado diferido serializa en el bucle solo a los
+        usuarios modificados; el hilo auxiliar los combina con los fragmentos
+        del resto para escribir el dominio completo. Solo la primera vez (o al
+        guardar un dominio entero) se serializan todos"""
+        if not copiar or Config.STORAGE_JOURNAL:
+            return super().capturar(datos, pendientes, copiar)
+        fragmentos = {}
+        for dominio, claves in pendientes.items():
+            por_usuario = datos[dominio]
+            if not claves or dominio not in self._fragmentos:
+                usuarios, completo = list(por_usuario), True
+            else:
+                usuarios, completo = {separar_clave(clave)[0] for clave in claves}, False
+            fragmentos[dominio] = (completo, {
+                user_id: _fragmento(user_id, por_usuario[user_id]) if user_id in por_usuario else None
+                for user_id in usuarios
+            })
+        return {'fragmentos': fragmentos}
+
+    def _ensamblar(self, fragmentos):
+        """Aplica los fragmentos capturados y devuelve el JSON de cada dominio"""
+        instantaneas = {}
+        for dominio, (completo, cambios) in fragmentos.items():
+            if completo:
+                self._fragmentos[dominio] = {}
+            actuales = self._fragmentos[dominio]
+            for user_id, fragmento in cambios.items():
+                if fragmento is None:
+                    actuales.pop(user_id, None)
+                else:
+                    actuales[user_id] = fragmento
+            instantaneas[dominio] = b'{' + b','.join(actuales.values()) + b'}'
+        return instantaneas
+
+    def guardar(self, datos, modificados, operaciones=None):
+        """Persiste los dominios modificados. Devuelve los guardados"""
+        if not Config.STORAGE_JOURNAL:
+            if 'fragmentos' in datos:
+                return self._escribir_instantaneas(self._ensamblar(datos['fragmentos']))
+            # Guardado inmediato desde los datos en memoria: los fragmentos
+            # de estos dominios dejan de estar al día
+            for dominio in modificados:
+                self._fragmentos.pop(dominio, None)
+            return self._escribir_instantaneas({dominio: datos[dominio] for dominio in modificados})
+
+        try:
+            self.bytes_escritos += self.diario().agregar(self._entradas_diario(datos, modificados))
+        except Exception as e:
+            print(f"Error escribiendo en el diario: {e}")
+            return []
+        return list(modificados)
+
+    def necesita_compactar(self):
+        """Indica si el diario alcanzó el tamaño máximo configurado"""
+        return Config.STORAGE_JOURNAL and self.diario().tamano() >= Config.JOURNAL_MAX_BYTES
+
+    def compactar(self, datos, en_segundo_plano=True):
+        """Vuelca el estado actual en las instantáneas JSON y descarta el diario.
+
+        En el hilo que llama solo se aparta el diario activo, de modo que los
+        cambios siguientes van a un diario nuevo. El hilo de compactación
+        reconstruye el estado desde los archivos (instantáneas más diario
+        apartado) sin tocar los datos en memoria.
+        """
+        if self._compactacion is not None and self._compactacion.is_alive():
+            return
+
+        diario = self.diario()
+        diario.rotar()
+
+        def tarea():
+            estado = self._estado_en_disco(diario)
+            if len(self._escribir_instantaneas(estado)) == len(estado):
+                diario.descartar_rotado()
+
+        if not en_segundo_plano:
+            tarea()
+            return
+        self._compactacion = threading.Thread(target=tarea, name='compactacion-diario', daemon=True)
+        self._compactacion.start()
+
+    def _estado_en_disco(self, diario):
+        """Instantáneas JSON con el diario apartado aplicado encima"""
+        estado = {}
+        for dominio, nombre_archivo in ARCHIVOS_DOMINIO.items():
+            data = leer_json_con_respaldo(obtener_ruta_archivo(nombre_archivo)) or {}
+            estado[dominio] = {int(k): v for k, v in data.items()}
+        for entrada in diario.reproducir_rotado():
+            self._aplicar_entrada(estado, entrada)
+        return estado
+
+    def guardar_cache(self, datos):
+        """Guarda los dominios en la caché binaria, asociados a la versión
+        actual de cada archivo JSON. Solo debe llamarse cuando lo que hay en
+        memoria coincide con los archivos (o con archivos más el diario)"""
+        if not Config.STARTUP_CACHE:
+            return
+        # Una compactación en curso cambiaría los archivos
+        self.cerrar()
+        dominios = {}
+        for dominio, nombre_archivo in ARCHIVOS_DOMINIO.items():
+            firma = firma_archivo(obtener_ruta_archivo(nombre_archivo))
+            if firma is not None:
+                dominios[dominio] = {'firma': firma, 'datos': datos[dominio]}
+        escribir_cache(obtener_ruta_archivo(ARCHIVO_CACHE), dominios)
+
+    def cerrar(self):
+        """Espera a que termine la compactación en curso, si la hay"""
+        if self._compactacion is not None:
+            self._compactacion.join()
+
+class SQLiteBackend(Backend):
+    """Persistencia en una base SQLite con una tabla indexada por dominio.
+
+    Los cambios marcados por (usuario, planta) reescriben solo las filas de
+    esa planta a través del índice; los marcados por usuario, solo las de
+    ese usuario.
+
+    Las alturas y las horas se declaran BLOB (sin afinidad) para que SQLite
+    las guarde tal cual: con REAL, un 2 volvería como 2.0.
+    """
+
+    nombre = 'sqlite'
+
+    # Columnas que las bases anteriores declaraban REAL: tabla -> (columna, índice)
+    COLUMNAS_SIN_AFINIDAD = {
+        'medidas': ('altura', 'idx_medidas_usuario_planta'),
+        'horas': ('horas', 'idx_horas_usuario'),
+    }
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+        CREATE TABLE IF NOT EXISTS plantas (
+            user_id INTEGER NOT NULL, posicion INTEGER NOT NULL, nombre TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_plantas_usuario ON plantas (user_id, nombre);
+        CREATE TABLE IF NOT EXISTS medidas (
+            user_id INTEGER NOT NULL, planta TEXT NOT NULL, posicion INTEGER NOT NULL,
+            altura BLOB, fecha TEXT, timestamp TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_medidas_usuario_planta ON medidas (user_id, planta, posicion);
+        CREATE TABLE IF NOT EXISTS riego (
+            user_id INTEGER NOT NULL, planta TEXT NOT NULL,
+            frecuencia INTEGER, ultimo_riego TEXT,
+            PRIMARY KEY (user_id, planta)
+        );
+        CREATE TABLE IF NOT EXISTS horas (
+            user_id INTEGER NOT NULL, fecha TEXT NOT NULL, horas BLOB NOT NULL, timestamp TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_horas_usuario ON horas (user_id, fecha);
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta or obtener_ruta_archivo(Config.SQLITE_FILE)
+        self._conexion = None
+
+    def conexion(self):
+        """Abre (una sola vez) la conexión y crea el esquema"""
+        if self._conexion is None:
+            os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+            # El guardado diferido escribe desde un único hilo auxiliar
+            self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._conexion.executescript(self.ESQUEMA)
+            self._quitar_afinidad_real(self._conexion)
+        return self._conexion
+
+    def _quitar_afinidad_real(self, conexion):
+        """Rehace las tablas creadas con columnas REAL para que los números
+        enteros que se guarden desde ahora no se conviertan en float"""
+        for tabla, (columna, indice) in self.COLUMNAS_SIN_AFINIDAD.items():
+            tipos = {fila[1]: fila[2] for fila in conexion.execute(f"PRAGMA table_info({tabla})")}
+            if tipos.get(columna) != 'REAL':
+                continue
+            conexion.executescript(f"""
+                BEGIN;
+                ALTER TABLE {tabla} RENAME TO {tabla}_anterior;
+                DROP INDEX {indice};
+                {self.ESQUEMA}
+                INSERT INTO {tabla} SELECT * FROM {tabla}_anterior;
+                DROP TABLE {tabla}_anterior;
+                COMMIT;
+            """)
+
+    def cargar(self, datos):
+        """Carga todas las tablas. La primera vez importa los archivos JSON"""
+        conexion = self.conexion()
+        if conexion.execute("SELECT 1 FROM meta WHERE clave = 'inicializado'").fetchone() is None:
+            JSONBackend().cargar(datos)
+            self.guardar(datos, {dominio: set() for dominio in datos})
+            return
+
+        for dominio in datos.values():
+            dominio.clear()
+
+        for user_id, nombre in conexion.execute(
+                "SELECT user_id, nombre FROM plantas ORDER BY user_id, posicion"):
+            datos['plantas'].setdefault(user_id, []).append(nombre)
+
+        for user_id, planta, altura, fecha, timestamp in conexion.execute(
+                "SELECT user_id, planta, altura, fecha, timestamp FROM medidas "
+                "ORDER BY user_id, planta, posicion"):
+            medidas = datos['medidas'].setdefault(user_id, {}).setdefault(planta, [])
+            if fecha is None and timestamp is None:
+                # Formato antiguo: solo la altura
+                medidas.append(altura)
+                continue
+            medida = {'altura': altura}
+            if fecha is not None:
+                medida['fecha'] = fecha
+            if timestamp is not None:
+                medida['timestamp'] = timestamp
+            medidas.append(medida)
+
+        for user_id, planta, frecuencia, ultimo_riego in conexion.execute(
+                "SELECT user_id, planta, frecuencia, ultimo_riego FROM riego"):
+            datos['riego'].setdefault(user_id, {})[planta] = {
+                'frecuencia': frecuencia,
+                'ultimo_riego': ultimo_riego
+            }
+
+        for user_id, fecha, horas, timestamp in conexion.execute(
+                "SELECT user_id, fecha, horas, timestamp FROM horas ORDER BY rowid"):
+            registro = {'fecha': fecha, 'horas': horas}
+            if timestamp is not None:
+                registro['timestamp'] = timestamp
+            datos['horas'].setdefault(user_id, []).append(registro)
+
+        convertir_medidas(datos['medidas'])
+
+    def guardar(self, datos, modificados, operaciones=None):
+        """Reescribe solo las filas de los usuarios o plantas modificados.
+        Si se conocen las operaciones de una planta (anexar o borrar una
+        medida, actualizar un riego) se aplican fila a fila"""
+        conexion = self.conexion()
+        operaciones = operaciones or {}
+        try:
+            with conexion:
+                for dominio, claves in modificados.items():
+                    escribir = getattr(self, f'_guardar_{dominio}')
+                    if not claves:
+                        conexion.execute(f"DELETE FROM {dominio}")
+                        for user_id in datos[dominio]:
+                            escribir(conexion, datos[dominio], user_id, None, borrar=False)
+                        continue
+                    aplicar = getattr(self, f'_aplicar_{dominio}', None)
+                    for clave in claves:
+                        user_id, planta = separar_clave(clave)
+                        cambios = operaciones.get(dominio, {}).get(clave)
+                        if aplicar is not None and cambios is not None:
+                            for operacion in cambios:
+                                aplicar(conexion, user_id, planta, operacion)
+                        else:
+                            escribir(conexion, datos[dominio], user_id, planta)
+                conexion.execute("INSERT OR IGNORE INTO meta VALUES ('inicializado', '1')")
+        except Exception as e:
+            print(f"Error guardando en SQLite: {e}")
+            return []
+        return list(modificados)
+
+    def _guardar_plantas(self, conexion, datos, user_id, planta, borrar=True):
+        if borrar:
+            conexion.execute("DELETE FROM plantas WHERE user_id = ?", (user_id,))
+        conexion.executemany(
+            "INSERT INTO plantas (user_id, posicion, nombre) VALUES (?, ?, ?)",
+            [(user_id, i, nombre) for i, nombre in enumerate(datos.get(user_id, []))]
+        )
+
+    def _guardar_medidas(self, conexion, datos, user_id, planta, borrar=True):
+        por_planta = datos.get(user_id, {})
+        if planta is not None:
+            if borrar:
+                conexion.execute(
+                    "DELETE FROM medidas WHERE user_id = ? AND planta = ?", (user_id, planta)
+                )
+            por_planta = {planta: por_planta[planta]} if planta in por_planta else {}
+        elif borrar:
+            conexion.execute("DELETE FROM medidas WHERE user_id = ?", (user_id,))
+
+        filas = []
+        for nombre, medidas in por_planta.items():
+            for i, medida in enumerate(medidas):
+                if isinstance(medida, dict):
+                    filas.append((user_id, nombre, i, medida.get('altura'),
+                                  medida.get('fecha'), medida.get('timestamp')))
+                else:
+                    filas.append((user_id, nombre, i, medida, None, None))
+        conexion.executemany(
+            "INSERT INTO medidas (user_id, planta, posicion, altura, fecha, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)", filas
+        )
+
+    def _aplicar_medidas(self, conexion, user_id, planta, operacion):
+        """Una medida anexada o borrada: solo su fila (y, al borrar, las
+        posiciones de las siguientes)"""
+        tipo, posicion = operacion[0], operacion[1]
+        if tipo == 'anexar':
+            medida = operacion[2]
+            conexion.execute(
+                "INSERT INTO medidas (user_id, planta, posicion, altura, fecha, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, planta, posicion, medida.get('altura'),
+                 medida.get('fecha'), medida.get('timestamp'))
+            )
+        elif tipo == 'borrar':
+            conexion.execute(
+                "DELETE FROM medidas WHERE user_id = ? AND planta = ? AND posicion = ?",
+                (user_id, planta, posicion)
+            )
+            conexion.execute(
+                "UPDATE medidas SET posicion = posicion - 1 "
+                "WHERE user_id = ? AND planta = ? AND posicion > ?",
+                (user_id, planta, posicion)
+            )
+        else:
+            raise ValueError(f"Operación de medidas desconocida: {tipo}")
+
+    def _aplicar_riego(self, conexion, user_id, planta, operacion):
+        """Un riego configurado o cambiado: una sola fila"""
+        tipo, riego = operacion
+        if tipo != 'actualizar':
+            raise ValueError(f"Operación de riego desconocida: {tipo}")
+        conexion.execute(
+            "INSERT OR REPLACE INTO riego (user_id, planta, frecuencia, ultimo_riego) "
+            "VALUES (?, ?, ?, ?)",
+            (user_id, planta, riego.get('frecuencia'), riego.get('ultimo_riego'))
+        )
+
+    def _guardar_riego(self, conexion, datos, user_id, planta, borrar=True):
+        por_planta = datos.get(user_id, {})
+        if planta is not None:
+            if borrar:
+                conexion.execute(
+                    "DELETE FROM riego WHERE user_id = ? AND planta = ?", (user_id, planta)
+                )
+            por_planta = {planta: por_planta[planta]} if planta in por_planta else {}
+        elif borrar:
+            conexion.execute("DELETE FROM riego WHERE user_id = ?", (user_id,))
+
+        conexion.executemany(
+            "INSERT INTO riego (user_id, planta, frecuencia, ultimo_riego) VALUES (?, ?, ?, ?)",
+            [(user_id, nombre, riego.get('frecuencia'), riego.get('ultimo_riego'))
+             for nombre, riego in por_planta.items()]
+        )
+
+    def _guardar_horas(self, conexion, datos, user_id, planta, borrar=True):
+        if borrar:
+            conexion.execute("DELETE FROM horas WHERE user_id = ?", (user_id,))
+        conexion.executemany(
+            "INSERT INTO horas (user_id, fecha, horas, timestamp) VALUES (?, ?, ?, ?)",
+            [(user_id, r['fecha'], r['horas'], r.get('timestamp'))
+             for r in datos.get(user_id, [])]
+        )
+
+    def cerrar(self):
+        """Cierra la conexión con la base de datos"""
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+
+BACKENDS = {
+    JSONBackend.nombre: JSONBackend,
+    SQLiteBackend.nombre: SQLiteBackend,
+}
+
+def crear_backend(nombre):
+    """Crea el backend de persistencia configurado"""
+    nombre = nombre.lower()
+    if nombre == 'shards':
+        # Importación diferida: shards depende de este módulo
+        from src.utils.shards import ShardedBackend
+        return ShardedBackend()
+    try:
+        return BACKENDS[nombre]()
+    except KeyError:
+        raise ValueError(f"Backend de almacenamiento desconocido: {nombre}")
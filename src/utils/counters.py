@@ -0,0 +1,133 @@
+import math
+
+# Totales que se llevan por dominio a partir de los datos de un usuario
+def _aporte_plantas(plantas):
+    return {'total_plantas': len(plantas)}
+
+def _aporte_medidas(medidas):
+    return {'total_medidas': sum(len(serie) for serie in medidas.values())}
+
+def _aporte_riego(riegos):
+    return {'total_riegos': len(riegos)}
+
+def _aporte_horas(registros):
+    return {
+        'total_registros_horas': len(registros),
+        'total_horas': sum(r['horas'] for r in registros),
+    }
+
+APORTES = {
+    'plantas': _aporte_plantas,
+    'medidas': _aporte_medidas,
+    'riego': _aporte_riego,
+    'horas': _aporte_horas,
+}
+
+# Dominios cuyo número de usuarios se publica además del total
+USUARIOS_POR_DOMINIO = {'plantas': 'usuarios_con_plantas', 'horas': 'usuarios_con_horas'}
+
+CLAVES = (
+    'total_usuarios', 'total_plantas', 'total_medidas', 'total_riegos',
+    'total_registros_horas', 'total_horas', 'usuarios_con_plantas', 'usuarios_con_horas',
+)
+
+class ContadoresGlobales:
+    """Estadísticas globales mantenidas de forma incremental.
+
+    Se guarda lo que aporta cada usuario en cada dominio; al modificarse un
+    usuario solo se recalcula su aporte y se suma la diferencia, así que
+    consultar los totales no recorre los datos. El primer recuento completo
+    se hace al consultarlos por primera vez (con el backend 'shards' evita
+    cargar a todos los usuarios al arrancar).
+    """
+
+    def __init__(self, dominios):
+        self.dominios = dominios
+        self._listos = False
+        self._totales = {}
+        # dominio -> user_id -> aporte de ese usuario
+        self._aportes = {}
+        # user_id -> dominios en los que tiene datos
+        self._presencia = {}
+
+    def invalidar(self):
+        """Descarta los totales (p. ej. tras recargar los datos)"""
+        self._listos = False
+        self._totales.clear()
+        self._aportes.clear()
+        self._presencia.clear()
+
+    def recontar(self):
+        """Recuento completo desde los diccionarios de storage"""
+        self.invalidar()
+        self._totales = contar(self.dominios)
+        for dominio, datos in self.dominios.items():
+            aportes = self._aportes[dominio] = {}
+            for user_id, valor in datos.items():
+                aportes[user_id] = APORTES[dominio](valor)
+                self._presencia.setdefault(user_id, set()).add(dominio)
+        self._listos = True
+
+    def actualizar(self, dominio, user_id=None):
+        """Ajusta los totales tras un cambio en los datos de un usuario (o de
+        un dominio completo, que se recuenta)"""
+        if not self._listos:
+            return
+        if user_id is None:
+            self.recontar()
+            return
+
+        datos = self.dominios[dominio]
+        aportes = self._aportes[dominio]
+        anterior = aportes.pop(user_id, None)
+        presente = user_id in datos
+        nuevo = APORTES[dominio](datos[user_id]) if presente else None
+
+        for clave, cantidad in (anterior or {}).items():
+            self._totales[clave] -= cantidad
+        for clave, cantidad in (nuevo or {}).items():
+            self._totales[clave] += cantidad
+
+        if presente:
+            aportes[user_id] = nuevo
+        if dominio in USUARIOS_POR_DOMINIO:
+            self._totales[USUARIOS_POR_DOMINIO[dominio]] += presente - (anterior is not None)
+
+        dominios_usuario = self._presencia.setdefault(user_id, set())
+        if presente:
+            dominios_usuario.add(dominio)
+        else:
+            dominios_usuario.discard(dominio)
+        if not dominios_usuario:
+            del self._presencia[user_id]
+        self._totales['total_usuarios'] = len(self._presencia)
+
+    def totales(self):
+        if not self._listos:
+            self.recontar()
+        return dict(self._totales)
+
+    def verificar(self):
+        """Compara los totales con un recuento completo. Devuelve las
+        diferencias como {clave: (incremental, recuento)}"""
+        actuales = self.totales()
+        esperados = contar(self.dominios)
+        return {
+            clave: (actuales.get(clave), valor)
+            for clave, valor in esperados.items()
+            if not math.isclose(actuales.get(clave, math.nan), valor, abs_tol=1e-6)
+        }
+
+def contar(dominios):
+    """Recuento completo de todos los totales (recorre todos los datos)"""
+    totales = dict.fromkeys(CLAVES, 0)
+    usuarios = set()
+    for dominio, datos in dominios.items():
+        for user_id, valor in datos.items():
+            usuarios.add(user_id)
+            for clave, cantidad in APORTES[dominio](valor).items():
+                totales[clave] += cantidad
+            if dominio in USUARIOS_POR_DOMINIO:
+                totales[USUARIOS_POR_DOMINIO[dominio]] += 1
+    totales['total_usuarios'] = len(usuarios)
+    return totales
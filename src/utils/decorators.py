@@ -1,8 +1,12 @@
 import functools
 import logging
+from time import perf_counter_ns
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from src.config import Config
+from src.utils.latency import iniciar_medicion, terminar_medicion
+
 logger = logging.getLogger('plantas_bot')
 
 def handle_errors(func):
@@ -16,19 +20,35 @@ def handle_errors(func):
             username = update.effective_user.username if update.effective_user else "Unknown"
             
             logger.error(f"Error en {func.__name__} para usuario {username} ({user_id}): {str(e)}")
+            from src.utils.metrics import bot_metrics
+            bot_metrics.record_error(user_id, func.__name__, str(e))
+
+    return wrapper
 
+def admin_only(func):
+    """Decorador que ignora el comando si el usuario no está en ADMIN_IDS"""
+    @functools.wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        user_id = update.effective_user.id if update.effective_user else None
+        if user_id not in Config.ADMIN_IDS:
+            logger.warning(f"Usuario {user_id} intentó usar {func.__name__} sin ser administrador")
+            return
+        return await func(update, context, *args, **kwargs)
     return wrapper
 
 def track_usage(command_name):
-    """Decorador para rastrear uso de comandos"""
+    """Decorador para rastrear uso de comandos y su latencia"""
     def decorator(func):
         @functools.wraps(func)
         async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
             user_id = update.effective_user.id if update.effective_user else "Unknown"
+            from src.utils.metrics import bot_metrics
             
+            # Las fases (validación, guardado, respuestas) se acumulan en la medición
+            medicion, token = iniciar_medicion()
+            inicio = perf_counter_ns()
             try:
                 # Registrar uso del comando
-                from src.utils.metrics import bot_metrics
                 bot_metrics.record_command_usage(user_id, command_name)
                 
                 # Ejecutar función original
@@ -40,6 +60,10 @@ def track_usage(command_name):
             except Exception as e:
                 logger.error(f"Error en {command_name} para usuario {user_id}: {str(e)}")
                 raise  # Re-lanzar para que handle_errors lo maneje
+            
+            finally:
+                terminar_medicion(token)
+                bot_metrics.record_latency(command_name, perf_counter_ns() - inicio, medicion.fases)
                 
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
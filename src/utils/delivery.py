@@ -0,0 +1,102 @@
+import asyncio
+import logging
+
+from telegram.error import RetryAfter
+
+from src.config import Config
+
+logger = logging.getLogger('plantas_bot')
+
+class CuboTokens:
+    """Cubo de tokens: permite `tasa` envíos por segundo con ráfagas de
+    hasta `capacidad`"""
+
+    __slots__ = ('tasa', 'capacidad', 'tokens', 'ultimo')
+
+    def __init__(self, tasa, capacidad=None, ahora=0.0):
+        self.tasa = tasa
+        self.capacidad = capacidad if capacidad is not None else max(1.0, tasa)
+        self.tokens = self.capacidad
+        self.ultimo = ahora
+
+    def espera(self, ahora):
+        """Reserva un token y devuelve los segundos que hay que esperar
+        antes de usarlo (0 si hay uno disponible)"""
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.tasa
+
+class LimitadorEnvios:
+    """Límite global y por chat de la Bot API (unos 30 mensajes por segundo
+    en total y 1 por segundo a cada chat)"""
+
+    def __init__(self, tasa_global=None, tasa_chat=None):
+        self.tasa_global = tasa_global or Config.REMINDER_RATE_GLOBAL
+        self.tasa_chat = tasa_chat or Config.REMINDER_RATE_CHAT
+        self._global = None
+        self._chats = {}
+        self._bloqueo = None
+        self._bucle = None
+
+    def _preparar(self):
+        bucle = asyncio.get_running_loop()
+        if self._bucle is not bucle:
+            self._bucle = bucle
+            self._bloqueo = asyncio.Lock()
+            self._global = CuboTokens(self.tasa_global, ahora=bucle.time())
+            self._chats = {}
+        return bucle
+
+    async def esperar_turno(self, chat_id):
+        """Espera hasta poder enviar un mensaje a chat_id"""
+        bucle = self._preparar()
+        async with self._bloqueo:
+            ahora = bucle.time()
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = CuboTokens(self.tasa_chat, capacidad=1, ahora=ahora)
+            # Se reservan ambos turnos a la vez para no desordenar la cola
+            espera = max(self._global.espera(ahora), chat.espera(ahora))
+            self._olvidar_chats_inactivos(ahora)
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    def _olvidar_chats_inactivos(self, ahora):
+        if len(self._chats) > 1024:
+            self._chats = {
+                chat_id: cubo for chat_id, cubo in self._chats.items()
+                if cubo.tokens < cubo.capacidad or ahora - cubo.ultimo < 1 / cubo.tasa
+            }
+
+async def enviar_mensaje(bot, limitador, chat_id, texto, reintentos=None):
+    """Envía respetando el limitador y reintenta cuando Telegram responde
+    RetryAfter. Los demás errores se propagan"""
+    reintentos = Config.REMINDER_MAX_RETRIES if reintentos is None else reintentos
+    intento = 0
+    while True:
+        await limitador.esperar_turno(chat_id)
+        try:
+            return await bot.send_message(chat_id=chat_id, text=texto)
+        except RetryAfter as e:
+            intento += 1
+            if intento > reintentos:
+                raise
+            logger.warning(f"Límite de Telegram al enviar a {chat_id}: reintento en {e.retry_after}s")
+            await asyncio.sleep(float(e.retry_after))
+
+async def repartir(trabajos, concurrencia=None):
+    """Ejecuta las corrutinas con como máximo `concurrencia` a la vez.
+    Devuelve los resultados (o la excepción de cada una) en el mismo orden"""
+    semaforo = asyncio.Semaphore(concurrencia or Config.REMINDER_CONCURRENCY)
+
+    async def con_turno(trabajo):
+        async with semaforo:
+            return await trabajo
+
+    return await asyncio.gather(*(con_turno(t) for t in trabajos), return_exceptions=True)
+
+# Limitador compartido por todos los envíos del bot
+limitador_envios = LimitadorEnvios()
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+
+from src.config import Config
+from src.utils.latency import HistogramaLatencia, indice_bucket, limite_bucket
+from src.utils.metrics import bot_metrics
+from src.utils.storage import obtener_estadisticas
+
+logger = logging.getLogger('plantas_bot')
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Límites (segundos) de los buckets que se publican de cada histograma
+LIMITES_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Un límite nominal suele caer dentro de un bucket del histograma; se publica
+# el final de ese bucket (p. ej. le="0.001048575" para 1 ms) para que cada
+# cuenta acumulada sea exacta en lugar de dejar fuera el bucket partido
+LIMITES_NS = tuple(limite_bucket(indice_bucket(round(limite * 1e9))) for limite in LIMITES_S)
+
+# Cada cuánto se mide el retraso del bucle de eventos
+INTERVALO_RETRASO_S = 1.0
+
+def _etiquetas(etiquetas):
+    """Etiquetas en formato Prometheus ('' si no hay)"""
+    if not etiquetas:
+        return ''
+    pares = []
+    for clave, valor in etiquetas.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{clave}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+def _cabecera(lineas, nombre, tipo, ayuda):
+    lineas.append(f"# HELP {nombre} {ayuda}")
+    lineas.append(f"# TYPE {nombre} {tipo}")
+
+def _histograma(lineas, nombre, histograma, etiquetas=None):
+    """Buckets acumulados, suma y cuenta de un HistogramaLatencia"""
+    etiquetas = etiquetas or {}
+    for limite in LIMITES_NS:
+        cuenta = histograma.acumulado_hasta(limite)
+        lineas.append(f"{nombre}_bucket{_etiquetas({**etiquetas, 'le': limite / 1e9})} {cuenta}")
+    lineas.append(f"{nombre}_bucket{_etiquetas({**etiquetas, 'le': '+Inf'})} {histograma.total}")
+    lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {histograma.suma / 1e9}")
+    lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {histograma.total}")
+
+class ExportadorMetricas:
+    """Servidor HTTP mínimo con /metrics en formato de texto de Prometheus.
+
+    Corre en el mismo bucle de eventos que el bot, así que lee las métricas
+    sin bloqueos; un scrape solo recorre contadores e histogramas en memoria.
+    """
+
+    def __init__(self):
+        self.servidor = None
+        self._vigilante = None
+        self.retraso_bucle = HistogramaLatencia()
+        self.ultimo_retraso = 0.0
+
+    def generar(self):
+        """Texto completo de la respuesta a /metrics"""
+        lineas = []
+        metricas = bot_metrics.metrics
+
+        _cabecera(lineas, 'plantas_bot_commands_total', 'counter', 'Comandos ejecutados')
+        for comando, cuenta in sorted(metricas["commands_usage"].items()):
+            lineas.append(f"plantas_bot_commands_total{_etiquetas({'command': comando})} {cuenta}")
+
+        _cabecera(lineas, 'plantas_bot_active_users', 'gauge', 'Usuarios activos hoy')
+        lineas.append(f"plantas_bot_active_users {bot_metrics.unique_users('dia')}")
+
+        _cabecera(lineas, 'plantas_bot_handler_latency_seconds', 'histogram',
+                  'Duración de los handlers por comando y fase')
+        for comando, fases in sorted(metricas["latency"].items()):
+            for nombre, histograma in sorted(fases.items()):
+                _histograma(lineas, 'plantas_bot_handler_latency_seconds', histograma,
+                            {'command': comando, 'phase': nombre})
+
+        _cabecera(lineas, 'plantas_bot_reminder_sweep_seconds', 'histogram',
+                  'Duración de cada revisión de riegos')
+        _histograma(lineas, 'plantas_bot_reminder_sweep_seconds',
+                    bot_metrics.operations["revision_riegos"])
+
+        _cabecera(lineas, 'plantas_bot_save_seconds', 'histogram',
+                  'Duración de cada escritura del backend de persistencia')
+        _histograma(lineas, 'plantas_bot_save_seconds', bot_metrics.operations["guardado"])
+        _cabecera(lineas, 'plantas_bot_save_bytes_total', 'counter', 'Bytes escritos por el backend')
+        lineas.append(f"plantas_bot_save_bytes_total {bot_metrics.saved_bytes}")
+
+        _cabecera(lineas, 'plantas_bot_records', 'gauge', 'Registros en memoria por tipo')
+        for tipo, cuenta in obtener_estadisticas().items():
+            lineas.append(f"plantas_bot_records{_etiquetas({'kind': tipo})} {cuenta}")
+
+        _cabecera(lineas, 'plantas_bot_event_loop_last_lag_seconds', 'gauge',
+                  'Último retraso medido del bucle de eventos')
+        lineas.append(f"plantas_bot_event_loop_last_lag_seconds {self.ultimo_retraso}")
+        _cabecera(lineas, 'plantas_bot_event_loop_lag_seconds', 'histogram',
+                  'Retrasos del bucle de eventos')
+        _histograma(lineas, 'plantas_bot_event_loop_lag_seconds', self.retraso_bucle)
+
+        return '\n'.join(lineas) + '\n'
+
+    async def _atender(self, lector, escritor):
+        """Responde a una petición HTTP/1.0 y cierra la conexión"""
+        try:
+            peticion = await asyncio.wait_for(lector.readline(), timeout=5)
+            # Se descartan las cabeceras
+            while (await asyncio.wait_for(lector.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+                pass
+            partes = peticion.decode('latin-1').split()
+            if len(partes) < 2 or partes[0] != 'GET':
+                estado, cuerpo = '405 Method Not Allowed', 'Solo GET\n'
+            elif partes[1].split('?')[0] != '/metrics':
+                estado, cuerpo = '404 Not Found', 'Use /metrics\n'
+            else:
+                estado, cuerpo = '200 OK', self.generar()
+            datos = cuerpo.encode('utf-8')
+            escritor.write(
+                f"HTTP/1.0 {estado}\r\nContent-Type: {TIPO_CONTENIDO}\r\n"
+                f"Content-Length: {len(datos)}\r\nConnection: close\r\n\r\n".encode('latin-1') + datos
+            )
+            await escritor.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Error atendiendo /metrics: {e}")
+        finally:
+            escritor.close()
+
+    async def _vigilar_bucle(self):
+        """Mide cuánto tarda el bucle en despertar tras cada espera"""
+        loop = asyncio.get_running_loop()
+        while True:
+            inicio = loop.time()
+            await asyncio.sleep(INTERVALO_RETRASO_S)
+            retraso = max(0.0, loop.time() - inicio - INTERVALO_RETRASO_S)
+            self.ultimo_retraso = retraso
+            self.retraso_bucle.registrar(int(retraso * 1e9))
+
+    async def iniciar(self, host=None, puerto=None):
+        """Abre el servidor en el bucle actual"""
+        host = host or Config.METRICS_HTTP_HOST
+        puerto = Config.METRICS_HTTP_PORT if puerto is None else puerto
+        self.servidor = await asyncio.start_server(self._atender, host, puerto)
+        self._vigilante = asyncio.get_running_loop().create_task(self._vigilar_bucle())
+        logger.info(f"Métricas de Prometheus en http://{host}:{self.puerto}/metrics")
+
+    @property
+    def puerto(self):
+        """Puerto en el que escucha (útil con puerto 0)"""
+        return self.servidor.sockets[0].getsockname()[1] if self.servidor else None
+
+    async def detener(self):
+        if self._vigilante is not None:
+            self._vigilante.cancel()
+            self._vigilante = None
+        if self.servidor is not None:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+            self.servidor = None
+
+# Instancia global
+exportador = ExportadorMetricas()
+
+async def iniciar_exportador(app):
+    """post_init: abre /metrics si METRICS_HTTP_PORT está configurado"""
+    if Config.METRICS_HTTP_PORT:
+        await exportador.iniciar()
@@ -0,0 +1,69 @@
+import base64
+import hashlib
+import math
+import zlib
+
+# 2^11 registros: unos 2 KB por boceto y un error típico del 2,3 %
+PRECISION = 11
+
+class HyperLogLog:
+    """Boceto HyperLogLog para contar elementos distintos con memoria fija.
+
+    Cada boceto ocupa 2^precision bytes sin importar cuántos elementos vea.
+    Dos bocetos con la misma precisión se pueden combinar (unión), así que
+    los de cada día se suman en semanas, meses o el total.
+    """
+
+    __slots__ = ('precision', 'registros')
+
+    def __init__(self, precision=PRECISION, registros=None):
+        self.precision = precision
+        self.registros = registros if registros is not None else bytearray(1 << precision)
+
+    def agregar(self, valor):
+        """Agrega un elemento (se usa su representación en texto)"""
+        h = int.from_bytes(hashlib.blake2b(str(valor).encode(), digest_size=8).digest(), 'big')
+        indice = h >> (64 - self.precision)
+        resto = h & ((1 << (64 - self.precision)) - 1)
+        # Posición del primer 1 en los bits restantes
+        rango = (64 - self.precision) - resto.bit_length() + 1
+        if rango > self.registros[indice]:
+            self.registros[indice] = rango
+
+    def combinar(self, otro):
+        """Une otro boceto a este (máximo de cada registro)"""
+        if otro.precision != self.precision:
+            raise ValueError("Solo se pueden combinar bocetos de la misma precisión")
+        self.registros = bytearray(map(max, self.registros, otro.registros))
+        return self
+
+    def estimar(self):
+        """Número aproximado de elementos distintos"""
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / sum(2.0 ** -r for r in self.registros)
+        vacios = self.registros.count(0)
+        if estimacion <= 2.5 * m and vacios:
+            # Rango pequeño: conteo lineal, exacto en la práctica
+            estimacion = m * math.log(m / vacios)
+        return int(round(estimacion))
+
+    def __len__(self):
+        return self.estimar()
+
+    def a_texto(self):
+        """Registros comprimidos en base64, para guardarlos en JSON"""
+        return base64.b64encode(zlib.compress(bytes(self.registros))).decode('ascii')
+
+    @classmethod
+    def desde_texto(cls, texto):
+        registros = bytearray(zlib.decompress(base64.b64decode(texto)))
+        return cls(int(math.log2(len(registros))), registros)
+
+    @classmethod
+    def unir(cls, bocetos):
+        """Nuevo boceto con la unión de varios"""
+        resultado = cls()
+        for boceto in bocetos:
+            resultado.combinar(boceto)
+        return resultado
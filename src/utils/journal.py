@@ -0,0 +1,90 @@
+import json
+import os
+
+from src.utils.serializer import deserializar, serializar
+
+class Diario:
+    """Diario de mutaciones de solo anexado: una línea JSON por cambio.
+
+    Cada entrada reemplaza el valor de un usuario (o de un dominio completo)
+    por lo que había en memoria al guardar, por lo que reproducirlas en orden
+    sobre la última instantánea reconstruye el estado exacto.
+    """
+
+    def __init__(self, ruta, default=None, sincronizar=True):
+        self.ruta = ruta
+        self.ruta_rotada = ruta + '.compactando'
+        # Serializador de los tipos que json no conoce
+        self.default = default
+        # fsync tras cada anexado: una entrada confirmada sobrevive a un corte de luz
+        self.sincronizar = sincronizar
+
+    def agregar(self, entradas):
+        """Anexa las entradas al final del diario. Devuelve los bytes escritos"""
+        lineas = b''.join(
+            serializar(entrada, default=self.default) + b'\n'
+            for entrada in entradas
+        )
+        with open(self.ruta, 'ab') as f:
+            f.write(lineas)
+            f.flush()
+            if self.sincronizar:
+                os.fsync(f.fileno())
+        return len(lineas)
+
+    def tamano(self):
+        """Tamaño en bytes del diario activo"""
+        try:
+            return os.path.getsize(self.ruta)
+        except FileNotFoundError:
+            return 0
+
+    def rotar(self):
+        """Aparta el diario activo para compactarlo y empieza uno nuevo"""
+        if not os.path.exists(self.ruta):
+            return
+        if not os.path.exists(self.ruta_rotada):
+            os.replace(self.ruta, self.ruta_rotada)
+            return
+        # Una compactación anterior falló: conservar sus entradas delante
+        with open(self.ruta, 'r', encoding='utf-8') as origen, \
+                open(self.ruta_rotada, 'a', encoding='utf-8') as destino:
+            destino.write(origen.read())
+        os.remove(self.ruta)
+
+    def reproducir(self):
+        """Recorre las entradas del diario rotado (si quedó uno) y del activo"""
+        return self._leer(self.ruta_rotada, self.ruta)
+
+    def reproducir_rotado(self):
+        """Recorre solo las entradas del diario rotado (para compactarlo)"""
+        return self._leer(self.ruta_rotada)
+
+    def _leer(self, *rutas):
+        for ruta in rutas:
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    for linea in f:
+                        try:
+                            yield deserializar(linea)
+                        except json.JSONDecodeError:
+                            # Última línea a medio escribir por un cierre abrupto
+                            print(f"Entrada de diario incompleta descartada en {ruta}")
+                            break
+            except FileNotFoundError:
+                continue
+
+    def descartar_rotado(self):
+        """Elimina el diario rotado una vez volcado en las instantáneas"""
+        try:
+            os.remove(self.ruta_rotada)
+        except FileNotFoundError:
+            pass
+
+    def descartar(self):
+        """Elimina el diario activo y el rotado"""
+        self.descartar_rotado()
+        try:
+            os.remove(self.ruta)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,174 @@
+import functools
+import math
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter_ns
+
+from telegram.request import HTTPXRequest
+
+# Buckets: los 8 primeros nanosegundos exactos y después 4 por potencia de 2
+# (error relativo máximo del 25 %) hasta unos 18 minutos
+SUBDIVISIONES = 4
+NUM_BUCKETS = 8 + (40 - 3) * SUBDIVISIONES
+
+def indice_bucket(ns):
+    """Bucket de una duración en nanosegundos"""
+    if ns < 8:
+        return max(ns, 0)
+    exponente = ns.bit_length() - 1
+    sub = (ns >> (exponente - 2)) & 3
+    return min(8 + (exponente - 3) * SUBDIVISIONES + sub, NUM_BUCKETS - 1)
+
+def limite_bucket(indice):
+    """Mayor duración (ns) que cae en un bucket"""
+    if indice < 8:
+        return indice
+    exponente = (indice - 8) // SUBDIVISIONES + 3
+    sub = (indice - 8) % SUBDIVISIONES
+    return ((4 + sub + 1) << (exponente - 2)) - 1
+
+class HistogramaLatencia:
+    """Histograma de duraciones con buckets fijos en escala logarítmica.
+
+    Ocupa lo mismo sin importar cuántas muestras tenga y dos histogramas se
+    combinan sumando sus buckets, así que se pueden acumular entre reinicios
+    o entre instancias.
+    """
+
+    __slots__ = ('cuentas', 'total', 'suma')
+
+    def __init__(self):
+        self.cuentas = [0] * NUM_BUCKETS
+        self.total = 0
+        # Suma de todas las duraciones en ns (para la media)
+        self.suma = 0
+
+    def registrar(self, ns):
+        self.cuentas[indice_bucket(ns)] += 1
+        self.total += 1
+        self.suma += ns
+
+    def combinar(self, otro):
+        for i, cuenta in enumerate(otro.cuentas):
+            if cuenta:
+                self.cuentas[i] += cuenta
+        self.total += otro.total
+        self.suma += otro.suma
+        return self
+
+    def percentil(self, q):
+        """Duración (ns, límite superior de su bucket) bajo la que queda la
+        fracción q de las muestras. 0 si no hay muestras"""
+        if not self.total:
+            return 0
+        objetivo = max(1, math.ceil(q * self.total))
+        acumulado = 0
+        for i, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return limite_bucket(i)
+        return limite_bucket(NUM_BUCKETS - 1)
+
+    def acumulado_hasta(self, ns):
+        """Muestras hasta el bucket que contiene ns, incluido. Es el número
+        exacto de muestras ≤ limite_bucket(indice_bucket(ns)), que puede ser
+        algo mayor que ns"""
+        return sum(self.cuentas[:indice_bucket(ns) + 1])
+
+    def resumen(self):
+        """p50, p95 y p99 en milisegundos más el número de muestras"""
+        return {
+            'count': self.total,
+            'p50_ms': self.percentil(0.50) / 1e6,
+            'p95_ms': self.percentil(0.95) / 1e6,
+            'p99_ms': self.percentil(0.99) / 1e6,
+        }
+
+    def a_json(self):
+        """Forma compacta: solo los buckets con muestras"""
+        return {
+            'buckets': {str(i): c for i, c in enumerate(self.cuentas) if c},
+            'sum_ns': self.suma,
+        }
+
+    @classmethod
+    def desde_json(cls, datos):
+        histograma = cls()
+        for indice, cuenta in datos.get('buckets', {}).items():
+            histograma.cuentas[min(int(indice), NUM_BUCKETS - 1)] += cuenta
+            histograma.total += cuenta
+        histograma.suma = datos.get('sum_ns', 0)
+        return histograma
+
+class MedicionFases:
+    """Tiempo acumulado por fase durante un handler"""
+
+    __slots__ = ('fases', 'abiertas')
+
+    def __init__(self):
+        self.fases = {}
+        self.abiertas = set()
+
+# Medición del handler en curso (cada actualización corre en su propia tarea)
+_medicion_actual = ContextVar('medicion_actual', default=None)
+
+def iniciar_medicion():
+    """Empieza a acumular fases en la tarea actual. Devuelve (medición, token)"""
+    medicion = MedicionFases()
+    return medicion, _medicion_actual.set(medicion)
+
+def terminar_medicion(token):
+    _medicion_actual.reset(token)
+
+@contextmanager
+def fase(nombre):
+    """Suma la duración del bloque a una fase del handler en curso. Fuera de
+    un handler, o dentro de la misma fase (llamadas anidadas), no mide nada"""
+    medicion = _medicion_actual.get()
+    if medicion is None or nombre in medicion.abiertas:
+        yield
+        return
+    medicion.abiertas.add(nombre)
+    inicio = perf_counter_ns()
+    try:
+        yield
+    finally:
+        medicion.abiertas.discard(nombre)
+        medicion.fases[nombre] = medicion.fases.get(nombre, 0) + perf_counter_ns() - inicio
+
+@contextmanager
+def cronometrar(registrar):
+    """Llama a registrar(ns) con la duración del bloque, aunque falle"""
+    inicio = perf_counter_ns()
+    try:
+        yield
+    finally:
+        registrar(perf_counter_ns() - inicio)
+
+def medir_fase(nombre):
+    """Decorador de funciones síncronas con fase(nombre)"""
+    def decorador(func):
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            with fase(nombre):
+                return func(*args, **kwargs)
+        return envoltura
+    return decorador
+
+# Conexiones simultáneas con la Bot API, las mismas que usa ApplicationBuilder
+# por defecto (HTTPXRequest solo abre 1): los handlers concurrentes y el
+# reparto de recordatorios no deben esperar turno en el pool
+CONEXIONES_BOT_API = 256
+
+class SolicitudMedida(HTTPXRequest):
+    """Peticiones a la Bot API que cuentan como fase 'network' del handler
+    que las hace (p. ej. reply_text)"""
+
+    __slots__ = ()
+
+    def __init__(self, connection_pool_size=CONEXIONES_BOT_API, **kwargs):
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+
+    async def do_request(self, *args, **kwargs):
+        with fase('network'):
+            return await super().do_request(*args, **kwargs)
@@ -0,0 +1,103 @@
+import fcntl
+import json
+import os
+import socket
+import time
+import uuid
+
+from src.config import Config
+
+ARCHIVO_LIDER = 'lider.lock'
+
+class EleccionLider:
+    """Elección de líder entre procesos de la misma máquina mediante un
+    archivo de arrendamiento en DATA_DIR.
+
+    El archivo guarda quién es el líder y hasta cuándo vale su arrendamiento.
+    Cada lectura y escritura se hace con un flock exclusivo, así que dos
+    procesos nunca se lo quedan a la vez. El líder lo renueva periódicamente
+    (latido); si deja de hacerlo (proceso caído o colgado) el arrendamiento
+    caduca y otro proceso lo toma. Un líder que descubre que otro tomó el
+    arrendamiento deja de serlo.
+    """
+
+    def __init__(self, ruta=None, duracion=None):
+        self._ruta = ruta
+        self.duracion = Config.LEADER_LEASE_S if duracion is None else duracion
+        self.identificador = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Hasta cuándo somos líder según nuestro último latido (0 = no lo somos)
+        self.expira = 0.0
+        # Identificador del líder visto en el último intento
+        self.lider_actual = None
+
+    @property
+    def ruta(self):
+        return self._ruta or os.path.join(Config.DATA_DIR, ARCHIVO_LIDER)
+
+    def _con_archivo(self, operacion):
+        """Ejecuta operacion(actual) -> nuevo con el archivo bloqueado. Si
+        devuelve algo distinto de None, se escribe como nuevo contenido"""
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            contenido = os.read(fd, 4096)
+            try:
+                actual = json.loads(contenido) if contenido else {}
+            except ValueError:
+                actual = {}
+            nuevo = operacion(actual)
+            if nuevo is not None:
+                datos = json.dumps(nuevo).encode('utf-8')
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, datos)
+                os.fsync(fd)
+            return actual
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def renovar(self, ahora=None):
+        """Toma o renueva el arrendamiento si está libre, caducado o ya es
+        nuestro. Devuelve True si somos el líder"""
+        ahora = time.time() if ahora is None else ahora
+        resultado = {}
+
+        def operacion(actual):
+            libre = not actual or actual.get('expira', 0) <= ahora
+            if libre or actual.get('id') == self.identificador:
+                resultado['expira'] = ahora + self.duracion
+                return {'id': self.identificador, 'pid': os.getpid(), 'expira': resultado['expira']}
+            return None
+
+        actual = self._con_archivo(operacion)
+        self.expira = resultado.get('expira', 0.0)
+        self.lider_actual = self.identificador if self.expira else actual.get('id')
+        return bool(self.expira)
+
+    def soltar(self):
+        """Libera el arrendamiento para que otro proceso lo tome sin esperar"""
+        if not self.expira:
+            return
+        self.expira = 0.0
+        self._con_archivo(lambda actual: {} if actual.get('id') == self.identificador else None)
+
+    def vigente(self, ahora=None):
+        """True si nuestro último latido sigue vigente (sin acceder al disco)"""
+        ahora = time.time() if ahora is None else ahora
+        return ahora < self.expira
+
+    def esperar(self, intervalo=None, dormir=time.sleep):
+        """Bloquea (reserva en caliente) hasta conseguir el liderazgo"""
+        intervalo = Config.LEADER_HEARTBEAT_S if intervalo is None else intervalo
+        while not self.renovar():
+            dormir(intervalo)
+
+# Elección compartida por el arranque del bot y los jobs
+lider = EleccionLider()
+
+def es_lider():
+    """True si este proceso debe ejecutar los jobs y escribir los datos.
+    Sin LEADER_ELECTION siempre lo es"""
+    return not Config.LEADER_ELECTION or lider.vigente()
@@ -0,0 +1,102 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from telegram.ext import BaseUpdateProcessor
+
+class _CandadoUsuario:
+    """Candado de un usuario, reentrante para la tarea que lo tiene"""
+
+    __slots__ = ('candado', 'dueno', 'profundidad', 'usos')
+
+    def __init__(self):
+        self.candado = asyncio.Lock()
+        self.dueno = None
+        self.profundidad = 0
+        # Tareas que lo tienen o lo esperan; al llegar a 0 se descarta
+        self.usos = 0
+
+class GestorBloqueos:
+    """Turnos asyncio por user_id para atender en orden las actualizaciones
+    de cada usuario.
+
+    El procesador toma bloqueos.turno(user_id) durante toda la actualización,
+    respuestas incluidas, así que los handlers de un mismo usuario (y sus
+    conversaciones) nunca se mezclan. Los datos no necesitan otro candado:
+    las funciones de repository y la copia del guardado diferido son
+    síncronas y corren en el bucle de eventos, de modo que ninguna se
+    intercala a mitad de otra.
+    """
+
+    def __init__(self):
+        self._bucle = None
+        self._turnos = {}
+
+    def _preparar(self):
+        """Descarta los candados de otro bucle (las pruebas usan uno
+        distinto en cada asyncio.run)"""
+        bucle = asyncio.get_running_loop()
+        if self._bucle is not bucle:
+            self._bucle = bucle
+            self._turnos = {}
+
+    def bloqueados(self):
+        """Usuarios con un turno tomado o pedido"""
+        return list(self._turnos)
+
+    @asynccontextmanager
+    async def turno(self, user_id):
+        """Atiende en orden las actualizaciones de un usuario. Sin user_id no
+        bloquea nada"""
+        if user_id is None:
+            yield
+            return
+        self._preparar()
+        tarea = asyncio.current_task()
+        entrada = self._turnos.get(user_id)
+        if entrada is not None and entrada.dueno is tarea:
+            entrada.profundidad += 1
+            try:
+                yield
+            finally:
+                entrada.profundidad -= 1
+            return
+
+        entrada = self._turnos.setdefault(user_id, _CandadoUsuario())
+        entrada.usos += 1
+        try:
+            async with entrada.candado:
+                entrada.dueno = tarea
+                try:
+                    yield
+                finally:
+                    entrada.dueno = None
+        finally:
+            entrada.usos -= 1
+            if not entrada.usos:
+                del self._turnos[user_id]
+
+# Gestor compartido por el procesador de actualizaciones
+bloqueos = GestorBloqueos()
+
+class ProcesadorPorUsuario(BaseUpdateProcessor):
+    """Procesa actualizaciones en paralelo salvo las del mismo usuario, que
+    se atienden en orden. Así las conversaciones (ConversationHandler) y las
+    modificaciones de cada usuario no se mezclan"""
+
+    __slots__ = ()
+
+    async def process_update(self, update, coroutine):
+        usuario = getattr(update, 'effective_user', None)
+        # Primero el turno y después la plaza: una actualización que espera a
+        # otra del mismo usuario no ocupa una plaza que podría usar otro
+        async with bloqueos.turno(usuario.id if usuario else None):
+            await super().process_update(update, coroutine)
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -1,24 +1,97 @@
+import asyncio
+import gzip
 import json
 import os
-from datetime import datetime, date
-from collections import defaultdict
+from datetime import datetime, date, timedelta
+from collections import defaultdict, deque
+
+from src.config import Config
+from src.utils.atomic import escribir_atomico
+from src.utils.hyperloglog import HyperLogLog
+from src.utils.latency import HistogramaLatencia
+from src.utils.leader import es_lider
+from src.utils.serializer import deserializar, serializar
+
+# Modo 'hll': bocetos que se conservan por periodo (los más recientes)
+RETENCION_BOCETOS = {"dia": 31, "semana": 12, "mes": 24}
+
+def claves_periodo(fecha):
+    """Clave de día, semana ISO y mes de una fecha"""
+    anio, semana, _ = fecha.isocalendar()
+    return {"dia": fecha.isoformat(), "semana": f"{anio}-W{semana:02d}", "mes": fecha.strftime("%Y-%m")}
+
+# Días de contadores de errores que se conservan en metrics.json
+RETENCION_CONTADORES_ERRORES = 90
+
+def _dia_de_error(error):
+    return str(error.get("timestamp", ""))[:10]
+
+def archivar_errores(directorio, errores, retencion_dias):
+    """Anexa errores a los segmentos comprimidos de su día
+    (errores-AAAA-MM-DD.jsonl.gz) y borra los segmentos más antiguos que la
+    retención"""
+    os.makedirs(directorio, exist_ok=True)
+    por_dia = defaultdict(list)
+    for error in errores:
+        por_dia[_dia_de_error(error)].append(error)
+    for dia, lista in por_dia.items():
+        lineas = b"".join(json.dumps(e, ensure_ascii=False).encode("utf-8") + b"\n" for e in lista)
+        # Cada anexo es un miembro gzip nuevo; gzip.open los lee seguidos
+        with gzip.open(os.path.join(directorio, f"errores-{dia}.jsonl.gz"), "ab") as f:
+            f.write(lineas)
+    
+    limite = f"errores-{(date.today() - timedelta(days=retencion_dias)).isoformat()}"
+    for nombre in os.listdir(directorio):
+        if nombre.startswith("errores-") and nombre < limite:
+            os.remove(os.path.join(directorio, nombre))
 
 class BotMetrics:
-    def __init__(self, metrics_file="data/metrics.json"):
+    def __init__(self, metrics_file="data/metrics.json", flush_interval=None, unique_mode=None):
         self.metrics_file = metrics_file
-        self.metrics = {
+        # 'exact': sets de user_id por día; 'hll': solo el día actual exacto
+        # y bocetos HyperLogLog por día, semana, mes y total
+        self.unique_mode = (unique_mode or Config.METRICS_UNIQUE_MODE).lower()
+        self.sketches = {"total": HyperLogLog(), "dia": {}, "semana": {}, "mes": {}}
+        # Segundos entre volcados a disco (0 = guardar en cada registro)
+        self.flush_interval = Config.METRICS_FLUSH_S if flush_interval is None else flush_interval
+        # Hay cambios en memoria que aún no están en el archivo
+        self._pendiente = False
+        # Errores que salieron del búfer y esperan a escribirse en su segmento
+        self._errores_desbordados = []
+        self.errors_dir = os.path.join(os.path.dirname(metrics_file), "errores")
+        # Duraciones de operaciones internas (guardado, revisión de riegos) y
+        # bytes guardados: solo en memoria, para el endpoint /metrics
+        self.operations = defaultdict(HistogramaLatencia)
+        self.saved_bytes = 0
+        self.metrics = self._metricas_vacias()
+        self.load_metrics()
+    
+    def recargar(self):
+        """Descarta las métricas en memoria y vuelve a leer el archivo (al
+        tomar el liderazgo, el líder anterior ya escribió las suyas)"""
+        self.sketches = {"total": HyperLogLog(), "dia": {}, "semana": {}, "mes": {}}
+        self._pendiente = False
+        self._errores_desbordados = []
+        self.metrics = self._metricas_vacias()
+        self.load_metrics()
+    
+    def _metricas_vacias(self):
+        return {
             "commands_usage": defaultdict(int),
             "daily_active_users": defaultdict(set),
             "total_users": set(),
-            "errors": []
+            # Búfer circular con los errores más recientes
+            "errors": deque(maxlen=max(Config.METRICS_ERROR_BUFFER, 0)),
+            "errors_per_day": defaultdict(int),
+            # comando -> fase -> histograma de duraciones
+            "latency": defaultdict(lambda: defaultdict(HistogramaLatencia))
         }
-        self.load_metrics()
     
     def load_metrics(self):
         """Carga métricas desde archivo"""
         try:
-            with open(self.metrics_file, 'r', encoding='utf-8') as f:
-                loaded_data = json.load(f)
+            with open(self.metrics_file, 'rb') as f:
+                loaded_data = deserializar(f.read())
             
             if "daily_active_users" in loaded_data:
                 self.metrics["daily_active_users"] = defaultdict(set)
@@ -27,58 +100,265 @@ class BotMetrics:
             
             if "total_users" in loaded_data:
                 self.metrics["total_users"] = set(loaded_data["total_users"])
+            
+            # Los contadores se acumulan entre reinicios en lugar de empezar de cero
+            if "commands_usage" in loaded_data:
+                self.metrics["commands_usage"] = defaultdict(int, loaded_data["commands_usage"])
+            
+            if self.unique_mode == "hll":
+                self._cargar_bocetos(loaded_data.get("unique_sketches", {}))
+            
+            self._cargar_errores(loaded_data.get("errors", []), loaded_data.get("errors_per_day"))
+            
+            for command, fases in loaded_data.get("latency", {}).items():
+                for nombre, datos in fases.items():
+                    self.metrics["latency"][command][nombre].combinar(HistogramaLatencia.desde_json(datos))
                 
         except Exception as e:
-            self.metrics = {
-                "commands_usage": defaultdict(int),
-                "daily_active_users": defaultdict(set),
-                "total_users": set(),
-                "errors": []
-            }
+            self.metrics = self._metricas_vacias()
     
-    def save_metrics(self):
-        """Guarda métricas en archivo"""
-        # Convertir sets a listas para JSON
-        metrics_to_save = {
+    def _cargar_errores(self, errores, por_dia):
+        """Llena el búfer con los errores más recientes. Los que no caben (p. ej.
+        una lista antigua sin límite) se archivan en el próximo volcado"""
+        if por_dia is None:
+            # Archivo anterior sin contadores: se calculan una vez
+            por_dia = defaultdict(int)
+            for error in errores:
+                por_dia[_dia_de_error(error)] += 1
+        self.metrics["errors_per_day"] = defaultdict(int, por_dia)
+        
+        buffer = self.metrics["errors"]
+        sobrantes = len(errores) - buffer.maxlen
+        if sobrantes > 0:
+            self._errores_desbordados.extend(errores[:sobrantes])
+            self._pendiente = True
+        buffer.extend(errores[max(sobrantes, 0):])
+    
+    def _cargar_bocetos(self, guardados):
+        """Lee los bocetos guardados y pasa a ellos los sets exactos de días
+        anteriores (p. ej. al cambiar de modo 'exact' a 'hll')"""
+        if "total" in guardados:
+            self.sketches["total"] = HyperLogLog.desde_texto(guardados["total"])
+        for periodo in RETENCION_BOCETOS:
+            for clave, texto in guardados.get(periodo, {}).items():
+                self.sketches[periodo][clave] = HyperLogLog.desde_texto(texto)
+        
+        hoy = date.today().isoformat()
+        for date_str, users in list(self.metrics["daily_active_users"].items()):
+            if date_str != hoy:
+                fecha = date.fromisoformat(date_str)
+                for user_id in users:
+                    self._agregar_a_bocetos(user_id, fecha)
+                del self.metrics["daily_active_users"][date_str]
+        for user_id in self.metrics["total_users"]:
+            self.sketches["total"].agregar(user_id)
+        self.metrics["total_users"] = set()
+        self._podar_bocetos()
+    
+    def _agregar_a_bocetos(self, user_id, fecha):
+        self.sketches["total"].agregar(user_id)
+        for periodo, clave in claves_periodo(fecha).items():
+            boceto = self.sketches[periodo].get(clave)
+            if boceto is None:
+                boceto = self.sketches[periodo][clave] = HyperLogLog()
+            boceto.agregar(user_id)
+    
+    def _podar_bocetos(self):
+        """Descarta los bocetos más antiguos de cada periodo"""
+        for periodo, conservar in RETENCION_BOCETOS.items():
+            bocetos = self.sketches[periodo]
+            for clave in sorted(bocetos)[:-conservar]:
+                del bocetos[clave]
+    
+    def _instantanea(self):
+        """Copia serializable de las métricas (convierte sets a listas)"""
+        instantanea = {
             "commands_usage": dict(self.metrics["commands_usage"]),
             "daily_active_users": {k: list(v) for k, v in self.metrics["daily_active_users"].items()},
-            "errors": self.metrics["errors"],
-            "total_users": list(self.metrics["total_users"])
+            "errors": list(self.metrics["errors"]),
+            "errors_per_day": self._contadores_errores(),
+            "latency": {
+                command: {nombre: h.a_json() for nombre, h in fases.items()}
+                for command, fases in self.metrics["latency"].items()
+            },
         }
-        
-        os.makedirs(os.path.dirname(self.metrics_file), exist_ok=True)
-        with open(self.metrics_file, 'w', encoding='utf-8') as f:
-            json.dump(metrics_to_save, f, indent=2, ensure_ascii=False)
+        if self.unique_mode == "hll":
+            instantanea["unique_sketches"] = {"total": self.sketches["total"].a_texto()}
+            for periodo in RETENCION_BOCETOS:
+                instantanea["unique_sketches"][periodo] = {
+                    clave: boceto.a_texto() for clave, boceto in self.sketches[periodo].items()
+                }
+        else:
+            instantanea["total_users"] = list(self.metrics["total_users"])
+        return instantanea
+    
+    def _contadores_errores(self):
+        """Contadores de errores por día de los últimos días"""
+        limite = (date.today() - timedelta(days=RETENCION_CONTADORES_ERRORES)).isoformat()
+        por_dia = self.metrics["errors_per_day"]
+        for dia in [d for d in por_dia if d < limite]:
+            del por_dia[dia]
+        return dict(por_dia)
+    
+    def _tomar_desbordados(self):
+        desbordados, self._errores_desbordados = self._errores_desbordados, []
+        return desbordados
+    
+    def _escribir(self, metrics_to_save, desbordados=()):
+        if desbordados:
+            archivar_errores(self.errors_dir, desbordados, Config.METRICS_ERROR_RETENTION_DAYS)
+        os.makedirs(os.path.dirname(self.metrics_file) or '.', exist_ok=True)
+        escribir_atomico({self.metrics_file: serializar(metrics_to_save)}, conservar_anterior=False)
+    
+    def save_metrics(self):
+        """Guarda métricas en archivo"""
+        if not es_lider():
+            # Solo el líder escribe; una instancia que perdió el liderazgo
+            # no pisa las métricas del nuevo
+            return
+        self._pendiente = False
+        desbordados = self._tomar_desbordados()
+        try:
+            self._escribir(self._instantanea(), desbordados)
+        except Exception:
+            self._errores_desbordados[:0] = desbordados
+            raise
+    
+    def _registrado(self):
+        """Anota que hay cambios; sin intervalo de volcado se guardan ya"""
+        self._pendiente = True
+        if not self.flush_interval:
+            self.save_metrics()
+    
+    def flush(self):
+        """Guarda las métricas si cambiaron desde el último volcado"""
+        if self._pendiente:
+            self.save_metrics()
+    
+    async def flush_async(self):
+        """Como flush, pero escribe desde un hilo para no frenar el bucle.
+        La copia se toma en el bucle, así que no compite con los registros"""
+        if not self._pendiente or not es_lider():
+            return
+        self._pendiente = False
+        desbordados = self._tomar_desbordados()
+        try:
+            await asyncio.to_thread(self._escribir, self._instantanea(), desbordados)
+        except Exception as e:
+            self._pendiente = True
+            self._errores_desbordados[:0] = desbordados
+            print(f"Error guardando métricas: {e}")
     
     def record_command_usage(self, user_id, command):
         """Registra el uso de un comando"""
         today = date.today().isoformat()
         self.metrics["commands_usage"][command] += 1
-        self.metrics["daily_active_users"][today].add(user_id)
-        self.metrics["total_users"].add(user_id)
-        self.save_metrics()
+        if self.unique_mode == "hll":
+            self._registrar_usuario_hll(user_id, today)
+        else:
+            self.metrics["daily_active_users"][today].add(user_id)
+            self.metrics["total_users"].add(user_id)
+        self._registrado()
+    
+    def _registrar_usuario_hll(self, user_id, today):
+        activos = self.metrics["daily_active_users"]
+        if today not in activos:
+            # Nuevo día: el set exacto del anterior ya está en los bocetos
+            activos.clear()
+            self._podar_bocetos()
+        if user_id not in activos[today]:
+            activos[today].add(user_id)
+            self._agregar_a_bocetos(user_id, date.fromisoformat(today))
+    
+    def unique_users(self, periodo="total"):
+        """Usuarios distintos del día, la semana o el mes actuales, o en total
+        (aproximado en modo 'hll', salvo el día)"""
+        hoy = date.today()
+        activos = self.metrics["daily_active_users"]
+        if periodo == "dia":
+            return len(activos.get(hoy.isoformat(), ()))
+        if self.unique_mode == "hll":
+            if periodo == "total":
+                return self.sketches["total"].estimar()
+            boceto = self.sketches[periodo].get(claves_periodo(hoy)[periodo])
+            return boceto.estimar() if boceto else 0
+        if periodo == "total":
+            return len(self.metrics["total_users"])
+        clave = claves_periodo(hoy)[periodo]
+        usuarios = set()
+        for date_str, users in activos.items():
+            if claves_periodo(date.fromisoformat(date_str))[periodo] == clave:
+                usuarios |= users
+        return len(usuarios)
     
     def record_error(self, user_id, command, error_msg):
         """Registra un error"""
-        self.metrics["errors"].append({
+        error = {
             "timestamp": datetime.now().isoformat(),
             "user_id": user_id,
             "command": command,
             "error": error_msg
-        })
-        self.save_metrics()
+        }
+        buffer = self.metrics["errors"]
+        if not buffer.maxlen:
+            # Sin búfer (METRICS_ERROR_BUFFER=0): se archiva directamente
+            self._errores_desbordados.append(error)
+        elif len(buffer) == buffer.maxlen:
+            # El más antiguo sale del búfer y se archiva en su segmento
+            self._errores_desbordados.append(buffer[0])
+        buffer.append(error)
+        self.metrics["errors_per_day"][_dia_de_error(error)] += 1
+        self._registrado()
+    
+    def record_latency(self, command, total_ns, fases=None):
+        """Registra la duración de un handler y la de cada una de sus fases
+        (validation, storage, network) en nanosegundos"""
+        histogramas = self.metrics["latency"][command]
+        histogramas["total"].registrar(total_ns)
+        for nombre, ns in (fases or {}).items():
+            histogramas[nombre].registrar(ns)
+        self._registrado()
+    
+    def record_operation(self, nombre, ns):
+        """Registra la duración de una operación interna (no se persiste)"""
+        self.operations[nombre].registrar(ns)
+    
+    def record_save(self, ns, bytes_escritos):
+        """Registra una escritura del backend de persistencia"""
+        self.record_operation("guardado", ns)
+        self.saved_bytes += bytes_escritos
+    
+    def latency_percentiles(self, command=None):
+        """p50/p95/p99 por fase de un comando, o de todos (comando -> fase)"""
+        if command is not None:
+            return {nombre: h.resumen() for nombre, h in self.metrics["latency"].get(command, {}).items()}
+        return {c: self.latency_percentiles(c) for c in self.metrics["latency"]}
+    
+    def errors_for_day(self, dia):
+        """Errores de un día (AAAA-MM-DD): los archivados en su segmento más
+        los que siguen en memoria"""
+        errores = []
+        ruta = os.path.join(self.errors_dir, f"errores-{dia}.jsonl.gz")
+        if os.path.exists(ruta):
+            with gzip.open(ruta, "rt", encoding="utf-8") as f:
+                errores.extend(json.loads(linea) for linea in f if linea.strip())
+        pendientes = self._errores_desbordados + list(self.metrics["errors"])
+        errores.extend(e for e in pendientes if _dia_de_error(e) == dia)
+        return errores
     
     def get_usage_report(self):
         """Genera reporte de uso"""
         total_commands = sum(self.metrics["commands_usage"].values())
-        total_users = len(self.metrics["total_users"])
+        total_users = self.unique_users("total")
         
         report = f"""
 📊 **REPORTE DE USO DEL BOT**
 
 👥 **Usuarios:**
 - Total de usuarios: {total_users}
-- Usuarios activos hoy: {len(self.metrics["daily_active_users"].get(date.today().isoformat(), []))}
+- Usuarios activos hoy: {self.unique_users("dia")}
+- Usuarios activos esta semana: {self.unique_users("semana")}
+- Usuarios activos este mes: {self.unique_users("mes")}
 
 🔧 **Comandos más usados:**
 """
@@ -93,12 +373,26 @@ class BotMetrics:
             percentage = (count / total_commands * 100) if total_commands > 0 else 0
             report += f"- {command}: {count} veces ({percentage:.1f}%)\n"
         
-        recent_errors = [e for e in self.metrics["errors"] 
-                        if datetime.fromisoformat(e["timestamp"]).date() == date.today()]
+        if self.metrics["latency"]:
+            report += "\n⏱️ **Latencia (p50 / p95 / p99):**\n"
+            mas_lentos = sorted(
+                self.metrics["latency"].items(),
+                key=lambda x: x[1]["total"].percentil(0.95),
+                reverse=True
+            )
+            for command, fases in mas_lentos[:10]:
+                r = fases["total"].resumen()
+                report += f"- {command}: {r['p50_ms']:.1f} / {r['p95_ms']:.1f} / {r['p99_ms']:.1f} ms\n"
         
-        report += f"\n❌ Errores hoy: {len(recent_errors)}"
+        errores_hoy = self.metrics["errors_per_day"].get(date.today().isoformat(), 0)
+        
+        report += f"\n❌ Errores hoy: {errores_hoy}"
         
         return report
 
 # Instancia global de métricas
-bot_metrics = BotMetrics()
\ No newline at end of file
+bot_metrics = BotMetrics()
+
+async def volcar_metricas(context):
+    """Job periódico que escribe las métricas acumuladas"""
+    await bot_metrics.flush_async()
\ No newline at end of file
@@ -0,0 +1,122 @@
+import os
+import time
+
+from src.config import Config
+from src.utils.atomic import escribir_atomico, leer_json_con_respaldo
+from src.utils.serializer import serializar
+
+ARCHIVO_BANDEJA = 'bandeja_salida.json'
+
+# Los avisos ya enviados se recuerdan este tiempo para no repetirlos
+RETENCION_ENVIADOS_S = 7 * 24 * 3600
+
+def clave_aviso(user_id, planta, vence):
+    """Clave de idempotencia de un recordatorio"""
+    return (user_id, planta, vence)
+
+class BandejaSalida:
+    """Bandeja de salida persistente de los recordatorios.
+
+    Cada aviso se identifica por (user_id, planta, fecha de vencimiento) y
+    pasa por tres listas: pendientes (con sus intentos y la hora del
+    siguiente), enviados y descartados tras agotar los intentos. La bandeja
+    se escribe de forma atómica antes de enviar y después de cada ronda, así
+    que al reiniciar se retoman los pendientes y no se repiten los enviados.
+    """
+
+    def __init__(self, ruta, max_intentos=None, espera_base=None):
+        self.ruta = ruta
+        self.max_intentos = Config.OUTBOX_MAX_ATTEMPTS if max_intentos is None else max_intentos
+        self.espera_base = Config.OUTBOX_BACKOFF_S if espera_base is None else espera_base
+        self.pendientes = {}
+        self.enviados = {}
+        self.descartados = {}
+        self._modificada = False
+        self._cargar()
+
+    def _cargar(self):
+        contenido = leer_json_con_respaldo(self.ruta) or {}
+        for nombre in ('pendientes', 'enviados', 'descartados'):
+            lista = getattr(self, nombre)
+            for aviso in contenido.get(nombre, []):
+                lista[clave_aviso(aviso['user_id'], aviso['planta'], aviso['vence'])] = aviso
+
+    def guardar(self):
+        """Escribe la bandeja completa si cambió (es pequeña: solo avisos
+        recientes)"""
+        if not self._modificada:
+            return
+        contenido = {nombre: list(getattr(self, nombre).values())
+                     for nombre in ('pendientes', 'enviados', 'descartados')}
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        escribir_atomico({self.ruta: serializar(contenido)})
+        self._modificada = False
+
+    def encolar(self, user_id, planta, vence, ahora=None):
+        """Agrega un aviso si no estaba pendiente ni enviado. Uno descartado
+        vuelve a la cola con sus intentos desde cero. Devuelve True si se
+        encoló"""
+        clave = clave_aviso(user_id, planta, vence)
+        if clave in self.pendientes or clave in self.enviados:
+            return False
+        self.descartados.pop(clave, None)
+        self.pendientes[clave] = {
+            'user_id': user_id, 'planta': planta, 'vence': vence,
+            'intentos': 0, 'proximo_intento': time.time() if ahora is None else ahora, 'error': None,
+        }
+        self._modificada = True
+        return True
+
+    def listos(self, ahora=None):
+        """Avisos pendientes cuyo siguiente intento ya llegó"""
+        ahora = time.time() if ahora is None else ahora
+        return [aviso for aviso in self.pendientes.values() if aviso['proximo_intento'] <= ahora]
+
+    def confirmar(self, clave, ahora=None):
+        """Marca un aviso como enviado"""
+        aviso = self.pendientes.pop(clave, None)
+        if aviso is not None:
+            aviso['enviado'] = time.time() if ahora is None else ahora
+            self.enviados[clave] = aviso
+            self._modificada = True
+
+    def cancelar(self, clave):
+        """Olvida un aviso pendiente que ya no hace falta enviar"""
+        if self.pendientes.pop(clave, None) is not None:
+            self._modificada = True
+
+    def fallar(self, clave, error, ahora=None):
+        """Registra un intento fallido: se reintenta con espera exponencial o
+        pasa a descartados al agotar los intentos. Devuelve True si se descartó"""
+        aviso = self.pendientes.get(clave)
+        if aviso is None:
+            return False
+        ahora = time.time() if ahora is None else ahora
+        self._modificada = True
+        aviso['intentos'] += 1
+        aviso['error'] = str(error)
+        if aviso['intentos'] >= self.max_intentos:
+            del self.pendientes[clave]
+            aviso['descartado'] = ahora
+            self.descartados[clave] = aviso
+            return True
+        aviso['proximo_intento'] = ahora + self.espera_base * 2 ** (aviso['intentos'] - 1)
+        return False
+
+    def purgar(self, ahora=None):
+        """Olvida los enviados y descartados antiguos"""
+        limite = (time.time() if ahora is None else ahora) - RETENCION_ENVIADOS_S
+        for lista, campo in ((self.enviados, 'enviado'), (self.descartados, 'descartado')):
+            for clave in [c for c, aviso in lista.items() if aviso.get(campo, 0) < limite]:
+                del lista[clave]
+                self._modificada = True
+
+_bandeja = None
+
+def obtener_bandeja():
+    """Bandeja de salida del directorio de datos actual"""
+    global _bandeja
+    ruta = os.path.join(Config.DATA_DIR, ARCHIVO_BANDEJA)
+    if _bandeja is None or _bandeja.ruta != ruta:
+        _bandeja = BandejaSalida(ruta)
+    return _bandeja
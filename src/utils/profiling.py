@@ -0,0 +1,146 @@
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+from datetime import datetime
+
+# Funciones que se listan en el informe de perfil (por tiempo acumulado y propio)
+TOP_FUNCIONES = 40
+# Líneas que se listan en la comparación de memoria
+TOP_LINEAS = 25
+# Marcos que guarda tracemalloc por asignación
+MARCOS_MEMORIA = 10
+# Las asignaciones propias son las que pasan por un archivo de src/
+SEPARADOR_SRC = os.sep + 'src' + os.sep
+
+class PerfilEnCurso:
+    """Perfil de cProfile sobre el bucle de eventos (todos los handlers y
+    jobs que corren mientras está activo), hasta N actualizaciones o N
+    segundos"""
+
+    def __init__(self, tipo, cantidad, chat_id, update_id=None):
+        self.tipo = tipo
+        self.cantidad = cantidad
+        self.chat_id = chat_id
+        # La actualización del propio /perfil no cuenta
+        self.update_id = update_id
+        self.actualizaciones = 0
+        self.inicio = datetime.now()
+        self.perfil = cProfile.Profile()
+        self.perfil.enable()
+
+    def contar(self, update_id):
+        """Cuenta una actualización atendida. True si ya se alcanzó el límite"""
+        if self.tipo != 'actualizaciones' or update_id == self.update_id:
+            return False
+        self.actualizaciones += 1
+        return self.actualizaciones >= self.cantidad
+
+    def terminar(self):
+        """Detiene el perfil y devuelve el informe en texto"""
+        self.perfil.disable()
+        duracion = (datetime.now() - self.inicio).total_seconds()
+        salida = io.StringIO()
+        salida.write(f"Perfil de {duracion:.1f} s, {self.actualizaciones} actualización(es)\n\n")
+        estadisticas = pstats.Stats(self.perfil, stream=salida).strip_dirs()
+        for orden in ('cumulative', 'tottime'):
+            salida.write(f"=== Ordenado por {orden} ===\n")
+            estadisticas.sort_stats(orden).print_stats(TOP_FUNCIONES)
+        return salida.getvalue()
+
+# Perfil activo (solo puede haber uno: cProfile no admite varios a la vez)
+perfil_actual = None
+
+def iniciar_perfil(tipo, cantidad, chat_id, update_id=None):
+    """Empieza un perfil. None si ya hay uno en curso"""
+    global perfil_actual
+    if perfil_actual is not None:
+        return None
+    perfil_actual = PerfilEnCurso(tipo, cantidad, chat_id, update_id)
+    return perfil_actual
+
+def terminar_perfil():
+    """Termina el perfil en curso. Devuelve (perfil, informe) o None"""
+    global perfil_actual
+    perfil, perfil_actual = perfil_actual, None
+    if perfil is None:
+        return None
+    return perfil, perfil.terminar()
+
+class MonitorMemoria:
+    """Instantáneas de tracemalloc comparadas con la anterior, junto con
+    el tamaño de las estructuras de storage y metrics"""
+
+    def __init__(self):
+        self.anterior = None
+        self.estructuras_anteriores = {}
+
+    @property
+    def activo(self):
+        return tracemalloc.is_tracing() and self.anterior is not None
+
+    def iniciar(self, estructuras):
+        """Activa tracemalloc y toma la instantánea base"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MARCOS_MEMORIA)
+        self.anterior = tracemalloc.take_snapshot()
+        self.estructuras_anteriores = estructuras
+
+    def comparar(self, estructuras):
+        """Informe de lo que creció desde la instantánea anterior, que pasa
+        a ser la nueva base"""
+        actual = tracemalloc.take_snapshot()
+        ignorar = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        actual = actual.filter_traces(ignorar)
+        anterior = self.anterior.filter_traces(ignorar)
+
+        usado, pico = tracemalloc.get_traced_memory()
+        diferencias = actual.compare_to(anterior, 'lineno')
+        crecimiento = sum(d.size_diff for d in diferencias)
+        lineas = [
+            f"Memoria trazada: {usado / 1024:.0f} KB (pico {pico / 1024:.0f} KB), "
+            f"{crecimiento / 1024:+.0f} KB desde la instantánea anterior",
+            "",
+            "Estructuras (elementos y variación):",
+        ]
+        for nombre, cantidad in estructuras.items():
+            previa = self.estructuras_anteriores.get(nombre, cantidad)
+            lineas.append(f"  {nombre}: {cantidad} ({cantidad - previa:+})")
+
+        lineas += ["", "Crecimiento en el código del bot (última línea de src/ que asignó):"]
+        lineas += [f"  {linea}: {tamano / 1024:+.1f} KB"
+                   for linea, tamano in crecimiento_propio(actual, anterior)[:TOP_LINEAS]]
+        lineas += ["", "Crecimiento general (por línea):"]
+        lineas += [f"  {d}" for d in diferencias if d.size_diff > 0][:TOP_LINEAS]
+
+        self.anterior = actual
+        self.estructuras_anteriores = estructuras
+        return "\n".join(lineas) + "\n"
+
+    def detener(self):
+        tracemalloc.stop()
+        self.anterior = None
+        self.estructuras_anteriores = {}
+
+def _linea_propia(traza):
+    """Última línea de src/ en una traza de asignación, o None"""
+    for marco in reversed(traza):
+        if SEPARADOR_SRC in marco.filename:
+            ruta = marco.filename[marco.filename.index(SEPARADOR_SRC) + 1:]
+            return f"{ruta}:{marco.lineno}"
+    return None
+
+def crecimiento_propio(actual, anterior):
+    """Crecimiento en bytes agrupado por la última línea de src/ de cada
+    asignación (p. ej. la de storage.py o metrics.py que llenó una
+    estructura), de mayor a menor"""
+    por_linea = {}
+    for diferencia in actual.compare_to(anterior, 'traceback'):
+        linea = _linea_propia(diferencia.traceback)
+        if linea is not None:
+            por_linea[linea] = por_linea.get(linea, 0) + diferencia.size_diff
+    return sorted(((l, t) for l, t in por_linea.items() if t > 0), key=lambda x: x[1], reverse=True)
+
+# Instancia global
+monitor_memoria = MonitorMemoria()
@@ -0,0 +1,334 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.utils.scheduler import agenda_riegos, fecha_aviso, indice_vencimientos, ultimos_avisos
+from src.utils.series import SerieMedidas
+from src.utils.storage import (
+    plantas_por_usuario, medidas_por_usuario, riego_por_usuario, horas_por_usuario,
+    marcar_modificado, guardar_datos
+)
+from src.utils.validators import CommandValidator
+
+# Los handlers acceden a los datos a través de estas funciones en lugar de
+# tocar los diccionarios globales de storage: aquí se hacen las búsquedas, se
+# marcan los cambios y se guardan. Las lecturas devuelven registros tipados.
+# Los registros usan dataclasses con slots, que requieren Python 3.10 (la
+# versión mínima del bot, ver README).
+
+@dataclass(slots=True)
+class Planta:
+    user_id: int
+    nombre: str
+
+@dataclass(slots=True)
+class Medida:
+    altura: float
+    fecha: Optional[str] = None
+    timestamp: Optional[str] = None
+
+    @classmethod
+    def desde_dict(cls, medida):
+        """Crea la medida desde su forma almacenada (o una altura suelta)"""
+        if isinstance(medida, dict):
+            return cls(float(medida.get('altura', 0)), medida.get('fecha'), medida.get('timestamp'))
+        return cls(float(medida))
+
+    def a_dict(self):
+        return {'altura': self.altura, 'fecha': self.fecha, 'timestamp': self.timestamp}
+
+@dataclass(slots=True)
+class Riego:
+    planta: str
+    frecuencia: int
+    ultimo_riego: str
+
+    @classmethod
+    def desde_dict(cls, planta, riego):
+        return cls(planta, riego.get('frecuencia'), riego.get('ultimo_riego'))
+
+    def a_dict(self):
+        return {'frecuencia': self.frecuencia, 'ultimo_riego': self.ultimo_riego}
+
+    def proximo_riego(self) -> date:
+        """Fecha del próximo riego según la frecuencia"""
+        ultimo = datetime.strptime(self.ultimo_riego, "%Y-%m-%d").date()
+        return ultimo + timedelta(days=self.frecuencia)
+
+    def estado(self) -> dict:
+        """Estado del riego (ver CommandValidator.calculate_watering_status)"""
+        return CommandValidator.calculate_watering_status(self.a_dict())
+
+@dataclass(slots=True)
+class RegistroHoras:
+    fecha: str
+    horas: float
+    timestamp: Optional[str] = None
+
+    @classmethod
+    def desde_dict(cls, registro):
+        return cls(registro['fecha'], registro['horas'], registro.get('timestamp'))
+
+    def a_dict(self):
+        registro = {'fecha': self.fecha, 'horas': self.horas}
+        if self.timestamp is not None:
+            registro['timestamp'] = self.timestamp
+        return registro
+
+# ----- Plantas -----
+
+def nombres_plantas(user_id) -> List[str]:
+    """Nombres de las plantas del usuario, en orden de registro"""
+    return list(plantas_por_usuario.get(user_id, []))
+
+def obtener_plantas(user_id) -> List[Planta]:
+    return [Planta(user_id, nombre) for nombre in plantas_por_usuario.get(user_id, [])]
+
+def buscar_planta(user_id, nombre) -> Optional[str]:
+    """Nombre registrado de una planta (sin distinguir mayúsculas), o None"""
+    buscado = nombre.strip().lower()
+    for planta in plantas_por_usuario.get(user_id, []):
+        if planta and planta.strip().lower() == buscado:
+            return planta
+    return None
+
+def exigir_planta(user_id, nombre) -> str:
+    """Como buscar_planta, pero lanza ValidationError si no está registrada"""
+    return CommandValidator.validate_plant_is_registered(nombre, user_id, plantas_por_usuario)
+
+def agregar_planta(user_id, nombre) -> Optional[Planta]:
+    """Registra una planta. Devuelve None si ya existe una con ese nombre"""
+    plantas = plantas_por_usuario.setdefault(user_id, [])
+    if nombre.lower() in (p.lower() for p in plantas):
+        return None
+    plantas.append(nombre)
+    marcar_modificado('plantas', user_id)
+    guardar_datos()
+    return Planta(user_id, nombre)
+
+def impacto_eliminacion(user_id, nombre) -> dict:
+    """Medidas y riegos que se perderían al eliminar una planta"""
+    related_data = {'measurements': medidas_por_usuario, 'watering': riego_por_usuario}
+    return CommandValidator.validate_deletion_impact(nombre, user_id, related_data)
+
+def eliminar_planta(user_id, nombre) -> int:
+    """Elimina todas las plantas con ese nombre junto con sus medidas y su
+    riego. Devuelve cuántas se eliminaron"""
+    buscado = nombre.strip().lower()
+    plantas = plantas_por_usuario.get(user_id, [])
+    eliminadas = [p for p in plantas if p.strip().lower() == buscado]
+    if not eliminadas:
+        return 0
+
+    plantas_por_usuario[user_id] = [p for p in plantas if p.strip().lower() != buscado]
+    marcar_modificado('plantas', user_id)
+    for planta in eliminadas:
+        if planta in medidas_por_usuario.get(user_id, {}):
+            del medidas_por_usuario[user_id][planta]
+            marcar_modificado('medidas', user_id, planta)
+        if planta in riego_por_usuario.get(user_id, {}):
+            del riego_por_usuario[user_id][planta]
+            marcar_modificado('riego', user_id, planta)
+            agenda_riegos.quitar(user_id, planta)
+            indice_vencimientos.quitar(user_id, planta)
+            ultimos_avisos.olvidar(user_id, planta)
+    guardar_datos()
+    ultimos_avisos.guardar()
+    return len(eliminadas)
+
+# ----- Medidas -----
+
+def obtener_medidas(user_id, planta) -> List[Medida]:
+    return [Medida.desde_dict(m) for m in medidas_por_usuario.get(user_id, {}).get(planta, [])]
+
+def contar_medidas(user_id, planta) -> int:
+    return len(medidas_por_usuario.get(user_id, {}).get(planta, []))
+
+def ultima_medida(user_id, planta) -> Optional[Medida]:
+    """Última medida de la planta, o None si no tiene"""
+    medidas = medidas_por_usuario.get(user_id, {}).get(planta)
+    if not medidas:
+        return None
+    return Medida.desde_dict(medidas[-1])
+
+def agregar_medida(user_id, planta, altura) -> Medida:
+    """Registra una medida con la fecha y hora actuales"""
+    ahora = datetime.now()
+    medida = Medida(altura, ahora.strftime('%Y-%m-%d'), ahora.isoformat())
+    por_planta = medidas_por_usuario.setdefault(user_id, {})
+    serie = por_planta.setdefault(planta, SerieMedidas())
+    serie.append(medida.a_dict())
+    marcar_modificado('medidas', user_id, planta, ('anexar', len(serie) - 1, medida.a_dict()))
+    guardar_datos()
+    return medida
+
+def eliminar_medida(user_id, planta, indice) -> Optional[Medida]:
+    """Elimina la medida en esa posición. None si ya no existe"""
+    medidas = medidas_por_usuario.get(user_id, {}).get(planta)
+    if medidas is None or not 0 <= indice < len(medidas):
+        return None
+    eliminada = Medida.desde_dict(medidas.pop(indice))
+    marcar_modificado('medidas', user_id, planta, ('borrar', indice))
+    guardar_datos()
+    return eliminada
+
+# ----- Riego -----
+
+def obtener_riego(user_id, planta) -> Optional[Riego]:
+    riego = riego_por_usuario.get(user_id, {}).get(planta)
+    if riego is None:
+        return None
+    return Riego.desde_dict(planta, riego)
+
+def exigir_riego(user_id, planta) -> Riego:
+    """Como obtener_riego, pero lanza ValidationError si no hay riego válido"""
+    riego = CommandValidator.validate_watering_exists(planta, user_id, riego_por_usuario)
+    return Riego.desde_dict(planta, riego)
+
+def configurar_riego(user_id, planta, frecuencia, ultimo_riego=None) -> Riego:
+    """Configura (o reemplaza) el riego de una planta. Por defecto el último
+    riego es hoy"""
+    riego = Riego(planta, frecuencia, ultimo_riego or date.today().isoformat())
+    riego_por_usuario.setdefault(user_id, {})[planta] = riego.a_dict()
+    marcar_modificado('riego', user_id, planta, ('actualizar', riego.a_dict()))
+    # Un riego nuevo o cambiado por el usuario vuelve a avisarse a su fecha
+    ultimos_avisos.olvidar(user_id, planta)
+    agenda_riegos.programar(user_id, planta, riego_por_usuario[user_id][planta])
+    indice_vencimientos.actualizar(user_id, planta, riego_por_usuario[user_id][planta])
+    guardar_datos()
+    ultimos_avisos.guardar()
+    return riego
+
+def actualizar_riego(user_id, planta, frecuencia=None, ultimo_riego=None) -> Riego:
+    """Cambia la frecuencia y/o la fecha del último riego ya configurado"""
+    riego = riego_por_usuario[user_id][planta]
+    if frecuencia is not None:
+        riego['frecuencia'] = frecuencia
+    if ultimo_riego is not None:
+        riego['ultimo_riego'] = ultimo_riego
+    marcar_modificado('riego', user_id, planta, ('actualizar', dict(riego)))
+    ultimos_avisos.olvidar(user_id, planta)
+    agenda_riegos.programar(user_id, planta, riego)
+    indice_vencimientos.actualizar(user_id, planta, riego)
+    guardar_datos()
+    ultimos_avisos.guardar()
+    return Riego.desde_dict(planta, riego)
+
+def fecha_recordatorio(user_id, planta) -> Optional[date]:
+    """Fecha en la que toca recordar el riego teniendo en cuenta el último
+    aviso, o None si el riego no es válido"""
+    riego = riego_por_usuario.get(user_id, {}).get(planta)
+    if riego is None:
+        return None
+    return fecha_aviso(riego, ultimos_avisos.obtener(user_id, planta))
+
+def ultimo_aviso(user_id, planta) -> Optional[str]:
+    """Fecha del último recordatorio enviado para la planta, o None"""
+    return ultimos_avisos.obtener(user_id, planta)
+
+def anotar_avisos(recordados: Dict[int, List[str]], fecha=None) -> int:
+    """Apunta la fecha de aviso de las plantas recordadas a varios usuarios.
+    No modifica el riego (ultimo_riego solo cambia cuando el usuario riega) y
+    se guarda en un único archivo pequeño. Devuelve cuántos se anotaron"""
+    fecha = fecha or date.today().isoformat()
+    anotados = 0
+    for user_id, plantas in recordados.items():
+        for planta in plantas:
+            riego = riego_por_usuario.get(user_id, {}).get(planta)
+            if riego is None:
+                # Se eliminó mientras se enviaba el recordatorio
+                continue
+            ultimos_avisos.anotar(user_id, planta, fecha)
+            agenda_riegos.programar(user_id, planta, riego)
+            anotados += 1
+    ultimos_avisos.guardar()
+    return anotados
+
+def reprogramar_aviso(user_id, planta):
+    """Devuelve a la agenda una planta cuyo aviso se descartó sin llegar a
+    enviarse, para recordarla de nuevo en la próxima revisión"""
+    riego = riego_por_usuario.get(user_id, {}).get(planta)
+    if riego is not None:
+        agenda_riegos.programar(user_id, planta, riego)
+
+def recorrer_riegos() -> Iterator[Tuple[int, Riego]]:
+    """Recorre los riegos configurados de todos los usuarios"""
+    for user_id, plantas in list(riego_por_usuario.items()):
+        for planta, riego in list(plantas.items()):
+            yield user_id, Riego.desde_dict(planta, riego)
+
+def riegos_vencidos(hoy=None) -> List[Tuple[int, Riego]]:
+    """Riegos que tocan hoy o antes según la agenda. Salen de la agenda hasta
+    que se actualicen"""
+    vencidos = []
+    for user_id, planta in agenda_riegos.vencidos(hoy):
+        riego = obtener_riego(user_id, planta)
+        if riego is not None:
+            vencidos.append((user_id, riego))
+    return vencidos
+
+def vencimientos_entre(desde=None, hasta=None) -> List[Tuple[date, int, str]]:
+    """(fecha, user_id, planta) de los riegos que vencen entre dos fechas
+    (sin inicio, incluye todos los atrasados), según el índice de calendario"""
+    return indice_vencimientos.entre(desde, hasta)
+
+def proximos_riegos(user_id, dias, hoy=None) -> List[Tuple[Riego, date]]:
+    """Riegos del usuario atrasados o que vencen en los próximos días, con
+    su fecha, ordenados por fecha"""
+    hasta = (hoy or date.today()) + timedelta(days=dias)
+    return [(obtener_riego(user_id, planta), vence)
+            for vence, planta in indice_vencimientos.de_usuario(user_id, hasta)]
+
+# ----- Horas -----
+
+def obtener_horas(user_id) -> List[RegistroHoras]:
+    return [RegistroHoras.desde_dict(r) for r in horas_por_usuario.get(user_id, [])]
+
+def total_horas(user_id) -> float:
+    return sum(r['horas'] for r in horas_por_usuario.get(user_id, []))
+
+def sumar_horas(user_id, fecha, horas, timestamp=None) -> Tuple[RegistroHoras, Optional[float]]:
+    """Suma horas a la fecha indicada (creando el registro si no existe).
+    Devuelve el registro y las horas que tenía antes ese día (None si es nuevo)"""
+    registros = horas_por_usuario.setdefault(user_id, [])
+    for registro in registros:
+        if registro['fecha'] == fecha:
+            anteriores = registro['horas']
+            registro['horas'] += horas
+            break
+    else:
+        anteriores = None
+        registro = RegistroHoras(fecha, horas, timestamp).a_dict()
+        registros.append(registro)
+    marcar_modificado('horas', user_id)
+    guardar_datos()
+    return RegistroHoras.desde_dict(registro), anteriores
+
+def restar_horas(user_id, fecha, horas) -> bool:
+    """Resta horas de una fecha; el registro desaparece si llega a cero.
+    Devuelve False si no había horas en esa fecha"""
+    registros = horas_por_usuario.get(user_id, [])
+    for registro in registros:
+        if registro['fecha'] == fecha:
+            if registro['horas'] <= horas:
+                registros.remove(registro)
+            else:
+                registro['horas'] -= horas
+            marcar_modificado('horas', user_id)
+            guardar_datos()
+            return True
+    return False
+
+# ----- Usuario -----
+
+def eliminar_usuario(user_id):
+    """Elimina todos los datos del usuario"""
+    for datos, dominio in ((plantas_por_usuario, 'plantas'), (medidas_por_usuario, 'medidas'),
+                           (riego_por_usuario, 'riego'), (horas_por_usuario, 'horas')):
+        datos.pop(user_id, None)
+        marcar_modificado(dominio, user_id)
+    agenda_riegos.quitar_usuario(user_id)
+    indice_vencimientos.quitar_usuario(user_id)
+    ultimos_avisos.olvidar(user_id)
+    guardar_datos()
+    ultimos_avisos.guardar()
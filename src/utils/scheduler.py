@@ -0,0 +1,287 @@
+import bisect
+import heapq
+import itertools
+import os
+from datetime import date, datetime, timedelta
+
+from src.config import Config
+from src.utils.atomic import escribir_atomico, leer_json_con_respaldo
+from src.utils.serializer import serializar
+from src.utils.storage import listar_riegos
+
+ARCHIVO_AVISOS = 'avisos_riego.json'
+
+def fecha_vencimiento(riego):
+    """Fecha del próximo riego de un riego almacenado, o None si no tiene
+    frecuencia o fecha válidas"""
+    try:
+        frecuencia = int(riego.get('frecuencia') or 0)
+        ultimo = datetime.strptime(riego.get('ultimo_riego') or '', "%Y-%m-%d").date()
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if frecuencia <= 0:
+        return None
+    return ultimo + timedelta(days=frecuencia)
+
+def fecha_aviso(riego, avisado=None):
+    """Fecha en la que toca recordar el riego: su vencimiento o, si ya se
+    avisó, una frecuencia después del último aviso. None si no es válido"""
+    vence = fecha_vencimiento(riego)
+    if vence is None or not avisado:
+        return vence
+    try:
+        siguiente = date.fromisoformat(avisado) + timedelta(days=int(riego['frecuencia']))
+    except (TypeError, ValueError):
+        return vence
+    return max(vence, siguiente)
+
+class UltimosAvisos:
+    """Fecha del último recordatorio de cada riego, en su propio archivo
+    pequeño (data/avisos_riego.json) para que las revisiones no modifiquen
+    ultimo_riego ni reescriban los archivos de datos"""
+
+    def __init__(self):
+        self.ruta = None
+        # user_id -> planta -> fecha del último aviso
+        self._fechas = {}
+        self._modificado = False
+
+    def _preparar(self):
+        ruta = os.path.join(Config.DATA_DIR, ARCHIVO_AVISOS)
+        if self.ruta != ruta:
+            self.ruta = ruta
+            self._fechas = {}
+            for user_id, planta, fecha in leer_json_con_respaldo(ruta) or []:
+                self._fechas.setdefault(user_id, {})[planta] = fecha
+            self._modificado = False
+
+    def obtener(self, user_id, planta):
+        self._preparar()
+        return self._fechas.get(user_id, {}).get(planta)
+
+    def anotar(self, user_id, planta, fecha):
+        self._preparar()
+        self._fechas.setdefault(user_id, {})[planta] = fecha
+        self._modificado = True
+
+    def olvidar(self, user_id, planta=None):
+        """Olvida los avisos de una planta o, sin planta, de todo el usuario"""
+        self._preparar()
+        if planta is None:
+            olvidado = self._fechas.pop(user_id, None) is not None
+        else:
+            plantas = self._fechas.get(user_id, {})
+            olvidado = plantas.pop(planta, None) is not None
+            if not plantas:
+                self._fechas.pop(user_id, None)
+        self._modificado = self._modificado or olvidado
+
+    def guardar(self):
+        """Escribe el archivo si hubo cambios"""
+        self._preparar()
+        if not self._modificado:
+            return
+        contenido = [[user_id, planta, fecha]
+                     for user_id, plantas in self._fechas.items()
+                     for planta, fecha in plantas.items()]
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        escribir_atomico({self.ruta: serializar(contenido)}, conservar_anterior=False)
+        self._modificado = False
+
+class AgendaRiegos:
+    """Montículo de (próximo aviso, user_id, planta) para los recordatorios.
+
+    Se construye una vez a partir de riego_por_usuario y el repositorio lo
+    actualiza al regar, cambiar el riego o la frecuencia y al eliminar. Las
+    entradas que quedan obsoletas no se buscan en el montículo: se descartan
+    al salir si su fecha ya no coincide con la vigente. Así cada revisión
+    cuesta O(vencidos · log n) en lugar de recorrer todas las plantas.
+    """
+
+    def __init__(self):
+        self._monticulo = []
+        # (user_id, planta) -> fecha vigente
+        self._vigentes = {}
+        # Desempata fechas iguales sin comparar user_id de tipos distintos
+        self._orden = itertools.count()
+        self._construida = False
+
+    def reconstruir(self):
+        """Vuelve a leer todos los riegos (al arrancar o tras recargar datos)"""
+        self._vigentes = {}
+        self._monticulo = []
+        for user_id, plantas in listar_riegos():
+            for planta, riego in list(plantas.items()):
+                vence = fecha_aviso(riego, ultimos_avisos.obtener(user_id, planta))
+                if vence is not None:
+                    self._vigentes[(user_id, planta)] = vence
+                    self._monticulo.append((vence, next(self._orden), user_id, planta))
+        heapq.heapify(self._monticulo)
+        self._construida = True
+
+    def _preparar(self):
+        if not self._construida:
+            self.reconstruir()
+
+    def __len__(self):
+        self._preparar()
+        return len(self._vigentes)
+
+    def programar(self, user_id, planta, riego):
+        """Registra el riego (nuevo o modificado) o el último aviso de una
+        planta"""
+        if not self._construida:
+            # Se leerá completo en la primera consulta
+            return
+        vence = fecha_aviso(riego, ultimos_avisos.obtener(user_id, planta))
+        if vence is None:
+            self._vigentes.pop((user_id, planta), None)
+            return
+        if self._vigentes.get((user_id, planta)) == vence:
+            return
+        self._vigentes[(user_id, planta)] = vence
+        heapq.heappush(self._monticulo, (vence, next(self._orden), user_id, planta))
+        self._compactar_si_hace_falta()
+
+    def quitar(self, user_id, planta):
+        """Olvida el riego de una planta eliminada"""
+        self._vigentes.pop((user_id, planta), None)
+
+    def quitar_usuario(self, user_id):
+        """Olvida todos los riegos de un usuario"""
+        for clave in [c for c in self._vigentes if c[0] == user_id]:
+            del self._vigentes[clave]
+
+    def proximo(self):
+        """Fecha del próximo aviso pendiente, o None si no hay ninguno"""
+        self._preparar()
+        self._limpiar_cima()
+        return self._monticulo[0][0] if self._monticulo else None
+
+    def vencidos(self, hoy=None):
+        """Saca del montículo los riegos que tocan hoy o antes y devuelve
+        (user_id, planta) en orden de fecha. Dejan de estar en la agenda hasta
+        que se vuelvan a programar"""
+        self._preparar()
+        hoy = hoy or date.today()
+        resultado = []
+        while self._monticulo and self._monticulo[0][0] <= hoy:
+            vence, _, user_id, planta = heapq.heappop(self._monticulo)
+            if self._vigentes.get((user_id, planta)) == vence:
+                del self._vigentes[(user_id, planta)]
+                resultado.append((user_id, planta))
+        return resultado
+
+    def _limpiar_cima(self):
+        while self._monticulo:
+            vence, _, user_id, planta = self._monticulo[0]
+            if self._vigentes.get((user_id, planta)) == vence:
+                return
+            heapq.heappop(self._monticulo)
+
+    def _compactar_si_hace_falta(self):
+        """Rehace el montículo si acumula demasiadas entradas obsoletas"""
+        if len(self._monticulo) > 2 * len(self._vigentes) + 64:
+            self._monticulo = [
+                (vence, next(self._orden), user_id, planta)
+                for (user_id, planta), vence in self._vigentes.items()
+            ]
+            heapq.heapify(self._monticulo)
+
+class IndiceVencimientos:
+    """Índice de calendario: fecha de vencimiento -> {(user_id, planta)}.
+
+    Las fechas con riegos se mantienen ordenadas, así que "qué vence hasta
+    tal día" o "qué vence en los próximos N días" se responde con una
+    búsqueda binaria más el tamaño del resultado. Se construye al cargar y
+    el repositorio lo actualiza con cada cambio de riego.
+    """
+
+    def __init__(self):
+        self._cubetas = {}
+        self._fechas = []
+        # user_id -> {planta: fecha}, para las consultas de un usuario
+        self._por_usuario = {}
+        self._construido = False
+
+    def reconstruir(self):
+        """Vuelve a leer todos los riegos (al arrancar o tras recargar datos)"""
+        self._cubetas = {}
+        self._por_usuario = {}
+        for user_id, plantas in listar_riegos():
+            for planta, riego in list(plantas.items()):
+                vence = fecha_vencimiento(riego)
+                if vence is not None:
+                    self._cubetas.setdefault(vence, set()).add((user_id, planta))
+                    self._por_usuario.setdefault(user_id, {})[planta] = vence
+        self._fechas = sorted(self._cubetas)
+        self._construido = True
+
+    def _preparar(self):
+        if not self._construido:
+            self.reconstruir()
+
+    def actualizar(self, user_id, planta, riego):
+        """Vuelve a indexar el riego (nuevo o modificado) de una planta"""
+        if not self._construido:
+            return
+        self.quitar(user_id, planta)
+        vence = fecha_vencimiento(riego)
+        if vence is None:
+            return
+        cubeta = self._cubetas.get(vence)
+        if cubeta is None:
+            cubeta = self._cubetas[vence] = set()
+            bisect.insort(self._fechas, vence)
+        cubeta.add((user_id, planta))
+        self._por_usuario.setdefault(user_id, {})[planta] = vence
+
+    def quitar(self, user_id, planta):
+        """Saca una planta del índice"""
+        plantas = self._por_usuario.get(user_id)
+        vence = plantas.pop(planta, None) if plantas else None
+        if vence is None:
+            return
+        if not plantas:
+            del self._por_usuario[user_id]
+        cubeta = self._cubetas[vence]
+        cubeta.discard((user_id, planta))
+        if not cubeta:
+            del self._cubetas[vence]
+            del self._fechas[bisect.bisect_left(self._fechas, vence)]
+
+    def quitar_usuario(self, user_id):
+        """Saca todas las plantas de un usuario"""
+        for planta in list(self._por_usuario.get(user_id, {})):
+            self.quitar(user_id, planta)
+
+    def entre(self, desde=None, hasta=None):
+        """(fecha, user_id, planta) que vencen entre dos fechas (incluidas;
+        sin desde, todos los atrasados), ordenados por fecha"""
+        self._preparar()
+        inicio = 0 if desde is None else bisect.bisect_left(self._fechas, desde)
+        fin = len(self._fechas) if hasta is None else bisect.bisect_right(self._fechas, hasta)
+        return [(vence, user_id, planta)
+                for vence in self._fechas[inicio:fin]
+                for user_id, planta in sorted(self._cubetas[vence], key=str)]
+
+    def vencidos(self, hoy=None):
+        """Riegos que tocan hoy o están atrasados"""
+        return self.entre(hasta=hoy or date.today())
+
+    def proximos(self, dias, hoy=None):
+        """Riegos atrasados o que vencen en los próximos `dias` días"""
+        hoy = hoy or date.today()
+        return self.entre(hasta=hoy + timedelta(days=dias))
+
+    def de_usuario(self, user_id, hasta=None):
+        """(fecha, planta) de un usuario ordenados por fecha, opcionalmente
+        solo hasta una fecha"""
+        self._preparar()
+        return sorted((vence, planta) for planta, vence in self._por_usuario.get(user_id, {}).items()
+                      if hasta is None or vence <= hasta)
+
+# Compartidos por el repositorio y el job de recordatorios
+ultimos_avisos = UltimosAvisos()
+agenda_riegos = AgendaRiegos()
+indice_vencimientos = IndiceVencimientos()
@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+
+from src.config import Config
+
+try:
+    import orjson
+except ImportError:
+    # orjson es opcional: sin él se usa el módulo json estándar
+    orjson = None
+
+def serializador_activo():
+    """Nombre del serializador en uso según STORAGE_SERIALIZER y lo instalado"""
+    preferido = Config.STORAGE_SERIALIZER.lower()
+    if preferido == 'orjson' and orjson is None:
+        raise ValueError("STORAGE_SERIALIZER=orjson pero orjson no está instalado")
+    if preferido in ('auto', 'orjson') and orjson is not None:
+        return 'orjson'
+    if preferido in ('auto', 'json'):
+        return 'json'
+    raise ValueError(f"Serializador desconocido: {Config.STORAGE_SERIALIZER}")
+
+def serializar(datos, legible=False, default=None):
+    """Convierte los datos a JSON en UTF-8 (bytes).
+
+    La salida es compacta, sin espacios; con legible=True se indenta para
+    leerla a mano. Las claves no textuales (user_id) se escriben como texto.
+    """
+    if serializador_activo() == 'orjson':
+        opciones = orjson.OPT_NON_STR_KEYS
+        if legible:
+            opciones |= orjson.OPT_INDENT_2
+        return orjson.dumps(datos, default=default, option=opciones)
+
+    if legible:
+        texto = json.dumps(datos, indent=2, ensure_ascii=False, default=default)
+    else:
+        texto = json.dumps(datos, separators=(',', ':'), ensure_ascii=False, default=default)
+    return texto.encode('utf-8')
+
+def deserializar(contenido):
+    """Lee JSON desde bytes o texto. Los errores son json.JSONDecodeError"""
+    if serializador_activo() == 'orjson':
+        return orjson.loads(contenido)
+    return json.loads(contenido)
+
+def archivos_de_datos(directorio):
+    """Archivos JSON del directorio de datos, incluidos los de usuario"""
+    rutas = []
+    for carpeta in (directorio, os.path.join(directorio, 'users')):
+        if not os.path.isdir(carpeta):
+            continue
+        rutas.extend(
+            os.path.join(carpeta, nombre) for nombre in sorted(os.listdir(carpeta))
+            if nombre.endswith('.json')
+        )
+    return rutas
+
+def convertir_directorio(directorio, destino=None, legible=False):
+    """Reescribe los archivos JSON de datos en formato compacto (o legible).
+
+    Sin destino los archivos se reemplazan en su sitio, de forma atómica;
+    con destino se escriben ahí copias, por ejemplo para exportarlas.
+    Devuelve las rutas escritas.
+    """
+    # Importación diferida: atomic usa este módulo para leer
+    from src.utils.atomic import escribir_atomico
+
+    archivos = {}
+    for ruta in archivos_de_datos(directorio):
+        with open(ruta, 'rb') as f:
+            datos = deserializar(f.read())
+        salida = ruta if destino is None else os.path.join(destino, os.path.relpath(ruta, directorio))
+        archivos[salida] = serializar(datos, legible=legible)
+
+    for carpeta in {os.path.dirname(ruta) for ruta in archivos}:
+        os.makedirs(carpeta, exist_ok=True)
+    escribir_atomico(archivos, conservar_anterior=destino is None)
+    return list(archivos)
+
+if __name__ == '__main__':
+    # python -m src.utils.serializer convertir            -> compacta data/*.json
+    # python -m src.utils.serializer exportar <destino>   -> copia legible
+    if len(sys.argv) < 2 or sys.argv[1] not in ('convertir', 'exportar') or \
+            (sys.argv[1] == 'exportar' and len(sys.argv) < 3):
+        print("Uso: python -m src.utils.serializer convertir | exportar <destino>")
+        sys.exit(1)
+    if sys.argv[1] == 'convertir':
+        escritos = convertir_directorio(Config.DATA_DIR)
+    else:
+        escritos = convertir_directorio(Config.DATA_DIR, destino=sys.argv[2], legible=True)
+    print(f"{len(escritos)} archivos escritos con {serializador_activo()}")
@@ -0,0 +1,169 @@
+import copy
+from array import array
+from datetime import date, datetime, timedelta
+
+# Marca de tiempo de las medidas sin timestamp
+SIN_FECHA = -(2 ** 63)
+# Día de las medidas sin fecha
+SIN_DIA = 0
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSEGUNDO = timedelta(microseconds=1)
+_CLAVES = frozenset(('altura', 'fecha', 'timestamp'))
+
+def _altura_exacta(altura):
+    """Indica si la altura se recupera igual tras guardarla en float32"""
+    return type(altura) is float and float(f"{array('f', [altura])[0]:.7g}") == altura
+
+def _columnas(medida):
+    """(altura, microsegundos, día) de una medida con la forma habitual, o
+    None si no se recuperaría idéntica desde las columnas"""
+    if not isinstance(medida, dict):
+        # Formato antiguo: solo la altura
+        return (medida, SIN_FECHA, SIN_DIA) if _altura_exacta(medida) else None
+    if medida.keys() != _CLAVES or not _altura_exacta(medida['altura']):
+        return None
+    fecha, timestamp = medida['fecha'], medida['timestamp']
+    try:
+        momento = datetime.fromisoformat(timestamp)
+        dia = date.fromisoformat(fecha)
+    except (TypeError, ValueError):
+        return None
+    if momento.tzinfo is not None or momento.isoformat() != timestamp or dia.isoformat() != fecha:
+        return None
+    return medida['altura'], (momento - _EPOCH) // _MICROSEGUNDO, dia.toordinal()
+
+class SerieMedidas:
+    """Historial de medidas de una planta guardado en columnas: alturas en
+    float32, marcas de tiempo en microsegundos epoch y fechas como ordinal
+    del día.
+
+    Cada medida ocupa 16 bytes en lugar de un diccionario con dos cadenas.
+    La fecha se guarda aparte del timestamp, así que las medidas se leen
+    tal como se registraron aunque no coincidan. Las que no tienen la forma
+    habitual (alturas enteras, claves que faltan o sobran, fechas en otro
+    formato) se guardan tal cual. Al indexarla devuelve el mismo
+    diccionario que antes ({'altura', 'fecha', 'timestamp'}); las medidas
+    antiguas sin fecha devuelven solo {'altura'}.
+    """
+
+    __slots__ = ('_alturas', '_tiempos', '_dias', '_irregulares')
+
+    def __init__(self, medidas=()):
+        self._alturas = array('f')
+        self._tiempos = array('q')
+        self._dias = array('i')
+        # índice -> medida guardada tal cual (las que no caben en columnas)
+        self._irregulares = {}
+        for medida in medidas:
+            self.append(medida)
+
+    @classmethod
+    def desde_json(cls, valor):
+        """Crea la serie a partir de su lista JSON (diccionarios o números)"""
+        if isinstance(valor, cls):
+            return valor
+        return cls(valor or [])
+
+    def append(self, medida):
+        """Añade una medida (diccionario o altura suelta del formato antiguo)"""
+        columnas = _columnas(medida)
+        if columnas is None:
+            self._irregulares[len(self)] = copy.deepcopy(medida)
+            columnas = (0.0, SIN_FECHA, SIN_DIA)
+        altura, tiempo, dia = columnas
+        self._alturas.append(altura)
+        self._tiempos.append(tiempo)
+        self._dias.append(dia)
+
+    def altura(self, indice):
+        """Altura de una medida, sin el ruido de la conversión a float32"""
+        medida = self._json(indice)
+        return float(medida['altura'] if isinstance(medida, dict) else medida)
+
+    def _json(self, indice):
+        """Medida en su forma almacenada (diccionario o altura suelta)"""
+        if indice in self._irregulares:
+            return copy.deepcopy(self._irregulares[indice])
+        altura = float(f"{self._alturas[indice]:.7g}")
+        if self._dias[indice] == SIN_DIA:
+            return altura
+        return {
+            'altura': altura,
+            'fecha': date.fromordinal(self._dias[indice]).isoformat(),
+            'timestamp': (_EPOCH + self._tiempos[indice] * _MICROSEGUNDO).isoformat()
+        }
+
+    def _medida(self, indice):
+        medida = self._json(indice)
+        return medida if isinstance(medida, dict) else {'altura': medida}
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._medida(i) for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError('índice de medida fuera de rango')
+        return self._medida(indice)
+
+    def __delitem__(self, indice):
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError('índice de medida fuera de rango')
+        del self._alturas[indice]
+        del self._tiempos[indice]
+        del self._dias[indice]
+        if self._irregulares:
+            self._irregulares = {
+                i - (i > indice): medida
+                for i, medida in self._irregulares.items() if i != indice
+            }
+
+    def pop(self, indice=-1):
+        """Quita y devuelve la medida indicada (la última por defecto)"""
+        medida = self[indice]
+        del self[indice]
+        return medida
+
+    def ultima(self):
+        """Última medida registrada, o None si no hay ninguna"""
+        return self[-1] if self else None
+
+    def __len__(self):
+        return len(self._alturas)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._medida(i)
+
+    def a_json(self):
+        """Lista serializable con cada medida tal como se registró; las
+        medidas antiguas vuelven a ser números"""
+        return [self._json(i) for i in range(len(self))]
+
+    def __eq__(self, otro):
+        if isinstance(otro, SerieMedidas):
+            return self.a_json() == otro.a_json()
+        if isinstance(otro, list):
+            return self.a_json() == otro
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"SerieMedidas({self.a_json()!r})"
+
+def series_de_usuario(medidas_por_planta):
+    """Convierte las listas de medidas de un usuario en series"""
+    return {
+        planta: SerieMedidas.desde_json(medidas)
+        for planta, medidas in (medidas_por_planta or {}).items()
+    }
+
+def serializar_json(valor):
+    """Función default de json.dumps para las series de medidas"""
+    if isinstance(valor, SerieMedidas):
+        return valor.a_json()
+    raise TypeError(f"Objeto no serializable: {type(valor).__name__}")
@@ -0,0 +1,264 @@
+import copy
+import os
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from src.config import Config
+from src.utils.atomic import escribir_atomico, leer_json_con_respaldo
+from src.utils.backends import ARCHIVOS_DOMINIO, Backend, JSONBackend, obtener_ruta_archivo, separar_clave
+from src.utils.serializer import serializar
+from src.utils.series import serializar_json, series_de_usuario
+
+# Resumen de los riegos de todos los usuarios (user_id -> riegos de sus
+# plantas), para montar la agenda y el índice de vencimientos al arrancar
+# sin leer cada archivo de usuario
+ARCHIVO_RESUMEN_RIEGOS = 'resumen_riegos.json'
+
+class CacheUsuarios:
+    """Caché LRU de los datos de cada usuario, leídos de su propio archivo.
+
+    Un usuario se carga al primer acceso y se desaloja cuando la caché supera
+    max_usuarios, salvo que tenga cambios sin guardar (está fijado).
+    """
+
+    def __init__(self, directorio, max_usuarios):
+        self.directorio = directorio
+        self.max_usuarios = max_usuarios
+        self._registros = OrderedDict()
+        # Usuarios con archivo en disco
+        self._conocidos = set()
+        # user_id -> versión de su última modificación sin guardar
+        self._fijados = {}
+
+    def ruta(self, user_id):
+        return os.path.join(self.directorio, f"{user_id}.json")
+
+    def indexar(self):
+        """Lista los usuarios con archivo sin leer su contenido"""
+        os.makedirs(self.directorio, exist_ok=True)
+        self._registros.clear()
+        self._conocidos = {
+            int(nombre[:-len('.json')]) for nombre in os.listdir(self.directorio)
+            if nombre.endswith('.json') and nombre[:-len('.json')].lstrip('-').isdigit()
+        }
+
+    def usuarios(self):
+        """Todos los usuarios conocidos, estén o no en memoria"""
+        return list(self._conocidos | set(self._registros))
+
+    def registro(self, user_id, crear=False):
+        """Datos del usuario por dominio, cargándolos si hace falta"""
+        if user_id in self._registros:
+            self._registros.move_to_end(user_id)
+            return self._registros[user_id]
+
+        if user_id in self._conocidos:
+            registro = leer_json_con_respaldo(self.ruta(user_id)) or {}
+            if 'medidas' in registro:
+                registro['medidas'] = series_de_usuario(registro['medidas'])
+        elif crear:
+            registro = {}
+        else:
+            return None
+
+        self._registros[user_id] = registro
+        self._desalojar()
+        return registro
+
+    def en_memoria(self):
+        """Cantidad de usuarios cargados"""
+        return len(self._registros)
+
+    def fijar(self, user_id):
+        """Impide desalojar a un usuario con cambios sin guardar"""
+        self._fijados[user_id] = self._fijados.get(user_id, 0) + 1
+
+    def _desalojar(self):
+        """Descarta los usuarios menos usados que no estén fijados. El
+        último usuario accedido nunca se descarta"""
+        if len(self._registros) <= self.max_usuarios:
+            return
+        for user_id in list(self._registros)[:-1]:
+            if len(self._registros) <= self.max_usuarios:
+                break
+            if user_id not in self._fijados:
+                del self._registros[user_id]
+
+class VistaDominio(MutableMapping):
+    """Vista de un dominio (plantas, medidas...) sobre la caché de usuarios,
+    con la misma interfaz que los diccionarios globales de storage"""
+
+    def __init__(self, dominio, obtener_cache):
+        self.dominio = dominio
+        self._obtener_cache = obtener_cache
+
+    def __getitem__(self, user_id):
+        registro = self._obtener_cache().registro(user_id)
+        if registro is None or self.dominio not in registro:
+            raise KeyError(user_id)
+        return registro[self.dominio]
+
+    def __setitem__(self, user_id, valor):
+        self._obtener_cache().registro(user_id, crear=True)[self.dominio] = valor
+
+    def __delitem__(self, user_id):
+        registro = self._obtener_cache().registro(user_id)
+        if registro is None or self.dominio not in registro:
+            raise KeyError(user_id)
+        del registro[self.dominio]
+
+    def __iter__(self):
+        # Recorrer un dominio completo carga a cada usuario por turnos
+        cache = self._obtener_cache()
+        for user_id in cache.usuarios():
+            registro = cache.registro(user_id)
+            if registro is not None and self.dominio in registro:
+                yield user_id
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def clear(self):
+        for user_id in list(self):
+            del self[user_id]
+
+class ShardedBackend(Backend):
+    """Persistencia en un archivo por usuario (data/users/<user_id>.json)
+    que se carga bajo demanda. Cada guardado reescribe solo los archivos de
+    los usuarios modificados."""
+
+    nombre = 'shards'
+
+    def __init__(self):
+        self.cache = CacheUsuarios(obtener_ruta_archivo('users'), Config.SHARD_CACHE_USERS)
+        self.ruta_resumen = obtener_ruta_archivo(ARCHIVO_RESUMEN_RIEGOS)
+        # user_id -> riegos guardados. Solo lo reemplaza el guardado
+        self._resumen = {}
+
+    def cargar(self, datos):
+        """Indexa los archivos de usuario y lee el resumen de riegos. La
+        primera vez reparte los archivos JSON por dominio en archivos por
+        usuario"""
+        migrar = not os.path.isdir(self.cache.directorio) and any(
+            os.path.exists(obtener_ruta_archivo(nombre)) for nombre in ARCHIVOS_DOMINIO.values()
+        )
+        self.cache.indexar()
+        if not migrar:
+            self._cargar_resumen()
+            return
+
+        anteriores = {dominio: {} for dominio in ARCHIVOS_DOMINIO}
+        JSONBackend().cargar(anteriores)
+        registros = {}
+        for dominio, por_usuario in anteriores.items():
+            for user_id, valor in por_usuario.items():
+                registros.setdefault(user_id, {})[dominio] = valor
+        self._resumen = {
+            user_id: registro['riego'] for user_id, registro in registros.items() if registro.get('riego')
+        }
+        archivos = {
+            self.cache.ruta(user_id): serializar(registro, default=serializar_json)
+            for user_id, registro in registros.items()
+        }
+        archivos[self.ruta_resumen] = serializar(self._resumen)
+        escribir_atomico(archivos, conservar_anterior=False)
+        self.cache.indexar()
+
+    def _cargar_resumen(self):
+        """Lee el resumen de riegos. Si falta (archivos de una versión
+        anterior) se rehace una sola vez leyendo a todos los usuarios"""
+        if os.path.exists(self.ruta_resumen):
+            resumen = leer_json_con_respaldo(self.ruta_resumen) or {}
+            self._resumen = {int(user_id): riegos for user_id, riegos in resumen.items()}
+            return
+
+        self._resumen = {}
+        for user_id in self.cache.usuarios():
+            registro = leer_json_con_respaldo(self.cache.ruta(user_id)) or {}
+            if registro.get('riego'):
+                self._resumen[user_id] = registro['riego']
+        if self._resumen:
+            escribir_atomico({self.ruta_resumen: serializar(self._resumen)},
+                             conservar_anterior=False)
+
+    def riegos(self, datos):
+        """Riegos del resumen, con los de los usuarios con cambios sin
+        guardar tomados de la caché. No carga ningún archivo de usuario"""
+        resumen = dict(self._resumen)
+        for user_id in list(self.cache._fijados):
+            registro = self.cache._registros.get(user_id)
+            if registro is None:
+                continue
+            if registro.get('riego'):
+                resumen[user_id] = registro['riego']
+            else:
+                resumen.pop(user_id, None)
+        return list(resumen.items())
+
+    def marcar(self, user_id):
+        self.cache.fijar(user_id)
+
+    def _usuarios(self, pendientes):
+        usuarios = set()
+        for claves in pendientes.values():
+            if not claves:
+                # Guardar un dominio completo abarca a todos los usuarios
+                return set(self.cache.usuarios())
+            usuarios.update(separar_clave(clave)[0] for clave in claves)
+        return usuarios
+
+    def capturar(self, datos, pendientes, copiar=False):
+        """Toma el archivo completo de cada usuario modificado"""
+        registros = {}
+        for user_id in self._usuarios(pendientes):
+            registro = self.cache.registro(user_id)
+            registros[user_id] = copy.deepcopy(registro) if copiar else registro
+            if registro:
+                self.cache._conocidos.add(user_id)
+            else:
+                self.cache._conocidos.discard(user_id)
+        versiones = {user_id: self.cache._fijados.get(user_id) for user_id in registros}
+        return {'registros': registros, 'versiones': versiones}
+
+    def guardar(self, lote, pendientes, operaciones=None):
+        os.makedirs(self.cache.directorio, exist_ok=True)
+        archivos = {}
+        resumen = dict(self._resumen)
+        # Solo se reescribe el resumen si se guarda a alguien con riegos
+        con_riegos = False
+        for user_id, registro in lote['registros'].items():
+            con_riegos = con_riegos or user_id in resumen
+            if registro and registro.get('riego'):
+                # Copia: el registro puede ser el de la caché, que sigue cambiando
+                resumen[user_id] = copy.deepcopy(registro['riego'])
+                con_riegos = True
+            else:
+                resumen.pop(user_id, None)
+            if registro:
+                archivos[self.cache.ruta(user_id)] = serializar(registro, default=serializar_json)
+            else:
+                # Usuario sin datos: su archivo sobra
+                try:
+                    os.remove(self.cache.ruta(user_id))
+                except FileNotFoundError:
+                    pass
+        if con_riegos:
+            # El resumen se confirma junto con los archivos de usuario
+            archivos[self.ruta_resumen] = serializar(resumen)
+        try:
+            escribir_atomico(archivos, conservar_anterior=False)
+        except Exception as e:
+            print(f"Error guardando archivos de usuario: {e}")
+            return []
+        self._resumen = resumen
+        self.bytes_escritos += sum(len(contenido) for contenido in archivos.values())
+        return list(pendientes)
+
+    def confirmar(self, lote, guardados):
+        """Libera a los usuarios guardados que no volvieron a cambiar"""
+        if not guardados:
+            return
+        for user_id, version in lote['versiones'].items():
+            if self.cache._fijados.get(user_id) == version:
+                self.cache._fijados.pop(user_id, None)
+        self.cache._desalojar()
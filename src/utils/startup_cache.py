@@ -0,0 +1,64 @@
+import logging
+import os
+import pickle
+import stat
+
+from src.utils.atomic import escribir_atomico
+
+logger = logging.getLogger('plantas_bot')
+
+# Cambiar al modificar la forma de los datos en memoria (p. ej. SerieMedidas)
+VERSION_CACHE = 2
+
+def firma_archivo(ruta):
+    """Identifica la versión de un archivo por su inodo (cada escritura
+    atómica crea uno nuevo), fecha de modificación y tamaño. None si no existe"""
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+def _motivo_inseguro(descriptor):
+    """Motivo por el que no es seguro deserializar el archivo abierto (pickle
+    ejecuta código): que no sea del usuario del bot o que otros puedan
+    escribir en él. None si es seguro"""
+    estado = os.fstat(descriptor)
+    if not stat.S_ISREG(estado.st_mode):
+        return "no es un archivo normal"
+    if hasattr(os, 'getuid') and estado.st_uid != os.getuid():
+        return "pertenece a otro usuario"
+    if estado.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        return "otros usuarios pueden escribir en él"
+    return None
+
+def leer_cache(ruta):
+    """Lee la caché binaria: dominio -> {'firma', 'datos'}. Devuelve un
+    diccionario vacío si falta, está dañada, es de otra versión o no es
+    seguro cargarla"""
+    try:
+        with open(ruta, 'rb') as f:
+            motivo = _motivo_inseguro(f.fileno())
+            if motivo is not None:
+                logger.warning(f"Caché de inicio ignorada: {ruta} {motivo}")
+                return {}
+            contenido = pickle.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Caché de inicio descartada: {e}")
+        return {}
+    if not isinstance(contenido, dict) or contenido.get('version') != VERSION_CACHE:
+        return {}
+    return contenido.get('dominios', {})
+
+def escribir_cache(ruta, dominios):
+    """Escribe la caché binaria. dominios: dominio -> {'firma', 'datos'}"""
+    contenido = pickle.dumps(
+        {'version': VERSION_CACHE, 'dominios': dominios}, protocol=pickle.HIGHEST_PROTOCOL
+    )
+    try:
+        escribir_atomico({ruta: contenido}, conservar_anterior=False)
+        os.chmod(ruta, stat.S_IRUSR | stat.S_IWUSR)
+    except Exception as e:
+        logger.error(f"Error guardando la caché de inicio: {e}")
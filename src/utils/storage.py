@@ -1,108 +1,263 @@
-import json
+import asyncio
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from src.config import Config
+# obtener_ruta_archivo se mantiene disponible desde este módulo
+from src.utils.backends import crear_backend, obtener_ruta_archivo
+from src.utils.counters import ContadoresGlobales
+from src.utils.latency import medir_fase
+from src.utils.leader import es_lider
+from src.utils.metrics import bot_metrics
 
 # Constante para horas totales de servicio comunitario
 TOTAL_HORAS = Config.TOTAL_HORAS_SERVICIO
 
-# Diccionarios globales para almacenar datos
-plantas_por_usuario = {}
-medidas_por_usuario = {}
-riego_por_usuario = {}
-horas_por_usuario = {}
+# Diccionarios globales para almacenar datos. Con STORAGE_BACKEND=shards son
+# vistas que cargan a cada usuario bajo demanda desde su propio archivo
+if Config.STORAGE_BACKEND.lower() == 'shards':
+    from src.utils.shards import VistaDominio
+    plantas_por_usuario = VistaDominio('plantas', lambda: obtener_backend().cache)
+    medidas_por_usuario = VistaDominio('medidas', lambda: obtener_backend().cache)
+    riego_por_usuario = VistaDominio('riego', lambda: obtener_backend().cache)
+    horas_por_usuario = VistaDominio('horas', lambda: obtener_backend().cache)
+else:
+    plantas_por_usuario = {}
+    medidas_por_usuario = {}
+    riego_por_usuario = {}
+    horas_por_usuario = {}
 
-def obtener_ruta_archivo(nombre_archivo):
-    """Obtiene la ruta completa del archivo de datos"""
-    return os.path.join(Config.DATA_DIR, nombre_archivo)
+# Dominios persistidos: nombre -> diccionario en memoria
+DOMINIOS = {
+    'plantas': plantas_por_usuario,
+    'medidas': medidas_por_usuario,
+    'riego': riego_por_usuario,
+    'horas': horas_por_usuario,
+}
+
+# Estadísticas globales que se ajustan en cada cambio marcado. Quien modifique
+# los diccionarios sin marcar_modificado debe llamar a contadores.invalidar()
+contadores = ContadoresGlobales(DOMINIOS)
+
+# Dominios modificados desde el último guardado -> claves afectadas
+# (user_id, o (user_id, planta) si el cambio se limita a una planta)
+_modificados = {}
+
+# Operaciones de cada planta modificada desde el último guardado:
+# (dominio, (user_id, planta)) -> [operación, ...]. Los backends que lo
+# admiten (SQLite) escriben solo esas filas; si falta, la planta se reescribe
+_operaciones = {}
+
+# Backend de persistencia activo (JSON o SQLite), creado al primer uso
+_backend = None
+
+# Guardado diferido: tarea que agrupa los guardados y hilo que escribe
+_tarea_guardado = None
+_ejecutor = None
+
+def obtener_backend():
+    """Obtiene el backend de persistencia configurado en STORAGE_BACKEND"""
+    global _backend
+    if _backend is None:
+        _backend = crear_backend(Config.STORAGE_BACKEND)
+    return _backend
+
+def cerrar_almacenamiento():
+    """Libera el backend activo (conexiones, compactaciones en curso)"""
+    global _backend, _ejecutor
+    if _ejecutor is not None:
+        _ejecutor.shutdown(wait=True)
+        _ejecutor = None
+    if _backend is not None:
+        if not _modificados:
+            # Todo está guardado: el próximo arranque puede usar la caché
+            _backend.guardar_cache(DOMINIOS)
+        _backend.cerrar()
+        _backend = None
+
+def marcar_modificado(dominio, user_id=None, planta=None, operacion=None):
+    """Marca un dominio (y opcionalmente un usuario o una de sus plantas)
+    como pendiente de guardar.
+
+    operacion describe el cambio hecho en la planta, p. ej. ('anexar',
+    posición, medida), ('borrar', posición) o ('actualizar', riego), para
+    escribir solo las filas afectadas. Sin ella se reescribe la planta.
+    """
+    if dominio not in DOMINIOS:
+        raise ValueError(f"Dominio de datos desconocido: {dominio}")
+    claves = _modificados.setdefault(dominio, set())
+    contadores.actualizar(dominio, user_id)
+    if user_id is None:
+        return
+    obtener_backend().marcar(user_id)
+    if planta is None:
+        claves.add(user_id)
+    elif user_id not in claves:
+        clave = (user_id, planta)
+        if clave not in claves:
+            claves.add(clave)
+            if operacion is not None:
+                _operaciones[(dominio, clave)] = [operacion]
+        elif operacion is not None and (dominio, clave) in _operaciones:
+            _operaciones[(dominio, clave)].append(operacion)
+        else:
+            # Un cambio sin describir: la planta se reescribe completa
+            _operaciones.pop((dominio, clave), None)
+
+def obtener_modificados():
+    """Devuelve una copia de los dominios y claves pendientes de guardar"""
+    return {dominio: set(claves) for dominio, claves in _modificados.items()}
 
 def cargar_datos():
-    """Carga todos los datos desde archivos JSON"""
-    global plantas_por_usuario, medidas_por_usuario, riego_por_usuario, horas_por_usuario
-    
+    """Carga todos los datos desde el backend configurado"""
     # Crear directorio de datos si no existe
     os.makedirs(Config.DATA_DIR, exist_ok=True)
-    
-    # Cargar plantas
-    try:
-        with open(obtener_ruta_archivo('plantas.json'), 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            plantas_por_usuario.update({int(k): v for k, v in data.items()})
-    except (FileNotFoundError, json.JSONDecodeError):
-        plantas_por_usuario.clear()
-    
-    # Cargar medidas
-    try:
-        with open(obtener_ruta_archivo('medidas.json'), 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            medidas_por_usuario.update({int(k): v for k, v in data.items()})
-    except (FileNotFoundError, json.JSONDecodeError):
-        medidas_por_usuario.clear()
-    
-    # Cargar riego
-    try:
-        with open(obtener_ruta_archivo('riego.json'), 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            riego_por_usuario.update({int(k): v for k, v in data.items()})
-    except (FileNotFoundError, json.JSONDecodeError):
-        riego_por_usuario.clear()
-    
-    # Cargar horas
+
+    obtener_backend().cargar(DOMINIOS)
+
+    # Lo recién cargado coincide con el disco
+    _modificados.clear()
+    _operaciones.clear()
+    contadores.invalidar()
+
+@medir_fase('storage')
+def guardar_datos(*dominios):
+    """Guarda los dominios indicados o, si no se indica ninguno, solo los
+    marcados como modificados.
+
+    Con SAVE_DELAY_MS > 0 y dentro del bucle de eventos el guardado se
+    difiere: los cambios se acumulan durante esa ventana y se escriben
+    juntos desde un hilo auxiliar, sin bloquear a los handlers.
+    """
+    for dominio in dominios:
+        marcar_modificado(dominio)
+
+    if not _modificados or not es_lider():
+        # Solo el líder escribe los datos
+        return
+
+    if Config.SAVE_DELAY_MS > 0:
+        try:
+            _programar_guardado(asyncio.get_running_loop())
+            return
+        except RuntimeError:
+            # Sin bucle de eventos (scripts, pruebas): guardar ahora
+            pass
+
+    backend = obtener_backend()
+    pendientes, operaciones = _tomar_pendientes()
+    lote = backend.capturar(DOMINIOS, pendientes)
+    guardados = _guardar_lote(backend, lote, pendientes, operaciones)
+    backend.confirmar(lote, guardados)
+    _restaurar_pendientes(pendientes, guardados)
+    _compactar_si_hace_falta(backend)
+
+def _guardar_lote(backend, lote, pendientes, operaciones=None):
+    """Escribe un lote y registra su duración y los bytes escritos"""
+    antes = backend.bytes_escritos
+    inicio = time.perf_counter_ns()
     try:
-        with open(obtener_ruta_archivo('horas.json'), 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            horas_por_usuario.update({int(k): v for k, v in data.items()})
-    except (FileNotFoundError, json.JSONDecodeError):
-        horas_por_usuario.clear()
-
-def guardar_datos():
-    """Guarda todos los datos en archivos JSON"""
+        return backend.guardar(lote, pendientes, operaciones)
+    finally:
+        bot_metrics.record_save(time.perf_counter_ns() - inicio, backend.bytes_escritos - antes)
+
+def _tomar_pendientes():
+    """Retira los cambios pendientes y sus operaciones. Un cambio de
+    usuario completo ya cubre los de sus plantas"""
     # Crear directorio si no existe
     os.makedirs(Config.DATA_DIR, exist_ok=True)
-    
-    # Guardar plantas
-    try:
-        with open(obtener_ruta_archivo('plantas.json'), 'w', encoding='utf-8') as f:
-            json.dump(plantas_por_usuario, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"Error guardando plantas: {e}")
-    
-    # Guardar medidas
-    try:
-        with open(obtener_ruta_archivo('medidas.json'), 'w', encoding='utf-8') as f:
-            json.dump(medidas_por_usuario, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"Error guardando medidas: {e}")
-    
-    # Guardar riego
-    try:
-        with open(obtener_ruta_archivo('riego.json'), 'w', encoding='utf-8') as f:
-            json.dump(riego_por_usuario, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"Error guardando riego: {e}")
-    
-    # Guardar horas
+
+    pendientes = {}
+    for dominio, claves in _modificados.items():
+        usuarios = {clave for clave in claves if not isinstance(clave, tuple)}
+        pendientes[dominio] = {
+            clave for clave in claves
+            if not isinstance(clave, tuple) or clave[0] not in usuarios
+        }
+    operaciones = {}
+    for (dominio, clave), lista in _operaciones.items():
+        if clave in pendientes.get(dominio, ()):
+            operaciones.setdefault(dominio, {})[clave] = lista
+    _modificados.clear()
+    _operaciones.clear()
+    return pendientes, operaciones
+
+def _restaurar_pendientes(pendientes, guardados):
+    """Vuelve a marcar los dominios que no se pudieron guardar"""
+    for dominio, claves in pendientes.items():
+        if dominio in guardados:
+            continue
+        _modificados.setdefault(dominio, set()).update(claves)
+        # Sus operaciones no se aplicaron: esas plantas se reescriben
+        for clave in claves:
+            _operaciones.pop((dominio, clave), None)
+
+def _compactar_si_hace_falta(backend):
+    """Compacta el diario del backend si superó su tamaño máximo"""
+    if backend.necesita_compactar():
+        backend.compactar(DOMINIOS)
+
+def _programar_guardado(loop):
+    """Lanza la tarea de guardado diferido si no hay una en marcha"""
+    global _tarea_guardado
+    if _tarea_guardado is None or _tarea_guardado.done():
+        _tarea_guardado = loop.create_task(_guardado_diferido())
+
+async def _guardado_diferido():
+    """Agrupa los cambios de cada ventana en una sola escritura"""
+    while _modificados:
+        await asyncio.sleep(Config.SAVE_DELAY_MS / 1000)
+        await _volcar_pendientes()
+
+async def _volcar_pendientes():
+    """Escribe los cambios pendientes desde el hilo auxiliar"""
+    global _ejecutor
+    if not _modificados or not es_lider():
+        return
+    if _ejecutor is None:
+        # Un solo hilo para que las escrituras conserven su orden
+        _ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='guardado')
+
+    backend = obtener_backend()
+    # Copia coherente: se toma sin ceder el bucle, así que ningún handler
+    # puede modificar los datos a mitad
+    pendientes, operaciones = _tomar_pendientes()
+    lote = backend.capturar(DOMINIOS, pendientes, copiar=True)
     try:
-        with open(obtener_ruta_archivo('horas.json'), 'w', encoding='utf-8') as f:
-            json.dump(horas_por_usuario, f, indent=2, ensure_ascii=False)
+        guardados = await asyncio.get_running_loop().run_in_executor(
+            _ejecutor, _guardar_lote, backend, lote, pendientes, operaciones
+        )
     except Exception as e:
-        print(f"Error guardando horas: {e}")
+        print(f"Error en el guardado diferido: {e}")
+        guardados = []
+    backend.confirmar(lote, guardados)
+    _restaurar_pendientes(pendientes, guardados)
+    _compactar_si_hace_falta(backend)
+
+async def vaciar_guardados():
+    """Espera el guardado diferido en curso y escribe lo que quede pendiente"""
+    if _tarea_guardado is not None and not _tarea_guardado.done():
+        await _tarea_guardado
+    await _volcar_pendientes()
+
+def listar_riegos():
+    """(user_id, riegos de sus plantas) de todos los usuarios con riego.
+
+    Con el backend 'shards' sale de un resumen en un solo archivo, sin cargar
+    los archivos de cada usuario.
+    """
+    return obtener_backend().riegos(DOMINIOS)
 
 def obtener_estadisticas():
-    """Obtiene estadísticas generales del bot"""
-    total_usuarios = len(set(list(plantas_por_usuario.keys()) + 
-                            list(horas_por_usuario.keys()) + 
-                            list(riego_por_usuario.keys()) + 
-                            list(medidas_por_usuario.keys())))
-    
-    total_plantas = sum(len(plantas) for plantas in plantas_por_usuario.values())
-    total_medidas = sum(len(medidas) for medidas_dict in medidas_por_usuario.values() 
-                       for medidas in medidas_dict.values())
-    
-    return {
-        "total_usuarios": total_usuarios,
-        "total_plantas": total_plantas,
-        "total_medidas": total_medidas,
-        "usuarios_con_plantas": len(plantas_por_usuario),
-        "usuarios_con_horas": len(horas_por_usuario)
-    }
\ No newline at end of file
+    """Obtiene estadísticas generales del bot sin recorrer los datos.
+
+    Con STATS_VERIFY se comparan con un recuento completo y, si difieren,
+    se informa y se corrigen.
+    """
+    if Config.STATS_VERIFY:
+        diferencias = contadores.verificar()
+        if diferencias:
+            print(f"Estadísticas incrementales desincronizadas: {diferencias}")
+            contadores.recontar()
+    return contadores.totales()
@@ -1,14 +1,18 @@
 import re
 from datetime import datetime, date
 
+from src.utils.latency import medir_fase
+
 class ValidationError(Exception):
     """Excepción personalizada para errores de validación"""
     pass
 
 class CommandValidator:
-    """Clase para validar entradas de comandos"""
+    """Clase para validar entradas de comandos. Cada validador cuenta como
+    fase 'validation' del handler que lo usa (ver track_usage)"""
     
     @staticmethod
+    @medir_fase('validation')
     def validate_plant_name(name: str) -> str:
         """Valida y normaliza el nombre de una planta"""
         if not name or not name.strip():
@@ -25,6 +29,7 @@ class CommandValidator:
         return name
     
     @staticmethod
+    @medir_fase('validation')
     def validate_delete_command_args(args: list) -> str:
         """Valida los argumentos del comando eliminar"""
         if not args:
@@ -39,6 +44,7 @@ class CommandValidator:
         return CommandValidator.validate_plant_name(plant_name)
     
     @staticmethod
+    @medir_fase('validation')
     def validate_user_has_plants(user_plants: list) -> list:
         """Valida que el usuario tenga plantas registradas"""
         if not user_plants:
@@ -59,6 +65,7 @@ class CommandValidator:
         return valid_plants
     
     @staticmethod
+    @medir_fase('validation')
     def validate_plant_exists_for_deletion(plant_name: str, user_plants: list) -> str:
         """Valida que una planta exista para ser eliminada"""
         if not user_plants:
@@ -87,6 +94,7 @@ class CommandValidator:
         return matching_plants[0]  # Retornar el nombre original con mayúsculas/minúsculas correctas
     
     @staticmethod
+    @medir_fase('validation')
     def validate_deletion_impact(plant_name: str, user_id: int, related_data: dict = None) -> dict:
         """Valida el impacto de eliminar una planta (medidas, riegos, etc.)"""
         impact = {
@@ -116,6 +124,7 @@ class CommandValidator:
         return impact
     
     @staticmethod
+    @medir_fase('validation')
     def validate_bulk_deletion(plant_name: str, user_plants: list) -> dict:
         """Valida eliminación en lote (todas las plantas con el mismo nombre)"""
         plant_name_clean = plant_name.strip().lower()
@@ -133,6 +142,7 @@ class CommandValidator:
         }
     
     @staticmethod
+    @medir_fase('validation')
     def validate_hours(hours_str: str) -> float:
         """Valida las horas de servicio comunitario"""
         try:
@@ -146,6 +156,7 @@ class CommandValidator:
             raise ValidationError("Ingresa un número válido de horas (ejemplo: 2.5)")
     
     @staticmethod
+    @medir_fase('validation')
     def delete_hours(hours_str: str) -> float:
         """Valida las horas a eliminar del servicio comunitario"""
         try:
@@ -159,6 +170,7 @@ class CommandValidator:
             raise ValidationError("Ingresa un número válido de horas (ejemplo: 2.5)")
     
     @staticmethod
+    @medir_fase('validation')
     def validate_date(date_str: str) -> str:
         """Valida formato de fecha YYYY-MM-DD"""
         try:
@@ -170,6 +182,7 @@ class CommandValidator:
             raise ValidationError("Formato de fecha inválido. Usa YYYY-MM-DD (ejemplo: 2024-01-15)")
     
     @staticmethod
+    @medir_fase('validation')
     def delete_date(date_str: str) -> str:
         """Valida formato de eliminación de fecha YYYY-MM-DD"""
         try:
@@ -181,6 +194,7 @@ class CommandValidator:
             raise ValidationError("Formato de fecha inválido. Usa YYYY-MM-DD (ejemplo: 2024-01-15)")
     
     @staticmethod
+    @medir_fase('validation')
     def validate_measurement(measurement_str: str) -> float:
         """Valida medidas de plantas"""
         try:
@@ -194,6 +208,7 @@ class CommandValidator:
             raise ValidationError("Ingresa una medida válida en centímetros (ejemplo: 25.5)")
     
     @staticmethod
+    @medir_fase('validation')
     def validate_measurement_index(index_str, max_index):
         """Valida un índice de medida"""
         if not index_str or not index_str.strip():
@@ -213,6 +228,7 @@ class CommandValidator:
         return index
 
     @staticmethod
+    @medir_fase('validation')
     def validate_plant_exists(plant_name, user_plants):
         """Valida que una planta exista en la lista del usuario"""
         if not user_plants:
@@ -227,6 +243,7 @@ class CommandValidator:
         raise ValidationError(f"La planta '{plant_name}' no está registrada.")
 
     @staticmethod
+    @medir_fase('validation')
     def validate_has_measurements(user_id, plant_name, measurements_data):
         """Valida que una planta tenga medidas registradas"""
         user_measurements = measurements_data.get(user_id, {})
@@ -238,6 +255,7 @@ class CommandValidator:
         return plant_measurements
     
     @staticmethod
+    @medir_fase('validation')
     def validate_frequency(frequency_str: str) -> int:
         """Valida frecuencia de riego en días"""
         try:
@@ -251,6 +269,7 @@ class CommandValidator:
             raise ValidationError("Ingresa un número válido de días (ejemplo: 7)")
     
     @staticmethod
+    @medir_fase('validation')
     def validate_watering_command_args(args: list, min_args: int = 2) -> tuple:
         """Valida argumentos de comandos de riego"""
         if len(args) < min_args:
@@ -275,6 +294,7 @@ class CommandValidator:
         return validated_plant_name, value
     
     @staticmethod
+    @medir_fase('validation')
     def validate_consult_watering_args(args: list) -> str:
         """Valida argumentos del comando consultar riego"""
         if not args:
@@ -288,6 +308,7 @@ class CommandValidator:
         return CommandValidator.validate_plant_name(plant_name)
     
     @staticmethod
+    @medir_fase('validation')
     def validate_plant_is_registered(plant_name: str, user_id: int, plantas_dict: dict) -> str:
         """Valida que una planta esté registrada para el usuario"""
         plantas = plantas_dict.get(user_id, [])
@@ -307,6 +328,7 @@ class CommandValidator:
         )
     
     @staticmethod
+    @medir_fase('validation')
     def validate_watering_exists(plant_name: str, user_id: int, riego_por_usuario: dict) -> dict:
         """Valida que existan datos de riego para una planta"""
         if user_id not in riego_por_usuario or plant_name not in riego_por_usuario[user_id]:
@@ -327,6 +349,7 @@ class CommandValidator:
         return watering_data
     
     @staticmethod
+    @medir_fase('validation')
     def validate_watering_date(date_str: str) -> str:
         """Valida fecha de riego en formato YYYY-MM-DD"""
         try:
@@ -386,6 +409,7 @@ class CommandValidator:
             raise ValidationError("Error al calcular estado de riego. Datos corruptos")
     
     @staticmethod
+    @medir_fase('validation')
     def validate_frequency_change_args(args: list) -> tuple:
         """Valida argumentos específicos para cambiar frecuencia"""
         if len(args) < 2:
@@ -400,6 +424,7 @@ class CommandValidator:
         return plant_name, frequency
     
     @staticmethod
+    @medir_fase('validation')
     def validate_watering_setup_args(args: list) -> tuple:
         """Valida argumentos para configurar riego"""
         if len(args) < 1:
@@ -430,6 +455,7 @@ class CommandValidator:
         return validated_plant, frequency
     
     @staticmethod
+    @medir_fase('validation')
     def validate_change_watering_date_args(args: list) -> tuple:
         """Valida argumentos para cambiar fecha de riego"""
         if len(args) < 2:
@@ -441,4 +467,48 @@ class CommandValidator:
         plant_name, date_str = CommandValidator.validate_watering_command_args(args, 2)
         validated_date = CommandValidator.validate_watering_date(date_str)
         
-        return plant_name, validated_date
\ No newline at end of file
+        return plant_name, validated_date
+
+    @staticmethod
+    @medir_fase('validation')
+    def validate_upcoming_days_args(args: list) -> int:
+        """Valida el número de días del comando de próximos riegos"""
+        if not args:
+            return 7  # Una semana por defecto
+        if len(args) > 1:
+            raise ValidationError(
+                "Uso correcto: /proximosRiegos [días]\n"
+                "Ejemplo: /proximosRiegos 7"
+            )
+        try:
+            days = int(args[0])
+        except ValueError:
+            raise ValidationError("Ingresa un número válido de días (ejemplo: 7)")
+        if days < 0:
+            raise ValidationError("El número de días no puede ser negativo")
+        if days > 365:
+            raise ValidationError("El número de días no puede ser mayor a 365")
+        return days
+
+    @staticmethod
+    @medir_fase('validation')
+    def validate_profile_args(args: list) -> tuple:
+        """Valida la duración de /perfil: N actualizaciones o Ns segundos.
+        Devuelve ('actualizaciones' | 'segundos', cantidad)"""
+        if not args:
+            return 'actualizaciones', 100
+        if len(args) > 1:
+            raise ValidationError(
+                "Uso correcto: /perfil [actualizaciones | segundos s]\n"
+                "Ejemplos: /perfil 200, /perfil 30s"
+            )
+        texto = args[0].strip().lower()
+        tipo = 'segundos' if texto.endswith('s') else 'actualizaciones'
+        try:
+            cantidad = int(texto.rstrip('s'))
+        except ValueError:
+            raise ValidationError("Ingresa un número de actualizaciones (200) o de segundos (30s)")
+        maximo = 600 if tipo == 'segundos' else 10000
+        if not 1 <= cantidad <= maximo:
+            raise ValidationError(f"El número de {tipo} debe estar entre 1 y {maximo}")
+        return tipo, cantidad
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.utils import repository, storage
+from src.utils.counters import contar
+
+class TestContadoresGlobales(unittest.TestCase):
+
+    def setUp(self):
+        """Usa un directorio de datos temporal y limpio para cada prueba"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir_original = Config.DATA_DIR
+        Config.DATA_DIR = self.tmp.name
+        for datos in storage.DOMINIOS.values():
+            datos.clear()
+        storage._modificados.clear()
+        storage.contadores.invalidar()
+
+    def tearDown(self):
+        storage.cerrar_almacenamiento()
+        Config.DATA_DIR = self.data_dir_original
+        self.tmp.cleanup()
+
+    def test_cambios_sin_recorrer(self):
+        """Prueba que los totales siguen a cada cambio sin recuentos completos"""
+        self.assertEqual(storage.obtener_estadisticas()['total_usuarios'], 0)
+        with mock.patch('src.utils.counters.contar') as recuento:
+            repository.agregar_planta(1, "Rosa")
+            repository.agregar_planta(1, "Cactus")
+            repository.agregar_planta(2, "Menta")
+            repository.agregar_medida(1, "Rosa", 10)
+            repository.agregar_medida(1, "Rosa", 12)
+            repository.configurar_riego(1, "Rosa", 3)
+            repository.sumar_horas(3, "2024-01-15", 2.5)
+            repository.sumar_horas(3, "2024-01-15", 1.5)
+            repository.sumar_horas(3, "2024-01-16", 1)
+            repository.restar_horas(3, "2024-01-16", 1)
+            repository.eliminar_medida(1, "Rosa", 0)
+            estadisticas = storage.obtener_estadisticas()
+            self.assertEqual(recuento.call_count, 0)
+        self.assertEqual(estadisticas, {
+            'total_usuarios': 3, 'total_plantas': 3, 'total_medidas': 1, 'total_riegos': 1,
+            'total_registros_horas': 1, 'total_horas': 4.0,
+            'usuarios_con_plantas': 2, 'usuarios_con_horas': 1,
+        })
+
+        repository.eliminar_planta(1, "Rosa")
+        repository.eliminar_usuario(3)
+        self.assertEqual(storage.contadores.verificar(), {})
+        estadisticas = storage.obtener_estadisticas()
+        self.assertEqual(estadisticas['total_usuarios'], 2)
+        self.assertEqual(estadisticas['total_medidas'], 0)
+        self.assertEqual(estadisticas['total_horas'], 0)
+        self.assertEqual(estadisticas, contar(storage.DOMINIOS))
+
+    def test_modo_verificacion(self):
+        """Prueba que con STATS_VERIFY un cambio no marcado se detecta y corrige"""
+        repository.agregar_planta(1, "Rosa")
+        storage.obtener_estadisticas()
+        storage.plantas_por_usuario[2] = ["Menta"]
+        self.assertEqual(storage.obtener_estadisticas()['total_plantas'], 1)
+        with mock.patch.object(Config, 'STATS_VERIFY', True), mock.patch('builtins.print') as imprimir:
+            self.assertEqual(storage.obtener_estadisticas()['total_plantas'], 2)
+        self.assertIn("desincronizadas", imprimir.call_args[0][0])
+        self.assertEqual(storage.contadores.verificar(), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import asyncio
+import sys
+import os
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.error import RetryAfter, NetworkError
+
+from src.utils.delivery import CuboTokens, LimitadorEnvios, enviar_mensaje, repartir
+
+class BotLimitado:
+    """Responde RetryAfter las primeras veces y registra los envíos"""
+
+    def __init__(self, rechazos=0, error=None):
+        self.rechazos = rechazos
+        self.error = error
+        self.enviados = []
+
+    async def send_message(self, chat_id, text):
+        if self.error:
+            raise self.error
+        if self.rechazos:
+            self.rechazos -= 1
+            raise RetryAfter(0)
+        self.enviados.append((chat_id, text))
+
+class TestEnvios(unittest.TestCase):
+
+    def test_cubo_tokens(self):
+        """Prueba la ráfaga inicial y la espera al agotarse los tokens"""
+        cubo = CuboTokens(2, capacidad=2)
+        self.assertEqual(cubo.espera(0), 0)
+        self.assertEqual(cubo.espera(0), 0)
+        self.assertAlmostEqual(cubo.espera(0), 0.5)
+        self.assertAlmostEqual(cubo.espera(0), 1.0)
+        # Los tokens no se acumulan por encima de la capacidad
+        self.assertEqual(CuboTokens(1, ahora=0).espera(5), 0)
+
+    def test_limite_por_chat(self):
+        """Prueba que los mensajes a un mismo chat se espacian y los de
+        chats distintos no"""
+        limitador = LimitadorEnvios(tasa_global=1000, tasa_chat=50)
+
+        async def escenario():
+            bucle = asyncio.get_running_loop()
+            inicio = bucle.time()
+            await asyncio.gather(*(limitador.esperar_turno(c) for c in range(20)))
+            distintos = bucle.time() - inicio
+            inicio = bucle.time()
+            await asyncio.gather(*(limitador.esperar_turno(99) for _ in range(5)))
+            return distintos, bucle.time() - inicio
+
+        distintos, mismo_chat = asyncio.run(escenario())
+        self.assertLess(distintos, 0.05)
+        self.assertGreaterEqual(mismo_chat, 0.07)
+
+    def test_reintenta_retry_after(self):
+        """Prueba que RetryAfter se reintenta y al agotar intentos se propaga"""
+        limitador = LimitadorEnvios(tasa_global=1000, tasa_chat=1000)
+        bot = BotLimitado(rechazos=2)
+        asyncio.run(enviar_mensaje(bot, limitador, 1, "hola", reintentos=3))
+        self.assertEqual(bot.enviados, [(1, "hola")])
+
+        with self.assertRaises(RetryAfter):
+            asyncio.run(enviar_mensaje(BotLimitado(rechazos=5), limitador, 1, "hola", reintentos=1))
+        with self.assertRaises(NetworkError):
+            asyncio.run(enviar_mensaje(BotLimitado(error=NetworkError("caída")), limitador, 1, "hola"))
+
+    def test_repartir_limita_concurrencia(self):
+        """Prueba que no se superan los envíos simultáneos y que los
+        errores se devuelven en su posición"""
+        activos = {'ahora': 0, 'max': 0}
+
+        async def trabajo(i):
+            activos['ahora'] += 1
+            activos['max'] = max(activos['max'], activos['ahora'])
+            await asyncio.sleep(0.001)
+            activos['ahora'] -= 1
+            if i == 3:
+                raise ValueError(i)
+            return i
+
+        resultados = asyncio.run(repartir((trabajo(i) for i in range(10)), concurrencia=3))
+        self.assertEqual(activos['max'], 3)
+        self.assertIsInstance(resultados[3], ValueError)
+        self.assertEqual(resultados[:3], [0, 1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
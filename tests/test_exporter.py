@@ -0,0 +1,105 @@
+import unittest
+import asyncio
+import sys
+import os
+import tempfile
+from unittest import mock
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.utils import storage
+from src.utils.exporter import ExportadorMetricas
+from src.utils.metrics import BotMetrics
+
+class TestExportadorMetricas(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.metricas = BotMetrics(os.path.join(self.tmp.name, 'metrics.json'), flush_interval=60)
+        parche = mock.patch('src.utils.exporter.bot_metrics', self.metricas)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_formato(self):
+        """Prueba que el texto incluye contadores, histogramas y registros"""
+        self.metricas.record_command_usage(1, 'regar')
+        self.metricas.record_command_usage(2, 'regar')
+        self.metricas.record_latency('regar', 3 * 10**6, {'storage': 10**6})
+        self.metricas.record_operation('revision_riegos', 2 * 10**8)
+        self.metricas.record_save(5 * 10**6, 1234)
+        texto = ExportadorMetricas().generar()
+
+        self.assertIn('plantas_bot_commands_total{command="regar"} 2', texto)
+        self.assertIn('plantas_bot_active_users 2', texto)
+        self.assertIn('plantas_bot_handler_latency_seconds_count{command="regar",phase="storage"} 1', texto)
+        self.assertIn('plantas_bot_handler_latency_seconds_bucket{command="regar",phase="total",le="0.001048575"} 0', texto)
+        self.assertIn('plantas_bot_handler_latency_seconds_bucket{command="regar",phase="total",le="0.005242879"} 1', texto)
+        self.assertIn('plantas_bot_reminder_sweep_seconds_bucket{le="0.268435455"} 1', texto)
+        self.assertIn('plantas_bot_save_bytes_total 1234', texto)
+        self.assertIn('plantas_bot_records{kind="total_plantas"}', texto)
+        self.assertTrue(texto.endswith('\n'))
+        for linea in texto.splitlines():
+            if not linea.startswith('#'):
+                float(linea.rsplit(' ', 1)[1])
+
+    def test_bucket_justo_bajo_el_limite(self):
+        """Prueba que una muestra justo por debajo de un límite nominal
+        cuenta en ese bucket y que el le publicado la cubre"""
+        self.metricas.record_operation('revision_riegos', 999_999)
+        self.metricas.record_operation('revision_riegos', 1_048_576)
+        texto = ExportadorMetricas().generar()
+
+        self.assertIn('plantas_bot_reminder_sweep_seconds_bucket{le="0.001048575"} 1', texto)
+        self.assertIn('plantas_bot_reminder_sweep_seconds_bucket{le="0.005242879"} 2', texto)
+
+    def test_guardado_registrado(self):
+        """Prueba que cada escritura del backend queda en las métricas"""
+        original = Config.DATA_DIR, Config.STORAGE_BACKEND, Config.SAVE_DELAY_MS
+        Config.DATA_DIR, Config.STORAGE_BACKEND, Config.SAVE_DELAY_MS = self.tmp.name, 'json', 0
+        storage.cerrar_almacenamiento()
+        storage._backend = None
+        try:
+            with mock.patch('src.utils.storage.bot_metrics', self.metricas):
+                storage.plantas_por_usuario[999] = ['Rosa']
+                storage.guardar_datos('plantas')
+        finally:
+            storage.plantas_por_usuario.pop(999, None)
+            storage.cerrar_almacenamiento()
+            storage._backend = None
+            Config.DATA_DIR, Config.STORAGE_BACKEND, Config.SAVE_DELAY_MS = original
+        self.assertEqual(self.metricas.operations['guardado'].total, 1)
+        self.assertGreater(self.metricas.saved_bytes, 0)
+
+    def test_servidor_http(self):
+        """Prueba el servidor en el bucle de eventos: /metrics, 404 y retraso"""
+        async def probar():
+            exportador = ExportadorMetricas()
+            with mock.patch('src.utils.exporter.INTERVALO_RETRASO_S', 0.01):
+                await exportador.iniciar('127.0.0.1', 0)
+                try:
+                    respuestas = []
+                    for ruta in ('/metrics', '/otra'):
+                        lector, escritor = await asyncio.open_connection('127.0.0.1', exportador.puerto)
+                        escritor.write(f'GET {ruta} HTTP/1.1\r\nHost: x\r\n\r\n'.encode())
+                        respuestas.append(await lector.read())
+                        escritor.close()
+                    await asyncio.sleep(0.05)
+                finally:
+                    await exportador.detener()
+            return respuestas, exportador
+
+        (metricas, otra), exportador = asyncio.run(probar())
+        self.assertTrue(metricas.startswith(b'HTTP/1.0 200 OK'))
+        self.assertIn(b'text/plain; version=0.0.4', metricas)
+        self.assertIn(b'plantas_bot_event_loop_lag_seconds_count', metricas)
+        self.assertTrue(otra.startswith(b'HTTP/1.0 404'))
+        self.assertGreater(exportador.retraso_bucle.total, 0)
+        self.assertIsNone(exportador.servidor)
+
+if __name__ == '__main__':
+    unittest.main()
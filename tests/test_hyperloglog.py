@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.hyperloglog import HyperLogLog
+
+class TestHyperLogLog(unittest.TestCase):
+
+    def test_estimacion(self):
+        """Prueba que la estimación queda dentro del error esperado"""
+        for total in (0, 10, 1000, 100000):
+            with self.subTest(total=total):
+                boceto = HyperLogLog()
+                for i in range(total):
+                    boceto.agregar(i)
+                    boceto.agregar(i)
+                self.assertLessEqual(abs(boceto.estimar() - total), max(1, total * 0.05))
+
+    def test_combinar(self):
+        """Prueba que la unión cuenta una sola vez los elementos comunes"""
+        a, b = HyperLogLog(), HyperLogLog()
+        for i in range(3000):
+            a.agregar(i)
+        for i in range(2000, 5000):
+            b.agregar(i)
+        union = HyperLogLog.unir([a, b])
+        self.assertLessEqual(abs(union.estimar() - 5000), 250)
+        self.assertLessEqual(abs(a.estimar() - 3000), 150)
+        with self.assertRaises(ValueError):
+            a.combinar(HyperLogLog(precision=8))
+
+    def test_tamano_fijo_y_texto(self):
+        """Prueba que el boceto no crece y se recupera desde su texto"""
+        boceto = HyperLogLog()
+        for i in range(50000):
+            boceto.agregar(i)
+        self.assertEqual(len(boceto.registros), 2048)
+        copia = HyperLogLog.desde_texto(boceto.a_texto())
+        self.assertEqual(copia.registros, boceto.registros)
+        self.assertEqual(copia.precision, boceto.precision)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import unittest
+import asyncio
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.latency import (
+    CONEXIONES_BOT_API, HistogramaLatencia, NUM_BUCKETS, SolicitudMedida, fase,
+    indice_bucket, iniciar_medicion, limite_bucket, medir_fase, terminar_medicion
+)
+from src.utils.metrics import BotMetrics
+from src.utils.decorators import track_usage
+from src.utils.validators import CommandValidator
+
+class TestHistogramaLatencia(unittest.TestCase):
+
+    def test_buckets(self):
+        """Prueba que cada duración cae en un bucket cuyo límite la cubre con
+        un error relativo de como mucho el 25 %"""
+        for ns in list(range(20)) + [999, 10**6, 123456789, 10**12]:
+            with self.subTest(ns=ns):
+                i = indice_bucket(ns)
+                self.assertGreaterEqual(limite_bucket(i), ns)
+                if i:
+                    self.assertLess(limite_bucket(i - 1), ns)
+                self.assertLessEqual(limite_bucket(i), ns * 1.25 + 1)
+        self.assertEqual(indice_bucket(10**18), NUM_BUCKETS - 1)
+
+    def test_percentiles(self):
+        """Prueba p50/p95/p99 con muestras de 1 a 100 ms"""
+        histograma = HistogramaLatencia()
+        for ms in range(1, 101):
+            histograma.registrar(ms * 10**6)
+        resumen = histograma.resumen()
+        self.assertEqual(resumen['count'], 100)
+        for clave, esperado in (('p50_ms', 50), ('p95_ms', 95), ('p99_ms', 99)):
+            self.assertGreaterEqual(resumen[clave], esperado)
+            self.assertLessEqual(resumen[clave], esperado * 1.25)
+        self.assertEqual(HistogramaLatencia().percentil(0.5), 0)
+
+    def test_acumulado_incluye_bucket_partido(self):
+        """Prueba que una muestra justo bajo un límite cuenta aunque su
+        bucket termine después del límite"""
+        histograma = HistogramaLatencia()
+        histograma.registrar(10**6 - 1)
+        histograma.registrar(limite_bucket(indice_bucket(10**6)) + 1)
+        self.assertEqual(histograma.acumulado_hasta(10**6), 1)
+        self.assertEqual(histograma.acumulado_hasta(10**9), 2)
+
+    def test_combinar_y_json(self):
+        """Prueba que combinar suma buckets y que el JSON se recupera igual"""
+        a, b = HistogramaLatencia(), HistogramaLatencia()
+        for ns in (1000, 2000, 3000):
+            a.registrar(ns)
+        b.registrar(5 * 10**6)
+        a.combinar(HistogramaLatencia.desde_json(b.a_json()))
+        self.assertEqual(a.total, 4)
+        self.assertEqual(a.suma, 5006000)
+        copia = HistogramaLatencia.desde_json(a.a_json())
+        self.assertEqual(copia.cuentas, a.cuentas)
+        self.assertEqual(copia.total, a.total)
+
+class TestFases(unittest.TestCase):
+
+    def test_fuera_de_handler(self):
+        """Prueba que fuera de un handler las fases no miden nada"""
+        with fase('storage'):
+            pass
+
+    def test_anidadas_no_se_cuentan_dos_veces(self):
+        """Prueba que una fase dentro de sí misma solo se mide una vez"""
+        @medir_fase('storage')
+        def guardar(nivel):
+            if nivel:
+                guardar(nivel - 1)
+
+        medicion, token = iniciar_medicion()
+        with mock.patch('src.utils.latency.perf_counter_ns', side_effect=[100, 350]):
+            guardar(3)
+        terminar_medicion(token)
+        self.assertEqual(medicion.fases, {'storage': 250})
+
+    def test_validadores_medidos(self):
+        """Prueba que los validadores cuentan como fase 'validation'"""
+        medicion, token = iniciar_medicion()
+        CommandValidator.validate_plant_name("Rosa")
+        terminar_medicion(token)
+        self.assertIn('validation', medicion.fases)
+
+        # Los cálculos auxiliares no son validación
+        medicion, token = iniciar_medicion()
+        CommandValidator.calculate_watering_status({"frecuencia": 3, "ultimo_riego": "2024-01-15"})
+        terminar_medicion(token)
+        self.assertNotIn('validation', medicion.fases)
+
+class TestLatenciaHandlers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.metricas = BotMetrics(os.path.join(self.tmp.name, 'metrics.json'), flush_interval=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_track_usage_registra_latencia(self):
+        """Prueba que track_usage guarda total y fases aunque el handler falle,
+        y que las tareas concurrentes no mezclan sus fases"""
+        @track_usage("regar")
+        async def handler(update, context):
+            with fase('network'):
+                await asyncio.sleep(0.01)
+            if context.fallar:
+                raise RuntimeError("fallo")
+
+        async def probar():
+            update = SimpleNamespace(effective_user=SimpleNamespace(id=1))
+            return await asyncio.gather(
+                handler(update, SimpleNamespace(fallar=False)),
+                handler(update, SimpleNamespace(fallar=True)),
+                return_exceptions=True
+            )
+
+        with mock.patch('src.utils.metrics.bot_metrics', self.metricas):
+            resultados = asyncio.run(probar())
+        self.assertIsInstance(resultados[1], RuntimeError)
+        percentiles = self.metricas.latency_percentiles("regar")
+        self.assertEqual(percentiles['total']['count'], 2)
+        self.assertEqual(percentiles['network']['count'], 2)
+        self.assertGreaterEqual(percentiles['network']['p50_ms'], 10)
+        self.assertIn("Latencia", self.metricas.get_usage_report())
+
+    def test_handlers_de_horas_y_medidas_medidos(self):
+        """Prueba que /horasCumplidas y cada paso de /eliminar_medida
+        registran su latencia"""
+        from src.handlers.hours.hours_summary import horas_cumplidas
+        from src.handlers.plants.delete_measure import (
+            eliminar_medida_confirmar, eliminar_medida_elegir_planta
+        )
+
+        def update(texto):
+            return SimpleNamespace(
+                effective_user=SimpleNamespace(id=1),
+                message=SimpleNamespace(text=texto, reply_text=mock.AsyncMock()),
+            )
+
+        async def probar():
+            await horas_cumplidas(update("/horasCumplidas"), SimpleNamespace(args=[]))
+            await eliminar_medida_elegir_planta(update("cancelar"), SimpleNamespace(user_data={}))
+            await eliminar_medida_confirmar(update("10.0 cm"), SimpleNamespace(user_data={}))
+
+        with mock.patch('src.utils.metrics.bot_metrics', self.metricas), \
+                mock.patch('src.utils.repository.obtener_horas', return_value=[]):
+            asyncio.run(probar())
+        for comando in ("horasCumplidas", "eliminar_medida_planta", "eliminar_medida_confirmar"):
+            with self.subTest(comando=comando):
+                self.assertEqual(self.metricas.latency_percentiles(comando)['total']['count'], 1)
+
+    def test_solicitud_con_pool_del_builder(self):
+        """Prueba que las peticiones medidas no limitan el pool a 1 conexión"""
+        limites = SolicitudMedida()._client_kwargs['limits']
+        self.assertEqual(limites.max_connections, CONEXIONES_BOT_API)
+        self.assertEqual(CONEXIONES_BOT_API, 256)
+
+    def test_persistencia(self):
+        """Prueba que los histogramas se acumulan entre reinicios"""
+        self.metricas.record_latency("medir", 2 * 10**6, {'storage': 10**6})
+        self.metricas.flush()
+        recargadas = BotMetrics(self.metricas.metrics_file, flush_interval=60)
+        recargadas.record_latency("medir", 4 * 10**6)
+        percentiles = recargadas.latency_percentiles()
+        self.assertEqual(percentiles["medir"]['total']['count'], 2)
+        self.assertEqual(percentiles["medir"]['storage']['count'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
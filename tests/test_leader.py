@@ -0,0 +1,165 @@
+import unittest
+import sys
+import os
+import subprocess
+import tempfile
+import time
+import json
+import logging
+from unittest import mock
+
+# Agregar el directorio src al path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from src.config import Config
+from src.utils import leader, storage
+from src.utils.leader import EleccionLider
+from src.utils.metrics import BotMetrics
+
+class TestEleccionLider(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.tmp.name, 'lider.lock')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_un_solo_lider(self):
+        """Prueba que solo una instancia obtiene el arrendamiento"""
+        a = EleccionLider(self.ruta, duracion=30)
+        b = EleccionLider(self.ruta, duracion=30)
+        self.assertTrue(a.renovar(ahora=100))
+        self.assertFalse(b.renovar(ahora=100))
+        self.assertEqual(b.lider_actual, a.identificador)
+        # El latido del líder lo mantiene
+        self.assertTrue(a.renovar(ahora=120))
+        self.assertFalse(b.renovar(ahora=140))
+        self.assertTrue(a.vigente(ahora=149))
+        self.assertFalse(b.vigente(ahora=149))
+
+    def test_relevo_al_caducar(self):
+        """Prueba que sin latidos otra instancia toma el relevo y el líder
+        anterior se entera al renovar"""
+        a = EleccionLider(self.ruta, duracion=30)
+        b = EleccionLider(self.ruta, duracion=30)
+        a.renovar(ahora=100)
+        self.assertTrue(b.renovar(ahora=131))
+        self.assertFalse(a.vigente(ahora=131))
+        self.assertFalse(a.renovar(ahora=132))
+        self.assertEqual(a.lider_actual, b.identificador)
+
+    def test_soltar(self):
+        """Prueba que al detenerse el líder el relevo es inmediato"""
+        a = EleccionLider(self.ruta, duracion=30)
+        b = EleccionLider(self.ruta, duracion=30)
+        a.renovar(ahora=100)
+        a.soltar()
+        self.assertFalse(a.vigente(ahora=100))
+        self.assertTrue(b.renovar(ahora=101))
+        # Soltar sin ser líder no toca el arrendamiento ajeno
+        a.soltar()
+        self.assertTrue(b.renovar(ahora=102))
+
+    def test_esperar(self):
+        """Prueba que la reserva espera hasta que el arrendamiento queda libre"""
+        a = EleccionLider(self.ruta, duracion=30)
+        b = EleccionLider(self.ruta, duracion=30)
+        a.renovar()
+        esperas = []
+
+        def dormir(segundos):
+            esperas.append(segundos)
+            if len(esperas) == 3:
+                a.soltar()
+
+        b.esperar(intervalo=5, dormir=dormir)
+        self.assertEqual(esperas, [5, 5, 5])
+        self.assertTrue(b.vigente())
+
+    def test_entre_procesos(self):
+        """Prueba la exclusión con otro proceso real"""
+        codigo = (
+            "import sys; sys.path.insert(0, sys.argv[1]);"
+            "from src.utils.leader import EleccionLider;"
+            "print(EleccionLider(sys.argv[2], duracion=60).renovar())"
+        )
+        salida = subprocess.run([sys.executable, "-c", codigo, RAIZ, self.ruta],
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(salida.stdout.strip(), "True")
+
+        local = EleccionLider(self.ruta, duracion=60)
+        self.assertFalse(local.renovar())
+        # El otro proceso terminó sin soltar: el relevo llega al caducar
+        self.assertTrue(local.renovar(ahora=time.time() + 61))
+
+    def test_es_lider_sin_eleccion(self):
+        """Prueba que sin LEADER_ELECTION toda instancia es líder"""
+        original = Config.LEADER_ELECTION
+        try:
+            Config.LEADER_ELECTION = False
+            self.assertTrue(leader.es_lider())
+            Config.LEADER_ELECTION = True
+            self.assertEqual(leader.es_lider(), leader.lider.vigente())
+        finally:
+            Config.LEADER_ELECTION = original
+
+class TestInstanciaEnReserva(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        originales = (Config.DATA_DIR, Config.LEADER_ELECTION, Config.SAVE_DELAY_MS)
+        Config.DATA_DIR, Config.LEADER_ELECTION, Config.SAVE_DELAY_MS = self.tmp.name, True, 0
+        for datos in storage.DOMINIOS.values():
+            datos.clear()
+        storage._modificados.clear()
+        expira = leader.lider.expira
+
+        def restaurar():
+            storage.cerrar_almacenamiento()
+            Config.DATA_DIR, Config.LEADER_ELECTION, Config.SAVE_DELAY_MS = originales
+            leader.lider.expira = expira
+            self.tmp.cleanup()
+        self.addCleanup(restaurar)
+        self.archivo_metricas = os.path.join(self.tmp.name, 'metrics.json')
+
+    def test_solo_el_lider_escribe(self):
+        """Prueba que sin el liderazgo no se guardan datos ni métricas"""
+        leader.lider.expira = 0.0
+        metricas = BotMetrics(self.archivo_metricas, flush_interval=60)
+        storage.plantas_por_usuario[1] = ["Rosa"]
+        storage.marcar_modificado('plantas', 1)
+        storage.guardar_datos()
+        metricas.record_command_usage(1, "regar")
+        metricas.flush()
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+        leader.lider.expira = time.time() + 60
+        storage.guardar_datos()
+        metricas.flush()
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'plantas.json')))
+        self.assertTrue(os.path.exists(self.archivo_metricas))
+
+    def test_arranque_recarga_metricas_tras_esperar(self):
+        """Prueba que las métricas escritas por el líder anterior mientras
+        esta instancia esperaba se leen al tomar el liderazgo"""
+        from src import bot
+        metricas = BotMetrics(self.archivo_metricas, flush_interval=60)
+
+        def esperar():
+            # El líder anterior escribe sus métricas al detenerse
+            with open(self.archivo_metricas, 'w', encoding='utf-8') as f:
+                json.dump({"commands_usage": {"regar": 7}}, f)
+            leader.lider.expira = time.time() + 60
+
+        with mock.patch.object(bot, 'bot_metrics', metricas), \
+                mock.patch.object(leader.lider, 'esperar', side_effect=esperar), \
+                mock.patch.object(bot, 'ApplicationBuilder'), \
+                mock.patch.object(bot, 'setup_logger', return_value=logging.getLogger('plantas_bot')), \
+                mock.patch.object(Config, 'BOT_TOKEN', 'token'):
+            bot.run_bot()
+        self.assertEqual(metricas.metrics["commands_usage"], {"regar": 7})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.locks import GestorBloqueos, ProcesadorPorUsuario, bloqueos
+
+class TestBloqueos(unittest.TestCase):
+
+    def setUp(self):
+        self.bloqueos = GestorBloqueos()
+
+    def test_mismo_usuario_en_orden(self):
+        """Prueba que lectura-modificación-escritura no pierde cambios"""
+        datos = {'horas': 0}
+
+        async def sumar():
+            async with self.bloqueos.turno(1):
+                actual = datos['horas']
+                await asyncio.sleep(0)
+                datos['horas'] = actual + 1
+
+        async def escenario():
+            await asyncio.gather(*(sumar() for _ in range(20)))
+
+        asyncio.run(escenario())
+        self.assertEqual(datos['horas'], 20)
+        self.assertEqual(self.bloqueos.bloqueados(), [])
+
+    def test_usuarios_distintos_en_paralelo(self):
+        """Prueba que dos usuarios no se esperan entre sí"""
+        dentro = set()
+
+        async def tarea(user_id, otro):
+            async with self.bloqueos.turno(user_id):
+                dentro.add(user_id)
+                # Solo termina si el otro usuario también entró
+                while otro not in dentro:
+                    await asyncio.sleep(0)
+
+        async def escenario():
+            await asyncio.wait_for(asyncio.gather(tarea(1, 2), tarea(2, 1)), timeout=1)
+
+        asyncio.run(escenario())
+
+    def test_reentrante(self):
+        """Prueba que la misma tarea puede volver a bloquear a su usuario"""
+        async def escenario():
+            async with self.bloqueos.turno(1):
+                async with self.bloqueos.turno(1):
+                    return True
+
+        self.assertTrue(asyncio.run(asyncio.wait_for(escenario(), timeout=1)))
+
+    def test_procesador_por_usuario(self):
+        """Prueba que el procesador de actualizaciones ordena por usuario"""
+        orden = []
+
+        async def atender(nombre):
+            orden.append(f"{nombre}-inicio")
+            await asyncio.sleep(0.01)
+            orden.append(f"{nombre}-fin")
+
+        def actualizacion(user_id):
+            return SimpleNamespace(effective_user=SimpleNamespace(id=user_id))
+
+        async def escenario():
+            procesador = ProcesadorPorUsuario(8)
+            await asyncio.gather(
+                procesador.process_update(actualizacion(1), atender("u1-a")),
+                procesador.process_update(actualizacion(1), atender("u1-b")),
+                procesador.process_update(actualizacion(2), atender("u2")),
+            )
+
+        asyncio.run(escenario())
+        self.assertLess(orden.index("u1-a-fin"), orden.index("u1-b-inicio"))
+        self.assertLess(orden.index("u2-inicio"), orden.index("u1-a-fin"))
+        self.assertEqual(bloqueos.bloqueados(), [])
+
+    def test_procesador_no_ocupa_plazas_esperando_turno(self):
+        """Prueba que una actualización que espera a otra de su usuario no
+        quita la plaza a la de otro usuario"""
+        orden = []
+        liberar = None
+
+        async def lenta():
+            await liberar.wait()
+            orden.append("u1-a")
+
+        async def atender(nombre):
+            orden.append(nombre)
+
+        def actualizacion(user_id):
+            return SimpleNamespace(effective_user=SimpleNamespace(id=user_id))
+
+        async def escenario():
+            nonlocal liberar
+            liberar = asyncio.Event()
+            procesador = ProcesadorPorUsuario(2)
+            tareas = [
+                asyncio.create_task(procesador.process_update(actualizacion(1), lenta())),
+                asyncio.create_task(procesador.process_update(actualizacion(1), atender("u1-b"))),
+                asyncio.create_task(procesador.process_update(actualizacion(2), atender("u2"))),
+            ]
+            # u2 entra en la plaza libre aunque u1-b siga esperando su turno
+            await asyncio.wait_for(tareas[2], timeout=1)
+            liberar.set()
+            await asyncio.gather(*tareas)
+
+        asyncio.run(escenario())
+        self.assertEqual(orden, ["u2", "u1-a", "u1-b"])
+        self.assertEqual(bloqueos.bloqueados(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import unittest
+import asyncio
+import json
+import sys
+import os
+import tempfile
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.utils.metrics import BotMetrics, RETENCION_BOCETOS, archivar_errores
+from src.utils.serializer import deserializar
+
+class TestBotMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archivo = os.path.join(self.tmp.name, 'metrics.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def leer(self):
+        with open(self.archivo, 'rb') as f:
+            return deserializar(f.read())
+
+    def test_registro_sin_escritura(self):
+        """Prueba que registrar comandos no escribe el archivo hasta el volcado"""
+        metricas = BotMetrics(self.archivo, flush_interval=60)
+        with mock.patch.object(metricas, '_escribir') as escribir:
+            for _ in range(100):
+                metricas.record_command_usage(1, "regar")
+            self.assertEqual(escribir.call_count, 0)
+            metricas.flush()
+            metricas.flush()
+            self.assertEqual(escribir.call_count, 1)
+
+    def test_volcado_y_recarga(self):
+        """Prueba que el volcado conserva contadores y usuarios al reiniciar"""
+        metricas = BotMetrics(self.archivo, flush_interval=60)
+        metricas.record_command_usage(1, "regar")
+        metricas.record_command_usage(2, "regar")
+        asyncio.run(metricas.flush_async())
+        self.assertEqual(self.leer()["commands_usage"], {"regar": 2})
+
+        recargadas = BotMetrics(self.archivo, flush_interval=60)
+        self.assertEqual(recargadas.metrics["commands_usage"]["regar"], 2)
+        self.assertEqual(recargadas.metrics["total_users"], {1, 2})
+
+    def test_volcado_fallido_se_reintenta(self):
+        """Prueba que si falla la escritura los cambios siguen pendientes"""
+        metricas = BotMetrics(self.archivo, flush_interval=60)
+        metricas.record_command_usage(1, "regar")
+        with mock.patch.object(metricas, '_escribir', side_effect=OSError("disco lleno")):
+            asyncio.run(metricas.flush_async())
+        self.assertFalse(os.path.exists(self.archivo))
+        metricas.flush()
+        self.assertEqual(self.leer()["total_users"], [1])
+
+    def test_sin_intervalo_guarda_siempre(self):
+        """Prueba que con intervalo 0 se guarda en cada registro"""
+        metricas = BotMetrics(self.archivo, flush_interval=0)
+        metricas.record_command_usage(1, "medir")
+        self.assertEqual(self.leer()["commands_usage"], {"medir": 1})
+
+    def test_modo_hll(self):
+        """Prueba que en modo 'hll' solo el día actual es exacto y los
+        usuarios se cuentan con bocetos"""
+        metricas = BotMetrics(self.archivo, flush_interval=60, unique_mode="hll")
+        for user_id in range(500):
+            metricas.record_command_usage(user_id, "regar")
+            metricas.record_command_usage(user_id, "medir")
+        self.assertEqual(metricas.unique_users("dia"), 500)
+        self.assertLessEqual(abs(metricas.unique_users("total") - 500), 10)
+        self.assertLessEqual(abs(metricas.unique_users("mes") - 500), 10)
+        self.assertIn("Usuarios activos hoy: 500", metricas.get_usage_report())
+
+        metricas.flush()
+        guardado = self.leer()
+        self.assertNotIn("total_users", guardado)
+        recargadas = BotMetrics(self.archivo, flush_interval=60, unique_mode="hll")
+        self.assertEqual(recargadas.unique_users("total"), metricas.unique_users("total"))
+
+    def test_migracion_a_hll(self):
+        """Prueba que los sets exactos de días anteriores pasan a bocetos y
+        que la memoria queda acotada"""
+        exactas = BotMetrics(self.archivo, flush_interval=60, unique_mode="exact")
+        hoy = date.today()
+        for dias in range(400):
+            dia = (hoy - timedelta(days=dias)).isoformat()
+            exactas.metrics["daily_active_users"][dia] = {dias, dias + 1}
+            exactas.metrics["total_users"].update({dias, dias + 1})
+        exactas.save_metrics()
+
+        metricas = BotMetrics(self.archivo, flush_interval=60, unique_mode="hll")
+        self.assertEqual(list(metricas.metrics["daily_active_users"]), [hoy.isoformat()])
+        self.assertEqual(metricas.unique_users("dia"), 2)
+        self.assertLessEqual(abs(metricas.unique_users("total") - 401), 12)
+        for periodo, conservar in RETENCION_BOCETOS.items():
+            self.assertLessEqual(len(metricas.sketches[periodo]), conservar)
+
+    def test_usuarios_por_periodo_exacto(self):
+        """Prueba el conteo de la semana y el mes en modo exacto"""
+        metricas = BotMetrics(self.archivo, flush_interval=60, unique_mode="exact")
+        metricas.record_command_usage(1, "regar")
+        metricas.metrics["daily_active_users"]["2000-01-01"] = {2, 3}
+        self.assertEqual(metricas.unique_users("semana"), 1)
+        self.assertEqual(metricas.unique_users("total"), 1)
+
+    def test_bufer_de_errores(self):
+        """Prueba que el búfer de errores no crece y lo que sale se archiva
+        comprimido en el segmento del día"""
+        original = Config.METRICS_ERROR_BUFFER
+        Config.METRICS_ERROR_BUFFER = 5
+        try:
+            metricas = BotMetrics(self.archivo, flush_interval=60)
+            for i in range(12):
+                metricas.record_error(1, "regar", f"fallo {i}")
+        finally:
+            Config.METRICS_ERROR_BUFFER = original
+        self.assertEqual(len(metricas.metrics["errors"]), 5)
+        self.assertIn("Errores hoy: 12", metricas.get_usage_report())
+
+        metricas.flush()
+        hoy = date.today().isoformat()
+        segmento = os.path.join(self.tmp.name, "errores", f"errores-{hoy}.jsonl.gz")
+        self.assertTrue(os.path.exists(segmento))
+        self.assertEqual([e["error"] for e in metricas.errors_for_day(hoy)],
+                         [f"fallo {i}" for i in range(12)])
+        guardado = self.leer()
+        self.assertEqual(len(guardado["errors"]), 5)
+        self.assertEqual(guardado["errors_per_day"], {hoy: 12})
+
+    def test_sin_bufer_de_errores(self):
+        """Prueba que con METRICS_ERROR_BUFFER=0 cada error se archiva
+        directamente"""
+        original = Config.METRICS_ERROR_BUFFER
+        Config.METRICS_ERROR_BUFFER = 0
+        try:
+            metricas = BotMetrics(self.archivo, flush_interval=60)
+            for i in range(3):
+                metricas.record_error(1, "regar", f"fallo {i}")
+        finally:
+            Config.METRICS_ERROR_BUFFER = original
+        self.assertEqual(len(metricas.metrics["errors"]), 0)
+
+        metricas.flush()
+        hoy = date.today().isoformat()
+        self.assertEqual([e["error"] for e in metricas.errors_for_day(hoy)],
+                         ["fallo 0", "fallo 1", "fallo 2"])
+        self.assertEqual(self.leer()["errors_per_day"], {hoy: 3})
+
+    def test_errores_de_la_aplicacion(self):
+        """Prueba que los errores de los handlers y los no atendidos llegan al
+        registro de errores"""
+        from src import bot
+        from src.utils.decorators import handle_errors
+
+        @handle_errors
+        async def regar(update, context):
+            raise RuntimeError("sin datos")
+
+        usuario = SimpleNamespace(id=7, username="ana")
+        update = SimpleNamespace(effective_user=usuario,
+                                 effective_message=SimpleNamespace(text="/medir@PlantasBot Rosa"))
+        metricas = BotMetrics(self.archivo, flush_interval=60)
+        with mock.patch('src.utils.metrics.bot_metrics', metricas), \
+                mock.patch.object(bot, 'bot_metrics', metricas):
+            asyncio.run(regar(update, None))
+            asyncio.run(bot.registrar_error(update, SimpleNamespace(error=ValueError("roto"))))
+            asyncio.run(bot.registrar_error(None, SimpleNamespace(error=OSError("disco"))))
+        self.assertEqual(
+            [(e["user_id"], e["command"], e["error"]) for e in metricas.metrics["errors"]],
+            [(7, "regar", "sin datos"), (7, "medir", "roto"), (None, "job", "disco")]
+        )
+
+    def test_lista_de_errores_antigua(self):
+        """Prueba que una lista de errores sin límite se reparte entre el
+        búfer y los segmentos, y se calculan sus contadores"""
+        errores = [{"timestamp": f"2024-01-{1 + i % 3:02d}T10:00:00", "user_id": 1,
+                    "command": "regar", "error": str(i)} for i in range(300)]
+        with open(self.archivo, 'w') as f:
+            json.dump({"errors": errores}, f)
+        metricas = BotMetrics(self.archivo, flush_interval=60)
+        self.assertEqual(len(metricas.metrics["errors"]), Config.METRICS_ERROR_BUFFER)
+        self.assertEqual(metricas.metrics["errors_per_day"]["2024-01-01"], 100)
+        with mock.patch('src.utils.metrics.archivar_errores') as archivar:
+            metricas.flush()
+        self.assertEqual(len(archivar.call_args[0][1]), 300 - Config.METRICS_ERROR_BUFFER)
+
+    def test_retencion_de_segmentos(self):
+        """Prueba que se borran los segmentos más antiguos que la retención"""
+        directorio = os.path.join(self.tmp.name, "errores")
+        viejo = (date.today() - timedelta(days=40)).isoformat()
+        archivar_errores(directorio, [{"timestamp": viejo + "T10:00:00"}], 30)
+        self.assertEqual(os.listdir(directorio), [])
+        archivar_errores(directorio, [{"timestamp": date.today().isoformat() + "T10:00:00"}], 30)
+        self.assertEqual(len(os.listdir(directorio)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
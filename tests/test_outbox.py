@@ -0,0 +1,83 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.outbox import BandejaSalida, clave_aviso, RETENCION_ENVIADOS_S
+
+class TestBandejaSalida(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.tmp.name, 'bandeja_salida.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def bandeja(self):
+        return BandejaSalida(self.ruta, max_intentos=3, espera_base=10)
+
+    def test_idempotente(self):
+        """Prueba que un mismo aviso no se encola dos veces, ni tras enviarse"""
+        bandeja = self.bandeja()
+        self.assertTrue(bandeja.encolar(1, "Rosa", "2024-01-15", ahora=100))
+        self.assertFalse(bandeja.encolar(1, "Rosa", "2024-01-15", ahora=100))
+        self.assertTrue(bandeja.encolar(1, "Rosa", "2024-01-18", ahora=100))
+        bandeja.confirmar(clave_aviso(1, "Rosa", "2024-01-15"), ahora=100)
+        self.assertFalse(bandeja.encolar(1, "Rosa", "2024-01-15", ahora=100))
+        self.assertEqual([a['vence'] for a in bandeja.listos(ahora=100)], ["2024-01-18"])
+
+    def test_espera_exponencial_y_descartados(self):
+        """Prueba los reintentos con espera creciente hasta descartar"""
+        bandeja = self.bandeja()
+        clave = clave_aviso(1, "Rosa", "2024-01-15")
+        bandeja.encolar(*clave, ahora=0)
+        self.assertFalse(bandeja.fallar(clave, "caída", ahora=0))
+        self.assertEqual(bandeja.listos(ahora=9), [])
+        self.assertEqual(len(bandeja.listos(ahora=10)), 1)
+        self.assertFalse(bandeja.fallar(clave, "caída", ahora=10))
+        self.assertEqual(bandeja.pendientes[clave]['proximo_intento'], 30)
+        self.assertTrue(bandeja.fallar(clave, "caída", ahora=30))
+        self.assertEqual(bandeja.pendientes, {})
+        self.assertEqual(bandeja.descartados[clave]['error'], "caída")
+        # Si el riego sigue vencido, el aviso descartado vuelve a intentarse
+        self.assertTrue(bandeja.encolar(*clave, ahora=40))
+        self.assertEqual(bandeja.descartados, {})
+        self.assertEqual(bandeja.pendientes[clave]['intentos'], 0)
+
+    def test_persistencia(self):
+        """Prueba que al reabrir se conservan pendientes, enviados y descartados"""
+        bandeja = self.bandeja()
+        bandeja.encolar(1, "Rosa", "2024-01-15", ahora=0)
+        bandeja.encolar(2, "Menta", "2024-01-16", ahora=0)
+        bandeja.confirmar(clave_aviso(2, "Menta", "2024-01-16"))
+        bandeja.guardar()
+
+        reabierta = self.bandeja()
+        self.assertEqual(list(reabierta.pendientes), [clave_aviso(1, "Rosa", "2024-01-15")])
+        self.assertIn(clave_aviso(2, "Menta", "2024-01-16"), reabierta.enviados)
+
+    def test_guarda_solo_si_cambia(self):
+        """Prueba que una bandeja sin cambios no reescribe el archivo"""
+        bandeja = self.bandeja()
+        bandeja.guardar()
+        self.assertFalse(os.path.exists(self.ruta))
+        bandeja.encolar(1, "Rosa", "2024-01-15")
+        bandeja.guardar()
+        self.assertTrue(os.path.exists(self.ruta))
+
+    def test_purgar(self):
+        """Prueba que se olvidan los enviados antiguos"""
+        bandeja = self.bandeja()
+        bandeja.encolar(1, "Rosa", "2024-01-15", ahora=0)
+        bandeja.confirmar(clave_aviso(1, "Rosa", "2024-01-15"), ahora=0)
+        bandeja.purgar(ahora=RETENCION_ENVIADOS_S - 1)
+        self.assertEqual(len(bandeja.enviados), 1)
+        bandeja.purgar(ahora=RETENCION_ENVIADOS_S + 1)
+        self.assertEqual(bandeja.enviados, {})
+
+if __name__ == '__main__':
+    unittest.main()
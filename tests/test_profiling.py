@@ -0,0 +1,137 @@
+import unittest
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.handlers import admin
+from src.utils import profiling
+from src.utils.validators import CommandValidator, ValidationError
+
+def trabajo_lento():
+    return sum(i * i for i in range(20000))
+
+class TestPerfil(unittest.TestCase):
+
+    def tearDown(self):
+        profiling.terminar_perfil()
+
+    def test_validate_profile_args(self):
+        """Prueba los argumentos de /perfil"""
+        self.assertEqual(CommandValidator.validate_profile_args([]), ('actualizaciones', 100))
+        self.assertEqual(CommandValidator.validate_profile_args(["200"]), ('actualizaciones', 200))
+        self.assertEqual(CommandValidator.validate_profile_args(["30s"]), ('segundos', 30))
+        for args in (["0"], ["abc"], ["601s"], ["1", "2"]):
+            with self.subTest(args=args):
+                with self.assertRaises(ValidationError):
+                    CommandValidator.validate_profile_args(args)
+
+    def test_perfil_por_actualizaciones(self):
+        """Prueba que el perfil se cierra tras N actualizaciones (sin contar
+        la del propio /perfil) y lista las funciones ejecutadas"""
+        perfil = profiling.iniciar_perfil('actualizaciones', 2, chat_id=5, update_id=10)
+        self.assertIsNone(profiling.iniciar_perfil('actualizaciones', 2, chat_id=5))
+        trabajo_lento()
+        self.assertFalse(perfil.contar(10))
+        self.assertFalse(perfil.contar(11))
+        self.assertTrue(perfil.contar(12))
+        terminado, informe = profiling.terminar_perfil()
+        self.assertIs(terminado, perfil)
+        self.assertIn("trabajo_lento", informe)
+        self.assertIn("2 actualización(es)", informe)
+        self.assertIsNone(profiling.terminar_perfil())
+
+    def test_memoria(self):
+        """Prueba que la comparación muestra lo que creció y las estructuras"""
+        monitor = profiling.MonitorMemoria()
+        monitor.iniciar({"storage.total_plantas": 1})
+        try:
+            retenido = [bytearray(1000) for _ in range(500)]
+            informe = monitor.comparar({"storage.total_plantas": 4})
+        finally:
+            monitor.detener()
+        self.assertIn("storage.total_plantas: 4 (+3)", informe)
+        self.assertIn("test_profiling.py", informe)
+        self.assertEqual(len(retenido), 500)
+
+class TestComandosAdmin(unittest.TestCase):
+
+    def setUp(self):
+        self.respuestas = []
+        self.documentos = []
+
+        async def responder(texto):
+            self.respuestas.append(texto)
+
+        async def enviar_documento(chat_id, document, filename, caption):
+            self.documentos.append((chat_id, filename, document.getvalue().decode()))
+
+        self.bot = SimpleNamespace(send_document=enviar_documento)
+        self.responder = responder
+        patcher = mock.patch.object(Config, 'ADMIN_IDS', {1})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(profiling.terminar_perfil)
+
+    def actualizacion(self, user_id, update_id=1):
+        return SimpleNamespace(
+            update_id=update_id,
+            effective_user=SimpleNamespace(id=user_id, username="u"),
+            effective_chat=SimpleNamespace(id=user_id),
+            message=SimpleNamespace(reply_text=self.responder),
+        )
+
+    def contexto(self, args):
+        cola = mock.Mock()
+        cola.get_jobs_by_name.return_value = []
+        return SimpleNamespace(args=args, bot=self.bot, job_queue=cola)
+
+    def test_solo_administradores(self):
+        """Prueba que un usuario que no es administrador no puede perfilar"""
+        asyncio.run(admin.perfil(self.actualizacion(2), self.contexto(["5"])))
+        self.assertEqual(self.respuestas, [])
+        self.assertIsNone(profiling.perfil_actual)
+
+    def test_perfil_entrega_documento(self):
+        """Prueba el flujo completo de /perfil N hasta recibir el informe"""
+        async def probar():
+            await admin.perfil(self.actualizacion(1, update_id=1), self.contexto(["2"]))
+            for update_id in (1, 2, 3):
+                trabajo_lento()
+                await admin.contar_actualizacion(self.actualizacion(7, update_id), self.contexto([]))
+        asyncio.run(probar())
+        self.assertIn("Perfilando", self.respuestas[0])
+        self.assertEqual(len(self.documentos), 1)
+        chat_id, nombre, texto = self.documentos[0]
+        self.assertEqual((chat_id, nombre), (1, "perfil.txt"))
+        self.assertIn("trabajo_lento", texto)
+
+    def test_perfil_por_segundos(self):
+        """Prueba que /perfil Ns programa el cierre"""
+        contexto = self.contexto(["3s"])
+        asyncio.run(admin.perfil(self.actualizacion(1), contexto))
+        contexto.job_queue.run_once.assert_called_once_with(
+            admin.terminar_perfil_programado, 3, name="perfil"
+        )
+        asyncio.run(admin.terminar_perfil_programado(SimpleNamespace(bot=self.bot)))
+        self.assertEqual(len(self.documentos), 1)
+
+    def test_memoria(self):
+        """Prueba /memoria: inicia, compara con un documento y se detiene"""
+        async def probar():
+            await admin.memoria(self.actualizacion(1), self.contexto([]))
+            await admin.memoria(self.actualizacion(1), self.contexto([]))
+            await admin.memoria(self.actualizacion(1), self.contexto(["parar"]))
+        asyncio.run(probar())
+        self.assertIn("iniciado", self.respuestas[0])
+        self.assertEqual(self.documentos[0][1], "memoria.txt")
+        self.assertIn("metrics.commands_usage", self.documentos[0][2])
+        self.assertFalse(profiling.monitor_memoria.activo)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import date, timedelta
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.utils import repository, storage
+from src.utils.validators import ValidationError
+
+class TestRepository(unittest.TestCase):
+
+    def setUp(self):
+        """Usa un directorio de datos temporal y limpio para cada prueba"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir_original = Config.DATA_DIR
+        Config.DATA_DIR = self.tmp.name
+        for datos in storage.DOMINIOS.values():
+            datos.clear()
+        storage._modificados.clear()
+
+    def tearDown(self):
+        storage.cerrar_almacenamiento()
+        Config.DATA_DIR = self.data_dir_original
+        self.tmp.cleanup()
+
+    def test_plantas(self):
+        """Prueba registrar, buscar y rechazar duplicados"""
+        self.assertEqual(repository.agregar_planta(1, "Rosa"), repository.Planta(1, "Rosa"))
+        self.assertIsNone(repository.agregar_planta(1, "rosa"))
+        self.assertEqual(repository.buscar_planta(1, " ROSA "), "Rosa")
+        self.assertEqual(repository.exigir_planta(1, "rosa"), "Rosa")
+        with self.assertRaises(ValidationError):
+            repository.exigir_planta(1, "Cactus")
+        self.assertEqual(storage.plantas_por_usuario, {1: ["Rosa"]})
+
+    def test_registros_con_slots(self):
+        """Prueba que los registros no llevan __dict__ por instancia"""
+        for registro in (repository.Planta(1, "Rosa"), repository.Medida(10.0),
+                         repository.Riego("Rosa", 3, "2024-01-15"),
+                         repository.RegistroHoras("2024-01-15", 2.0)):
+            self.assertFalse(hasattr(registro, '__dict__'))
+
+    def test_medidas(self):
+        """Prueba agregar, consultar la última y eliminar medidas"""
+        repository.agregar_planta(1, "Rosa")
+        self.assertIsNone(repository.ultima_medida(1, "Rosa"))
+        repository.agregar_medida(1, "Rosa", 10.0)
+        medida = repository.agregar_medida(1, "Rosa", 12.5)
+        self.assertEqual(medida.fecha, date.today().isoformat())
+        self.assertEqual(repository.ultima_medida(1, "Rosa").altura, 12.5)
+        self.assertEqual(repository.contar_medidas(1, "Rosa"), 2)
+
+        self.assertEqual(repository.eliminar_medida(1, "Rosa", 0).altura, 10.0)
+        self.assertIsNone(repository.eliminar_medida(1, "Rosa", 5))
+        self.assertEqual([m.altura for m in repository.obtener_medidas(1, "Rosa")], [12.5])
+        self.assertEqual(storage.obtener_modificados(), {})
+
+    def test_eliminar_planta_con_datos(self):
+        """Prueba que eliminar una planta borra sus medidas y su riego"""
+        repository.agregar_planta(1, "Rosa")
+        repository.agregar_planta(1, "Cactus")
+        repository.agregar_medida(1, "Rosa", 10.0)
+        repository.configurar_riego(1, "Rosa", 3)
+        impacto = repository.impacto_eliminacion(1, "Rosa")
+        self.assertEqual(impacto['measurements_count'], 1)
+
+        self.assertEqual(repository.eliminar_planta(1, "rosa"), 1)
+        self.assertEqual(repository.nombres_plantas(1), ["Cactus"])
+        self.assertEqual(repository.obtener_medidas(1, "Rosa"), [])
+        self.assertIsNone(repository.obtener_riego(1, "Rosa"))
+
+    def test_riego(self):
+        """Prueba configurar y actualizar el riego"""
+        repository.agregar_planta(1, "Rosa")
+        riego = repository.configurar_riego(1, "Rosa", 3, ultimo_riego="2024-01-30")
+        self.assertEqual(riego.proximo_riego(), date(2024, 2, 2))
+        riego = repository.actualizar_riego(1, "Rosa", frecuencia=5)
+        self.assertEqual(repository.exigir_riego(1, "Rosa"), riego)
+        self.assertEqual(storage.riego_por_usuario[1]["Rosa"],
+                         {"frecuencia": 5, "ultimo_riego": "2024-01-30"})
+        self.assertEqual([u for u, _ in repository.recorrer_riegos()], [1])
+
+        hoy = date.today()
+        repository.actualizar_riego(1, "Rosa", ultimo_riego=(hoy - timedelta(days=5)).isoformat())
+        self.assertEqual(repository.obtener_riego(1, "Rosa").estado()['status'], 'due')
+
+    def test_cambiar_riego_guarda_avisos_olvidados(self):
+        """Prueba que al cambiar el riego el aviso olvidado no reaparece
+        tras recargar los avisos desde disco"""
+        from src.utils.scheduler import ultimos_avisos
+        repository.agregar_planta(1, "Rosa")
+        repository.agregar_planta(1, "Cactus")
+        repository.configurar_riego(1, "Rosa", 3, ultimo_riego="2024-01-30")
+        repository.configurar_riego(1, "Cactus", 3, ultimo_riego="2024-01-30")
+        repository.anotar_avisos({1: ["Rosa", "Cactus"]}, fecha="2024-02-02")
+
+        repository.configurar_riego(1, "Rosa", 4)
+        # Forzar la relectura del archivo de avisos
+        ultimos_avisos.ruta = None
+        self.assertIsNone(repository.ultimo_aviso(1, "Rosa"))
+        self.assertEqual(repository.ultimo_aviso(1, "Cactus"), "2024-02-02")
+
+        repository.actualizar_riego(1, "Cactus", frecuencia=5)
+        ultimos_avisos.ruta = None
+        self.assertIsNone(repository.ultimo_aviso(1, "Cactus"))
+
+    def test_horas(self):
+        """Prueba sumar, restar y totalizar horas"""
+        registro, anteriores = repository.sumar_horas(1, "2024-01-15", 2.0)
+        self.assertIsNone(anteriores)
+        registro, anteriores = repository.sumar_horas(1, "2024-01-15", 1.5)
+        self.assertEqual((registro.horas, anteriores), (3.5, 2.0))
+        repository.sumar_horas(1, "2024-01-16", 4.0, timestamp="2024-01-16T10:00:00")
+        self.assertEqual(repository.total_horas(1), 7.5)
+
+        self.assertTrue(repository.restar_horas(1, "2024-01-15", 5))
+        self.assertFalse(repository.restar_horas(1, "2024-01-15", 1))
+        self.assertEqual(repository.obtener_horas(1),
+                         [repository.RegistroHoras("2024-01-16", 4.0, "2024-01-16T10:00:00")])
+
+    def test_borrar_usuario(self):
+        """Prueba que se eliminan todos los datos del usuario"""
+        repository.agregar_planta(1, "Rosa")
+        repository.sumar_horas(1, "2024-01-15", 2.0)
+        repository.eliminar_usuario(1)
+        self.assertEqual(repository.nombres_plantas(1), [])
+        self.assertEqual(repository.total_horas(1), 0)
+
+if __name__ == '__main__':
+    unittest.main()
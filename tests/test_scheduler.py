@@ -0,0 +1,278 @@
+import unittest
+import asyncio
+import sys
+import os
+import json
+import tempfile
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.utils import repository, storage
+from src.utils.scheduler import (
+    AgendaRiegos, IndiceVencimientos, UltimosAvisos, agenda_riegos, indice_vencimientos,
+    fecha_vencimiento, ultimos_avisos
+)
+from src.utils.outbox import obtener_bandeja, clave_aviso
+from src.handlers.reminder import revisar_riegos
+
+def hace(dias):
+    return (date.today() - timedelta(days=dias)).isoformat()
+
+class BotFalso:
+    """Registra los mensajes enviados; puede fallar a propósito"""
+
+    def __init__(self, fallar=False):
+        self.enviados = []
+        self.fallar = fallar
+
+    async def send_message(self, chat_id, text):
+        if self.fallar:
+            raise RuntimeError("sin conexión")
+        self.enviados.append((chat_id, text))
+
+class TestAgendaRiegos(unittest.TestCase):
+
+    def setUp(self):
+        """Usa un directorio de datos temporal y una agenda limpia"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir_original = Config.DATA_DIR
+        Config.DATA_DIR = self.tmp.name
+        for datos in storage.DOMINIOS.values():
+            datos.clear()
+        storage._modificados.clear()
+        agenda_riegos.reconstruir()
+        indice_vencimientos.reconstruir()
+        # Los reintentos de la bandeja de salida no esperan en las pruebas
+        self.espera_original = Config.OUTBOX_BACKOFF_S
+        Config.OUTBOX_BACKOFF_S = 0
+
+    def tearDown(self):
+        storage.cerrar_almacenamiento()
+        Config.DATA_DIR = self.data_dir_original
+        Config.OUTBOX_BACKOFF_S = self.espera_original
+        self.tmp.cleanup()
+
+    def test_fecha_vencimiento(self):
+        """Prueba el cálculo de la fecha y los riegos inválidos"""
+        self.assertEqual(fecha_vencimiento({'frecuencia': 3, 'ultimo_riego': '2024-01-30'}),
+                         date(2024, 2, 2))
+        self.assertIsNone(fecha_vencimiento({'frecuencia': 0, 'ultimo_riego': '2024-01-30'}))
+        self.assertIsNone(fecha_vencimiento({'frecuencia': 3, 'ultimo_riego': 'ayer'}))
+        self.assertIsNone(fecha_vencimiento({}))
+
+    def test_construir_y_vencidos(self):
+        """Prueba que solo salen los riegos vencidos, en orden de fecha"""
+        storage.riego_por_usuario[1] = {
+            "Rosa": {"frecuencia": 2, "ultimo_riego": hace(5)},
+            "Cactus": {"frecuencia": 30, "ultimo_riego": hace(1)},
+        }
+        storage.riego_por_usuario[2] = {"Menta": {"frecuencia": 1, "ultimo_riego": hace(10)}}
+        agenda = AgendaRiegos()
+        self.assertEqual(len(agenda), 3)
+        self.assertEqual(agenda.vencidos(), [(2, "Menta"), (1, "Rosa")])
+        self.assertEqual(agenda.vencidos(), [])
+        self.assertEqual(agenda.proximo(), date.today() + timedelta(days=29))
+
+    def test_cambios_desde_el_repositorio(self):
+        """Prueba que regar, cambiar y eliminar actualizan la agenda"""
+        repository.agregar_planta(1, "Rosa")
+        repository.agregar_planta(1, "Cactus")
+        repository.configurar_riego(1, "Rosa", 2, ultimo_riego=hace(5))
+        repository.configurar_riego(1, "Cactus", 1, ultimo_riego=hace(3))
+
+        # Regar hoy aplaza la Rosa; cambiar la frecuencia no la vuelve a vencer
+        repository.actualizar_riego(1, "Rosa", ultimo_riego=date.today().isoformat())
+        repository.actualizar_riego(1, "Rosa", frecuencia=4)
+        repository.eliminar_planta(1, "Cactus")
+        self.assertEqual(repository.riegos_vencidos(), [])
+        self.assertEqual(agenda_riegos.proximo(), date.today() + timedelta(days=4))
+
+        repository.actualizar_riego(1, "Rosa", ultimo_riego=hace(4))
+        self.assertEqual([(u, r.planta) for u, r in repository.riegos_vencidos()], [(1, "Rosa")])
+
+        repository.configurar_riego(2, "Menta", 1, ultimo_riego=hace(2))
+        repository.eliminar_usuario(2)
+        self.assertEqual(repository.riegos_vencidos(), [])
+
+    def test_compacta_entradas_obsoletas(self):
+        """Prueba que muchas reprogramaciones no hacen crecer el montículo"""
+        repository.configurar_riego(1, "Rosa", 2)
+        for frecuencia in range(3, 500):
+            repository.actualizar_riego(1, "Rosa", frecuencia=frecuencia)
+        self.assertLess(len(agenda_riegos._monticulo), 100)
+        self.assertEqual(len(agenda_riegos), 1)
+
+    def test_revisar_riegos(self):
+        """Prueba que el job avisa una vez y reintenta si el envío falla"""
+        repository.configurar_riego(1, "Rosa", 2, ultimo_riego=hace(3))
+        repository.configurar_riego(1, "Cactus", 9, ultimo_riego=hace(1))
+
+        bot = BotFalso(fallar=True)
+        asyncio.run(revisar_riegos(SimpleNamespace(bot=bot)))
+        self.assertEqual(repository.obtener_riego(1, "Rosa").ultimo_riego, hace(3))
+
+        bot = BotFalso()
+        asyncio.run(revisar_riegos(SimpleNamespace(bot=bot)))
+        asyncio.run(revisar_riegos(SimpleNamespace(bot=bot)))
+        self.assertEqual(bot.enviados, [(1, "🌱 Hoy toca regar 'Rosa'! (atrasado 1 día(s))")])
+        self.assertEqual(repository.ultimo_aviso(1, "Rosa"), date.today().isoformat())
+        # El aviso no cambia el riego real
+        self.assertEqual(repository.obtener_riego(1, "Rosa").ultimo_riego, hace(3))
+
+    def test_resumen_por_usuario(self):
+        """Prueba que cada usuario recibe un solo mensaje con todas sus
+        plantas y que la revisión guarda una sola vez"""
+        repository.configurar_riego(1, "Rosa", 2, ultimo_riego=hace(2))
+        repository.configurar_riego(1, "Cactus", 1, ultimo_riego=hace(4))
+        repository.configurar_riego(2, "Menta", 3, ultimo_riego=hace(3))
+
+        bot = BotFalso()
+        with mock.patch.object(repository, 'guardar_datos') as guardar:
+            asyncio.run(revisar_riegos(SimpleNamespace(bot=bot)))
+        # Los avisos no reescriben los archivos de datos
+        self.assertEqual(guardar.call_count, 0)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'avisos_riego.json')))
+        self.assertEqual(sorted(bot.enviados), [
+            (1, "🌱 Hoy toca regar 2 plantas:\n• Cactus (atrasado 3 día(s))\n• Rosa"),
+            (2, "🌱 Hoy toca regar 'Menta'!"),
+        ])
+        self.assertEqual(repository.riegos_vencidos(), [])
+        self.assertEqual(repository.obtener_riego(2, "Menta").ultimo_riego, hace(3))
+        self.assertEqual(repository.fecha_recordatorio(2, "Menta"), date.today() + timedelta(days=3))
+
+    def test_reinicio_no_repite_avisos(self):
+        """Prueba que si el proceso muere tras enviar pero antes de anotar el
+        aviso, al reiniciar no se vuelve a avisar"""
+        repository.configurar_riego(1, "Rosa", 2, ultimo_riego=hace(2))
+        bot = BotFalso()
+        with mock.patch.object(repository, 'anotar_avisos'):
+            asyncio.run(revisar_riegos(SimpleNamespace(bot=bot)))
+        self.assertEqual(len(bot.enviados), 1)
+
+        # Reinicio: la agenda se reconstruye con el riego sin actualizar
+        agenda_riegos.reconstruir()
+        asyncio.run(revisar_riegos(SimpleNamespace(bot=bot)))
+        self.assertEqual(len(bot.enviados), 1)
+        self.assertEqual(repository.ultimo_aviso(1, "Rosa"), date.today().isoformat())
+
+    def test_pendiente_cancelado_al_regar(self):
+        """Prueba que un aviso fallido no se reenvía si la planta se riega"""
+        repository.configurar_riego(1, "Rosa", 2, ultimo_riego=hace(2))
+        asyncio.run(revisar_riegos(SimpleNamespace(bot=BotFalso(fallar=True))))
+        clave = clave_aviso(1, "Rosa", date.today().isoformat())
+        self.assertEqual(obtener_bandeja().pendientes[clave]['intentos'], 1)
+
+        repository.actualizar_riego(1, "Rosa", ultimo_riego=date.today().isoformat())
+        bot = BotFalso()
+        asyncio.run(revisar_riegos(SimpleNamespace(bot=bot)))
+        self.assertEqual(bot.enviados, [])
+        self.assertEqual(obtener_bandeja().pendientes, {})
+
+    def test_aviso_descartado_vuelve_a_la_agenda(self):
+        """Prueba que un aviso descartado tras agotar los reintentos se vuelve
+        a enviar cuando el envío se recupera"""
+        repository.configurar_riego(1, "Rosa", 2, ultimo_riego=hace(2))
+        with mock.patch.object(Config, 'OUTBOX_MAX_ATTEMPTS', 2), \
+                mock.patch('src.handlers.reminder.bot_metrics.record_error') as registro:
+            for _ in range(2):
+                asyncio.run(revisar_riegos(SimpleNamespace(bot=BotFalso(fallar=True))))
+            clave = clave_aviso(1, "Rosa", date.today().isoformat())
+            self.assertIn(clave, obtener_bandeja().descartados)
+            self.assertEqual(len(agenda_riegos), 1)
+            registro.assert_called_once_with(
+                1, "recordatorio", "Recordatorio de 'Rosa' descartado: sin conexión")
+
+            bot = BotFalso()
+            asyncio.run(revisar_riegos(SimpleNamespace(bot=bot)))
+        self.assertEqual(bot.enviados, [(1, "🌱 Hoy toca regar 'Rosa'!")])
+        self.assertEqual(repository.fecha_recordatorio(1, "Rosa"), date.today() + timedelta(days=2))
+
+    def test_aviso_repetido_tras_una_frecuencia(self):
+        """Prueba que sin regar se vuelve a avisar una frecuencia después del
+        último aviso y que regar borra el aviso anotado"""
+        repository.configurar_riego(1, "Rosa", 3, ultimo_riego=hace(5))
+        repository.anotar_avisos({1: ["Rosa"]}, fecha=hace(1))
+        self.assertEqual(repository.fecha_recordatorio(1, "Rosa"), date.today() + timedelta(days=2))
+        self.assertEqual(repository.riegos_vencidos(), [])
+        self.assertEqual(repository.riegos_vencidos(date.today() + timedelta(days=2))[0][1].planta, "Rosa")
+
+        repository.actualizar_riego(1, "Rosa", ultimo_riego=hace(4))
+        self.assertIsNone(repository.ultimo_aviso(1, "Rosa"))
+        self.assertEqual([r.planta for _, r in repository.riegos_vencidos()], ["Rosa"])
+
+    def test_avisos_persistentes(self):
+        """Prueba que los avisos anotados se leen al reconstruir la agenda y
+        se borran con los datos del usuario"""
+        repository.configurar_riego(1, "Rosa", 3, ultimo_riego=hace(5))
+        repository.anotar_avisos({1: ["Rosa"]})
+        ultimos_avisos.ruta = None
+        agenda_riegos.reconstruir()
+        self.assertEqual(repository.riegos_vencidos(), [])
+        self.assertEqual(repository.ultimo_aviso(1, "Rosa"), date.today().isoformat())
+
+        repository.eliminar_usuario(1)
+        ultimos_avisos.ruta = None
+        self.assertIsNone(repository.ultimo_aviso(1, "Rosa"))
+
+    def test_olvidar_avisos_por_usuario(self):
+        """Prueba que olvidar una planta o un usuario no afecta a los demás
+        y que el archivo conserva su formato de filas"""
+        avisos = UltimosAvisos()
+        avisos.anotar(1, "Rosa", "2024-01-10")
+        avisos.anotar(1, "Cactus", "2024-01-11")
+        avisos.anotar(2, "Rosa", "2024-01-12")
+        avisos.olvidar(1, "Rosa")
+        avisos.olvidar(3)
+        avisos.guardar()
+
+        with open(os.path.join(self.tmp.name, 'avisos_riego.json'), encoding='utf-8') as f:
+            self.assertEqual(sorted(json.load(f)), [[1, "Cactus", "2024-01-11"], [2, "Rosa", "2024-01-12"]])
+        avisos.olvidar(1)
+        self.assertIsNone(avisos.obtener(1, "Cactus"))
+        self.assertEqual(avisos.obtener(2, "Rosa"), "2024-01-12")
+
+    def test_indice_de_calendario(self):
+        """Prueba las consultas por fecha del índice de vencimientos"""
+        hoy = date.today()
+        storage.riego_por_usuario[1] = {
+            "Rosa": {"frecuencia": 2, "ultimo_riego": hace(5)},
+            "Cactus": {"frecuencia": 10, "ultimo_riego": hace(5)},
+        }
+        storage.riego_por_usuario[2] = {"Menta": {"frecuencia": 2, "ultimo_riego": hace(2)}}
+        indice = IndiceVencimientos()
+        self.assertEqual(indice.vencidos(), [
+            (hoy - timedelta(days=3), 1, "Rosa"), (hoy, 2, "Menta"),
+        ])
+        self.assertEqual([p for _, _, p in indice.proximos(5)], ["Rosa", "Menta", "Cactus"])
+        self.assertEqual(indice.entre(hoy + timedelta(days=1), hoy + timedelta(days=4)), [])
+        self.assertEqual(indice.de_usuario(1, hasta=hoy), [(hoy - timedelta(days=3), "Rosa")])
+
+    def test_indice_actualizado_por_el_repositorio(self):
+        """Prueba que regar, cambiar la frecuencia y eliminar mueven las
+        plantas de cubeta"""
+        hoy = date.today()
+        repository.agregar_planta(1, "Rosa")
+        repository.configurar_riego(1, "Rosa", 2, ultimo_riego=hace(3))
+        repository.configurar_riego(1, "Cactus", 7)
+        self.assertEqual(repository.vencimientos_entre(hasta=hoy), [(hoy - timedelta(days=1), 1, "Rosa")])
+
+        repository.actualizar_riego(1, "Rosa", ultimo_riego=hoy.isoformat())
+        repository.actualizar_riego(1, "Cactus", frecuencia=1)
+        proximos = repository.proximos_riegos(1, 2)
+        self.assertEqual([(r.planta, v) for r, v in proximos],
+                         [("Cactus", hoy + timedelta(days=1)), ("Rosa", hoy + timedelta(days=2))])
+
+        repository.eliminar_planta(1, "Rosa")
+        repository.eliminar_usuario(2)
+        self.assertEqual([p for _, _, p in repository.vencimientos_entre()], ["Cactus"])
+        repository.eliminar_usuario(1)
+        self.assertEqual(repository.vencimientos_entre(), [])
+        self.assertEqual(indice_vencimientos._fechas, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.utils import serializer
+
+class TestSerializer(unittest.TestCase):
+
+    DATOS = {1: ["Rosa", "Árbol de mango"], 2: {"Rosa": [10.5, {"altura": 12.0}]}}
+
+    def setUp(self):
+        self.serializador_original = Config.STORAGE_SERIALIZER
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        Config.STORAGE_SERIALIZER = self.serializador_original
+        self.tmp.cleanup()
+
+    def serializadores(self):
+        nombres = ['json'] + (['orjson'] if serializer.orjson is not None else [])
+        for nombre in nombres:
+            Config.STORAGE_SERIALIZER = nombre
+            with self.subTest(serializador=nombre):
+                yield nombre
+
+    def test_salida_compacta(self):
+        """Prueba que la salida no lleva espacios y se lee igual que con json"""
+        for _ in self.serializadores():
+            contenido = serializer.serializar(self.DATOS)
+            self.assertNotIn(b'\n', contenido)
+            self.assertNotIn(b', ', contenido)
+            self.assertIn('Árbol'.encode('utf-8'), contenido)
+            self.assertEqual(json.loads(contenido), json.loads(json.dumps(self.DATOS)))
+            self.assertEqual(serializer.deserializar(contenido), json.loads(contenido))
+
+    def test_salida_legible(self):
+        """Prueba el modo indentado para exportar"""
+        for _ in self.serializadores():
+            contenido = serializer.serializar(self.DATOS, legible=True)
+            self.assertIn(b'\n  "1": [', contenido)
+
+    def test_error_de_lectura(self):
+        """Prueba que JSON inválido produce json.JSONDecodeError"""
+        for _ in self.serializadores():
+            with self.assertRaises(json.JSONDecodeError):
+                serializer.deserializar(b'{"1": [')
+
+    def test_serializador_desconocido(self):
+        """Prueba que un valor de configuración inválido se rechaza"""
+        Config.STORAGE_SERIALIZER = 'xml'
+        with self.assertRaises(ValueError):
+            serializer.serializar(self.DATOS)
+
+    def test_convertir_y_exportar(self):
+        """Prueba la conversión en sitio y la exportación legible"""
+        ruta = os.path.join(self.tmp.name, 'plantas.json')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({"1": ["Rosa"]}, f, indent=2)
+
+        serializer.convertir_directorio(self.tmp.name)
+        with open(ruta, 'rb') as f:
+            self.assertEqual(f.read(), b'{"1":["Rosa"]}')
+        # Se conserva la versión indentada como respaldo
+        self.assertTrue(os.path.exists(ruta + '.bak'))
+
+        destino = os.path.join(self.tmp.name, 'export')
+        serializer.convertir_directorio(self.tmp.name, destino=destino, legible=True)
+        with open(os.path.join(destino, 'plantas.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"1": ["Rosa"]})
+            f.seek(0)
+            self.assertIn('\n', f.read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import sys
+import os
+import copy
+import json
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.series import SerieMedidas, serializar_json
+
+class TestSerieMedidas(unittest.TestCase):
+
+    def setUp(self):
+        self.serie = SerieMedidas([
+            {"altura": 10.0, "fecha": "2024-01-15", "timestamp": "2024-01-15T10:00:00"},
+            {"altura": 12.3, "fecha": "2024-01-20", "timestamp": "2024-01-20T18:30:00"},
+        ])
+
+    def test_indexar_devuelve_diccionarios(self):
+        """Prueba que cada medida se lee con el formato de siempre"""
+        self.assertEqual(len(self.serie), 2)
+        self.assertEqual(self.serie[0], {
+            "altura": 10.0, "fecha": "2024-01-15", "timestamp": "2024-01-15T10:00:00"
+        })
+        # float32 no debe verse en las alturas mostradas
+        self.assertEqual(self.serie[-1]["altura"], 12.3)
+        self.assertEqual(self.serie.ultima()["fecha"], "2024-01-20")
+        with self.assertRaises(IndexError):
+            self.serie[2]
+
+    def test_agregar_y_eliminar(self):
+        """Prueba append y pop por índice"""
+        self.serie.append({"altura": 15.5, "fecha": "2024-02-01", "timestamp": "2024-02-01T09:00:00"})
+        eliminada = self.serie.pop(1)
+        self.assertEqual(eliminada["altura"], 12.3)
+        self.assertEqual([m["altura"] for m in self.serie], [10.0, 15.5])
+        self.assertIsNone(SerieMedidas().ultima())
+
+    def test_formato_antiguo(self):
+        """Prueba que las alturas sueltas se convierten y se conservan así"""
+        serie = SerieMedidas.desde_json([4.5, {"altura": 5.0, "fecha": "2024-01-15",
+                                               "timestamp": "2024-01-15T10:00:00"}])
+        self.assertEqual(serie[0], {"altura": 4.5})
+        self.assertEqual(serie.a_json()[0], 4.5)
+        self.assertEqual(serie[1]["fecha"], "2024-01-15")
+
+    def test_ida_y_vuelta_json(self):
+        """Prueba que la serie se serializa y se recupera igual"""
+        texto = json.dumps({"Rosa": self.serie}, default=serializar_json)
+        recuperada = SerieMedidas.desde_json(json.loads(texto)["Rosa"])
+        self.assertEqual(recuperada, self.serie)
+        self.assertEqual(copy.deepcopy(self.serie), self.serie)
+
+    def test_medidas_antiguas_se_conservan(self):
+        """Prueba que las medidas se leen tal como se registraron: fecha
+        distinta del día del timestamp, microsegundos y formas irregulares"""
+        medidas = [
+            {"altura": 10.0, "fecha": "2024-01-15", "timestamp": "2024-01-16T00:30:00.123456"},
+            {"altura": 12, "fecha": "2024-01-20"},
+            7,
+            {"altura": 12.3, "fecha": "2024-01-21", "timestamp": "2024-01-21T08:00:00"},
+        ]
+        serie = SerieMedidas.desde_json(copy.deepcopy(medidas))
+        self.assertEqual(json.dumps(serie.a_json()), json.dumps(medidas))
+        self.assertEqual(serie[2], {"altura": 7})
+        self.assertEqual(serie.altura(1), 12.0)
+
+        # Al borrar, las medidas irregulares siguientes conservan su forma
+        del serie[0]
+        self.assertEqual(json.dumps(serie.a_json()), json.dumps(medidas[1:]))
+        self.assertEqual(serie.pop(-2), {"altura": 7})
+        self.assertEqual(serie.a_json(), [medidas[1], medidas[3]])
+
+if __name__ == '__main__':
+    unittest.main()
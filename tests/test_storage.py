@@ -0,0 +1,652 @@
+import unittest
+import asyncio
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import logging
+from datetime import date
+from unittest.mock import patch
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.utils import storage
+from src.utils import shards
+from src.utils.scheduler import AgendaRiegos, IndiceVencimientos
+from src.utils.backends import SQLiteBackend
+from src.utils.shards import ShardedBackend, VistaDominio
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        """Usa un directorio de datos temporal y limpio para cada prueba"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir_original = Config.DATA_DIR
+        Config.DATA_DIR = self.tmp.name
+        for datos in storage.DOMINIOS.values():
+            datos.clear()
+        storage._modificados.clear()
+        self.journal_original = Config.STORAGE_JOURNAL
+        self.backend_original = Config.STORAGE_BACKEND
+        self.retardo_original = Config.SAVE_DELAY_MS
+        self.cache_original = Config.STARTUP_CACHE
+        Config.STARTUP_CACHE = True
+
+    def tearDown(self):
+        storage.cerrar_almacenamiento()
+        Config.DATA_DIR = self.data_dir_original
+        Config.STORAGE_JOURNAL = self.journal_original
+        Config.STORAGE_BACKEND = self.backend_original
+        Config.SAVE_DELAY_MS = self.retardo_original
+        Config.STARTUP_CACHE = self.cache_original
+        self.tmp.cleanup()
+
+    def leer(self, nombre_archivo):
+        with open(os.path.join(self.tmp.name, nombre_archivo), encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_guardar_solo_dominios_modificados(self):
+        """Prueba que solo se reescriben los dominios marcados"""
+        storage.horas_por_usuario[1] = [{"fecha": "2024-01-15", "horas": 2.0}]
+        storage.marcar_modificado('horas', 1)
+        storage.guardar_datos()
+
+        self.assertEqual(self.leer('horas.json'), {"1": [{"fecha": "2024-01-15", "horas": 2.0}]})
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'medidas.json')))
+        self.assertEqual(storage.obtener_modificados(), {})
+
+    def test_marcar_registra_usuarios(self):
+        """Prueba que se registran los usuarios afectados por dominio"""
+        storage.marcar_modificado('plantas', 1)
+        storage.marcar_modificado('plantas', 2)
+        storage.marcar_modificado('riego')
+        self.assertEqual(storage.obtener_modificados(), {'plantas': {1, 2}, 'riego': set()})
+
+    def test_marcar_planta_cubierta_por_usuario(self):
+        """Prueba que un cambio de usuario completo absorbe los de sus plantas"""
+        storage.marcar_modificado('medidas', 1, 'Rosa')
+        storage.marcar_modificado('medidas', 1)
+        storage.marcar_modificado('medidas', 1, 'Cactus')
+        self.assertEqual(storage.obtener_modificados(), {'medidas': {(1, 'Rosa'), 1}})
+
+    def test_marcar_dominio_desconocido(self):
+        """Prueba que un dominio inexistente es rechazado"""
+        with self.assertRaises(ValueError):
+            storage.marcar_modificado('desconocido', 1)
+
+    def test_guardar_y_cargar(self):
+        """Prueba el ciclo completo de guardado y carga"""
+        storage.plantas_por_usuario[7] = ["Rosa"]
+        storage.guardar_datos('plantas')
+        storage.plantas_por_usuario.clear()
+
+        storage.cargar_datos()
+        self.assertEqual(storage.plantas_por_usuario, {7: ["Rosa"]})
+        self.assertEqual(storage.obtener_modificados(), {})
+
+    def test_diario_anexa_y_se_reproduce(self):
+        """Prueba que con el diario activo se anexa en lugar de reescribir"""
+        Config.STORAGE_JOURNAL = True
+        storage.plantas_por_usuario[1] = ["Rosa"]
+        storage.marcar_modificado('plantas', 1)
+        storage.guardar_datos()
+        storage.plantas_por_usuario[2] = ["Cactus"]
+        storage.marcar_modificado('plantas', 2)
+        storage.guardar_datos()
+        del storage.plantas_por_usuario[1]
+        storage.marcar_modificado('plantas', 1)
+        storage.guardar_datos()
+
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'plantas.json')))
+        self.assertGreater(storage.obtener_backend().diario().tamano(), 0)
+
+        storage.plantas_por_usuario.clear()
+        storage.cargar_datos()
+        self.assertEqual(storage.plantas_por_usuario, {2: ["Cactus"]})
+        # La carga vuelca el diario en las instantáneas
+        self.assertEqual(self.leer('plantas.json'), {"2": ["Cactus"]})
+        self.assertEqual(storage.obtener_backend().diario().tamano(), 0)
+
+    def test_diario_sincroniza(self):
+        """Prueba que cada anexado al diario se sincroniza con fsync salvo
+        que JOURNAL_FSYNC lo desactive"""
+        Config.STORAGE_JOURNAL = True
+        storage.plantas_por_usuario[1] = ["Rosa"]
+        for activo, llamadas in ((True, 1), (False, 0)):
+            with self.subTest(activo=activo), patch.object(Config, 'JOURNAL_FSYNC', activo), \
+                    patch('src.utils.journal.os.fsync') as fsync:
+                storage.marcar_modificado('plantas', 1)
+                storage.guardar_datos()
+                self.assertEqual(fsync.call_count, llamadas)
+
+    def test_diario_descarta_linea_incompleta(self):
+        """Prueba que una línea a medio escribir no impide la recuperación"""
+        Config.STORAGE_JOURNAL = True
+        storage.horas_por_usuario[1] = [{"fecha": "2024-01-15", "horas": 2.0}]
+        storage.marcar_modificado('horas', 1)
+        storage.guardar_datos()
+        with open(storage.obtener_backend().diario().ruta, 'a', encoding='utf-8') as f:
+            f.write('{"d": "horas", "u": 1, "v": [')
+
+        storage.horas_por_usuario.clear()
+        storage.cargar_datos()
+        self.assertEqual(storage.horas_por_usuario, {1: [{"fecha": "2024-01-15", "horas": 2.0}]})
+
+    def test_compactacion_al_superar_limite(self):
+        """Prueba que el diario se compacta al alcanzar el tamaño máximo"""
+        Config.STORAGE_JOURNAL = True
+        limite_original = Config.JOURNAL_MAX_BYTES
+        Config.JOURNAL_MAX_BYTES = 1
+        try:
+            storage.plantas_por_usuario[1] = ["Rosa"]
+            storage.marcar_modificado('plantas', 1)
+            storage.guardar_datos()
+            storage.obtener_backend().cerrar()
+        finally:
+            Config.JOURNAL_MAX_BYTES = limite_original
+
+        self.assertEqual(self.leer('plantas.json'), {"1": ["Rosa"]})
+        diario = storage.obtener_backend().diario()
+        self.assertEqual(diario.tamano(), 0)
+        self.assertFalse(os.path.exists(diario.ruta_rotada))
+
+    def test_diario_por_planta(self):
+        """Prueba que los cambios de una planta se anexan y reproducen solos"""
+        Config.STORAGE_JOURNAL = True
+        storage.riego_por_usuario[1] = {"Rosa": {"frecuencia": 3, "ultimo_riego": "2024-01-15"}}
+        storage.guardar_datos('riego')
+        storage.riego_por_usuario[1]["Cactus"] = {"frecuencia": 7, "ultimo_riego": "2024-01-16"}
+        storage.marcar_modificado('riego', 1, 'Cactus')
+        storage.guardar_datos()
+
+        storage.riego_por_usuario.clear()
+        storage.cargar_datos()
+        self.assertEqual(storage.riego_por_usuario[1]["Cactus"]["frecuencia"], 7)
+        self.assertEqual(storage.riego_por_usuario[1]["Rosa"]["frecuencia"], 3)
+
+    def test_guardado_diferido_agrupa_escrituras(self):
+        """Prueba que varios guardados en la misma ventana se escriben una vez"""
+        Config.SAVE_DELAY_MS = 20
+        backend = storage.obtener_backend()
+
+        async def escenario():
+            with patch.object(backend, 'guardar', wraps=backend.guardar) as guardar:
+                for user_id in range(1, 51):
+                    storage.horas_por_usuario[user_id] = [{"fecha": "2024-01-15", "horas": 1.0}]
+                    storage.marcar_modificado('horas', user_id)
+                    storage.guardar_datos()
+                # Nada se escribe todavía dentro de la ventana
+                self.assertEqual(guardar.call_count, 0)
+                await storage.vaciar_guardados()
+                return guardar.call_count
+
+        self.assertEqual(asyncio.run(escenario()), 1)
+        self.assertEqual(len(self.leer('horas.json')), 50)
+        self.assertEqual(storage.obtener_modificados(), {})
+
+    def test_guardado_diferido_reintenta_si_falla(self):
+        """Prueba que un guardado diferido fallido conserva las marcas"""
+        Config.SAVE_DELAY_MS = 5
+        backend = storage.obtener_backend()
+
+        async def escenario():
+            storage.plantas_por_usuario[1] = ["Rosa"]
+            storage.marcar_modificado('plantas', 1)
+            with patch.object(backend, 'guardar', return_value=[]):
+                await storage._volcar_pendientes()
+            self.assertEqual(storage.obtener_modificados(), {'plantas': {1}})
+            await storage._volcar_pendientes()
+
+        asyncio.run(escenario())
+        self.assertEqual(self.leer('plantas.json'), {"1": ["Rosa"]})
+
+    def test_guardado_diferido_solo_serializa_modificados(self):
+        """Prueba que el guardado diferido no copia dominios enteros en el
+        bucle y que el archivo sigue incluyendo a todos los usuarios"""
+        Config.SAVE_DELAY_MS = 5
+        for user_id in range(1, 4):
+            storage.plantas_por_usuario[user_id] = [f"Planta {user_id}"]
+        storage.guardar_datos('plantas')
+
+        async def escenario():
+            for user_id in (1, 2, 3):
+                storage.marcar_modificado('plantas', user_id)
+            await storage._volcar_pendientes()
+            storage.plantas_por_usuario[2].append("Cactus")
+            del storage.plantas_por_usuario[3]
+            storage.marcar_modificado('plantas', 2)
+            storage.marcar_modificado('plantas', 3)
+            with patch('src.utils.backends.copy.deepcopy', side_effect=AssertionError):
+                await storage._volcar_pendientes()
+
+        asyncio.run(escenario())
+        self.assertEqual(self.leer('plantas.json'), {"1": ["Planta 1"], "2": ["Planta 2", "Cactus"]})
+        self.assertEqual(storage.obtener_modificados(), {})
+
+    def test_compactacion_sin_copiar_en_memoria(self):
+        """Prueba que la compactación reconstruye el estado desde los
+        archivos sin copiar los datos en memoria"""
+        Config.STORAGE_JOURNAL = True
+        storage.plantas_por_usuario[1] = ["Rosa"]
+        storage.guardar_datos('plantas')
+        storage.plantas_por_usuario[2] = ["Cactus"]
+        storage.marcar_modificado('plantas', 2)
+        storage.guardar_datos()
+        backend = storage.obtener_backend()
+        with patch('src.utils.backends.copy.deepcopy', side_effect=AssertionError):
+            backend.compactar(storage.DOMINIOS)
+            # Un cambio posterior va al diario nuevo y no a la compactación
+            storage.plantas_por_usuario[3] = ["Lila"]
+            storage.marcar_modificado('plantas', 3)
+            storage.guardar_datos()
+            backend.cerrar()
+
+        self.assertEqual(self.leer('plantas.json'), {"1": ["Rosa"], "2": ["Cactus"]})
+        self.assertFalse(os.path.exists(backend.diario().ruta_rotada))
+        storage.plantas_por_usuario.clear()
+        storage.cargar_datos()
+        self.assertEqual(set(storage.plantas_por_usuario), {1, 2, 3})
+
+    def test_archivo_corrupto_usa_generacion_anterior(self):
+        """Prueba que un archivo dañado no borra los datos de todos"""
+        storage.plantas_por_usuario[1] = ["Rosa"]
+        storage.guardar_datos('plantas')
+        storage.plantas_por_usuario[1].append("Cactus")
+        storage.guardar_datos('plantas')
+        # Simular un cierre abrupto a mitad de escritura
+        with open(os.path.join(self.tmp.name, 'plantas.json'), 'w', encoding='utf-8') as f:
+            f.write('{"1": ["Ro')
+
+        storage.plantas_por_usuario.clear()
+        storage.cargar_datos()
+        self.assertEqual(storage.plantas_por_usuario, {1: ["Rosa"]})
+        corruptos = [n for n in os.listdir(self.tmp.name) if n.startswith('plantas.json.corrupto-')]
+        self.assertEqual(len(corruptos), 1)
+
+    def test_escritura_fallida_conserva_archivo(self):
+        """Prueba que un fallo antes de renombrar deja el archivo anterior intacto"""
+        storage.horas_por_usuario[1] = [{"fecha": "2024-01-15", "horas": 2.0}]
+        storage.guardar_datos('horas')
+        storage.horas_por_usuario[1][0]["horas"] = 5.0
+        with patch('src.utils.atomic.os.fsync', side_effect=OSError("disco lleno")):
+            storage.guardar_datos('horas')
+
+        self.assertEqual(self.leer('horas.json'), {"1": [{"fecha": "2024-01-15", "horas": 2.0}]})
+        self.assertEqual(storage.obtener_modificados(), {'horas': set()})
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'horas.json.tmp')))
+
+    def test_cache_de_inicio(self):
+        """Prueba que un arranque sin cambios no vuelve a leer los JSON"""
+        storage.plantas_por_usuario[1] = ["Rosa"]
+        storage.medidas_por_usuario[1] = {"Rosa": [4.5]}
+        storage.guardar_datos('plantas', 'medidas')
+        storage.cerrar_almacenamiento()
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'cache_inicio.pickle')))
+
+        for datos in storage.DOMINIOS.values():
+            datos.clear()
+        with patch('src.utils.backends.leer_json_con_respaldo') as leer:
+            storage.cargar_datos()
+        # Solo se leen los dominios sin archivo (riego y horas)
+        self.assertEqual(leer.call_count, 2)
+        self.assertEqual(storage.plantas_por_usuario, {1: ["Rosa"]})
+        self.assertEqual(storage.medidas_por_usuario[1]["Rosa"], [4.5])
+
+    def test_cache_de_inicio_desactualizada(self):
+        """Prueba que un archivo modificado tras la caché se vuelve a leer"""
+        storage.plantas_por_usuario[1] = ["Rosa"]
+        storage.guardar_datos('plantas')
+        storage.cerrar_almacenamiento()
+        with open(os.path.join(self.tmp.name, 'plantas.json'), 'w', encoding='utf-8') as f:
+            json.dump({"1": ["Lila"]}, f)
+
+        storage.plantas_por_usuario.clear()
+        storage.cargar_datos()
+        self.assertEqual(storage.plantas_por_usuario, {1: ["Lila"]})
+
+    def test_cache_de_inicio_con_permisos_inseguros(self):
+        """Prueba que una caché en la que otros pueden escribir no se
+        deserializa"""
+        storage.plantas_por_usuario[1] = ["Rosa"]
+        storage.guardar_datos('plantas')
+        storage.cerrar_almacenamiento()
+        ruta = os.path.join(self.tmp.name, 'cache_inicio.pickle')
+        self.assertEqual(os.stat(ruta).st_mode & 0o777, 0o600)
+        os.chmod(ruta, 0o666)
+
+        storage.plantas_por_usuario.clear()
+        with patch('src.utils.startup_cache.pickle.load') as cargar:
+            storage.cargar_datos()
+        cargar.assert_not_called()
+        self.assertEqual(storage.plantas_por_usuario, {1: ["Rosa"]})
+
+    def test_ida_y_vuelta_de_datos_antiguos(self):
+        """Prueba que medidas y horas con formas antiguas se guardan y se
+        vuelven a leer idénticas, tipos numéricos incluidos"""
+        medidas = {"1": {"Rosa": [
+            5, 4.5,
+            # La fecha no coincide con el día del timestamp, que lleva microsegundos
+            {"altura": 10.0, "fecha": "2024-01-15", "timestamp": "2024-01-16T00:30:00.123456"},
+            {"altura": 12, "fecha": "2024-01-20"},
+            {"altura": 12.3, "fecha": "2024-01-21", "timestamp": "2024-01-21T08:00:00"},
+        ]}}
+        horas = {"1": [{"fecha": "2024-01-15", "horas": 2},
+                       {"fecha": "2024-01-16", "horas": 1.5, "timestamp": "2024-01-16T10:00:00"}]}
+        for nombre, contenido in (('medidas.json', medidas), ('horas.json', horas)):
+            with open(os.path.join(self.tmp.name, nombre), 'w', encoding='utf-8') as f:
+                json.dump(contenido, f)
+
+        storage.cargar_datos()
+        storage.guardar_datos('medidas', 'horas')
+        storage.cerrar_almacenamiento()
+        for datos in storage.DOMINIOS.values():
+            datos.clear()
+        storage.cargar_datos()
+
+        recuperadas = {str(u): {p: serie.a_json() for p, serie in plantas.items()}
+                       for u, plantas in storage.medidas_por_usuario.items()}
+        # json.dumps distingue 2 de 2.0
+        self.assertEqual(json.dumps(recuperadas), json.dumps(medidas))
+        self.assertEqual(json.dumps({str(u): r for u, r in storage.horas_por_usuario.items()}),
+                         json.dumps(horas))
+
+class TestSQLiteBackend(TestStorage):
+
+    def setUp(self):
+        super().setUp()
+        Config.STORAGE_BACKEND = 'sqlite'
+
+    def recargar(self):
+        """Vacía la memoria y vuelve a cargar desde una conexión nueva"""
+        storage.cerrar_almacenamiento()
+        for datos in storage.DOMINIOS.values():
+            datos.clear()
+        storage.cargar_datos()
+
+    def test_migra_columnas_real(self):
+        """Prueba que una base con alturas y horas REAL se rehace sin afinidad
+        conservando sus filas"""
+        ruta = os.path.join(self.tmp.name, Config.SQLITE_FILE)
+        conexion = sqlite3.connect(ruta)
+        conexion.executescript(
+            SQLiteBackend.ESQUEMA.replace('altura BLOB', 'altura REAL').replace('horas BLOB', 'horas REAL')
+        )
+        conexion.execute("INSERT INTO horas VALUES (1, '2024-01-15', 2.5, NULL)")
+        conexion.execute("INSERT INTO meta VALUES ('inicializado', '1')")
+        conexion.commit()
+        conexion.close()
+
+        storage.cargar_datos()
+        self.assertEqual(storage.horas_por_usuario, {1: [{"fecha": "2024-01-15", "horas": 2.5}]})
+        storage.horas_por_usuario[1].append({"fecha": "2024-01-16", "horas": 3})
+        storage.marcar_modificado('horas', 1)
+        storage.guardar_datos()
+        self.recargar()
+        self.assertIs(type(storage.horas_por_usuario[1][1]["horas"]), int)
+        tipos = {fila[1]: fila[2] for fila in
+                 storage.obtener_backend().conexion().execute("PRAGMA table_info(horas)")}
+        self.assertEqual(tipos["horas"], "BLOB")
+
+    # Las pruebas de archivos JSON y del diario no aplican a este backend
+    test_guardar_solo_dominios_modificados = None
+    test_diario_anexa_y_se_reproduce = None
+    test_diario_sincroniza = None
+    test_diario_descarta_linea_incompleta = None
+    test_compactacion_al_superar_limite = None
+    test_diario_por_planta = None
+    test_guardado_diferido_agrupa_escrituras = None
+    test_guardado_diferido_reintenta_si_falla = None
+    test_guardado_diferido_solo_serializa_modificados = None
+    test_compactacion_sin_copiar_en_memoria = None
+    test_archivo_corrupto_usa_generacion_anterior = None
+    test_escritura_fallida_conserva_archivo = None
+    test_cache_de_inicio = None
+    test_cache_de_inicio_desactualizada = None
+    test_cache_de_inicio_con_permisos_inseguros = None
+
+    def test_importa_json_la_primera_vez(self):
+        """Prueba que una base nueva importa los archivos JSON existentes"""
+        with open(os.path.join(self.tmp.name, 'plantas.json'), 'w', encoding='utf-8') as f:
+            json.dump({"5": ["Rosa", "Cactus"]}, f)
+
+        storage.cargar_datos()
+        self.recargar()
+        self.assertEqual(storage.plantas_por_usuario, {5: ["Rosa", "Cactus"]})
+
+    def test_guardar_por_planta(self):
+        """Prueba que un cambio por planta no toca las demás plantas"""
+        storage.cargar_datos()
+        storage.medidas_por_usuario[1] = {
+            "Rosa": [{"altura": 10.0, "fecha": "2024-01-15", "timestamp": "2024-01-15T10:00:00"}],
+            "Cactus": [4.5]
+        }
+        storage.guardar_datos('medidas')
+        storage.medidas_por_usuario[1]["Rosa"].append(
+            {"altura": 12.0, "fecha": "2024-01-20", "timestamp": "2024-01-20T10:00:00"}
+        )
+        storage.marcar_modificado('medidas', 1, 'Rosa')
+        storage.guardar_datos()
+
+        self.recargar()
+        self.assertEqual([m["altura"] for m in storage.medidas_por_usuario[1]["Rosa"]], [10.0, 12.0])
+        self.assertEqual(storage.medidas_por_usuario[1]["Cactus"], [4.5])
+
+    def sentencias(self):
+        """Registra las sentencias SQL que ejecuta el backend"""
+        ejecutadas = []
+        storage.obtener_backend().conexion().set_trace_callback(ejecutadas.append)
+        return ejecutadas
+
+    def test_operaciones_fila_a_fila(self):
+        """Prueba que anexar o borrar una medida y cambiar un riego escriben
+        solo sus filas, y que varias operaciones agrupadas se aplican en orden"""
+        from src.utils import repository
+        storage.cargar_datos()
+        for altura in (1, 2, 3):
+            repository.agregar_medida(1, "Rosa", altura)
+        repository.configurar_riego(1, "Rosa", 3)
+
+        ejecutadas = self.sentencias()
+        repository.agregar_medida(1, "Rosa", 4)
+        repository.actualizar_riego(1, "Rosa", frecuencia=5)
+        self.assertFalse(any(s.lstrip().upper().startswith("DELETE") for s in ejecutadas))
+        self.assertEqual(sum(s.lstrip().upper().startswith("INSERT INTO MEDIDAS") for s in ejecutadas), 1)
+
+        # Varias operaciones en una misma ventana de guardado
+        with patch.object(storage, 'guardar_datos'), patch.object(repository, 'guardar_datos'):
+            repository.eliminar_medida(1, "Rosa", 0)
+            repository.agregar_medida(1, "Rosa", 5)
+            repository.eliminar_medida(1, "Rosa", 1)
+        del ejecutadas[:]
+        storage.guardar_datos()
+        self.assertEqual(sum(s.lstrip().upper().startswith("DELETE") for s in ejecutadas), 2)
+
+        self.recargar()
+        self.assertEqual([m["altura"] for m in storage.medidas_por_usuario[1]["Rosa"]], [2, 4, 5])
+        self.assertEqual(storage.riego_por_usuario[1]["Rosa"]["frecuencia"], 5)
+
+    def test_cambio_sin_operacion_reescribe_la_planta(self):
+        """Prueba que un cambio no descrito anula las operaciones de la planta"""
+        storage.cargar_datos()
+        storage.medidas_por_usuario[1] = {"Rosa": [{"altura": 1.0}]}
+        storage.marcar_modificado('medidas', 1, 'Rosa', ('anexar', 0, {"altura": 1.0}))
+        storage.medidas_por_usuario[1]["Rosa"][0] = {"altura": 9.0}
+        storage.marcar_modificado('medidas', 1, 'Rosa')
+        storage.guardar_datos()
+        self.recargar()
+        self.assertEqual(storage.medidas_por_usuario[1]["Rosa"][0]["altura"], 9.0)
+
+    def test_borrar_usuario(self):
+        """Prueba que borrar un usuario elimina sus filas"""
+        storage.cargar_datos()
+        storage.horas_por_usuario[1] = [{"fecha": "2024-01-15", "horas": 2.0}]
+        storage.horas_por_usuario[2] = [{"fecha": "2024-01-16", "horas": 3.0}]
+        storage.guardar_datos('horas')
+        del storage.horas_por_usuario[1]
+        storage.marcar_modificado('horas', 1)
+        storage.guardar_datos()
+
+        self.recargar()
+        self.assertEqual(storage.horas_por_usuario, {2: [{"fecha": "2024-01-16", "horas": 3.0}]})
+
+class TestShardedBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir_original = Config.DATA_DIR
+        self.cache_original = Config.SHARD_CACHE_USERS
+        Config.DATA_DIR = self.tmp.name
+        Config.SHARD_CACHE_USERS = 2
+        self.backend = ShardedBackend()
+        self.datos = {
+            dominio: VistaDominio(dominio, lambda: self.backend.cache)
+            for dominio in storage.DOMINIOS
+        }
+
+    def tearDown(self):
+        Config.DATA_DIR = self.data_dir_original
+        Config.SHARD_CACHE_USERS = self.cache_original
+        self.tmp.cleanup()
+
+    def guardar(self, pendientes):
+        lote = self.backend.capturar(self.datos, pendientes)
+        self.backend.confirmar(lote, self.backend.guardar(lote, pendientes))
+
+    def test_migra_archivos_por_dominio(self):
+        """Prueba que la primera carga reparte los JSON en archivos por usuario"""
+        with open(os.path.join(self.tmp.name, 'plantas.json'), 'w', encoding='utf-8') as f:
+            json.dump({"1": ["Rosa"], "2": ["Cactus"]}, f)
+        with open(os.path.join(self.tmp.name, 'horas.json'), 'w', encoding='utf-8') as f:
+            json.dump({"1": [{"fecha": "2024-01-15", "horas": 2.0}]}, f)
+
+        self.backend.cargar(self.datos)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp.name, 'users'))), ['1.json', '2.json'])
+        # Nada se lee hasta el primer acceso
+        self.assertEqual(self.backend.cache.en_memoria(), 0)
+        self.assertEqual(self.datos['plantas'][2], ["Cactus"])
+        self.assertEqual(self.datos['horas'].get(1), [{"fecha": "2024-01-15", "horas": 2.0}])
+        self.assertNotIn(2, self.datos['horas'])
+
+    def test_desaloja_usuarios_frios(self):
+        """Prueba que la caché respeta su límite y recarga desde disco"""
+        self.backend.cargar(self.datos)
+        for user_id in range(1, 5):
+            self.datos['plantas'][user_id] = [f"Planta {user_id}"]
+            self.backend.marcar(user_id)
+        # Los usuarios con cambios sin guardar no se desalojan
+        self.assertEqual(self.backend.cache.en_memoria(), 4)
+
+        self.guardar({'plantas': {1, 2, 3, 4}})
+        self.assertEqual(self.backend.cache.en_memoria(), 2)
+        self.assertEqual(self.datos['plantas'][1], ["Planta 1"])
+        self.assertEqual(sorted(self.datos['plantas']), [1, 2, 3, 4])
+
+    def test_guardar_solo_usuarios_modificados(self):
+        """Prueba que un guardado solo escribe el archivo del usuario"""
+        self.backend.cargar(self.datos)
+        self.datos['plantas'][1] = ["Rosa"]
+        self.datos['plantas'][2] = ["Cactus"]
+        self.backend.marcar(1)
+        self.backend.marcar(2)
+        self.guardar({'plantas': {1, 2}})
+        ruta_2 = os.path.join(self.tmp.name, 'users', '2.json')
+        modificado_antes = os.stat(ruta_2).st_mtime_ns
+
+        self.datos['medidas'][1] = {"Rosa": [10.0]}
+        self.backend.marcar(1)
+        self.guardar({'medidas': {(1, 'Rosa')}})
+        self.assertEqual(os.stat(ruta_2).st_mtime_ns, modificado_antes)
+        with open(os.path.join(self.tmp.name, 'users', '1.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"plantas": ["Rosa"], "medidas": {"Rosa": [10.0]}})
+
+    def test_usuario_sin_datos_borra_su_archivo(self):
+        """Prueba que borrar todos los datos elimina el archivo del usuario"""
+        self.backend.cargar(self.datos)
+        self.datos['plantas'][1] = ["Rosa"]
+        self.backend.marcar(1)
+        self.guardar({'plantas': {1}})
+        del self.datos['plantas'][1]
+        self.backend.marcar(1)
+        self.guardar({'plantas': {1}})
+        self.assertEqual(os.listdir(os.path.join(self.tmp.name, 'users')), [])
+
+    def guardar_riegos(self):
+        """Guarda riegos de dos usuarios y una planta sin riego de un tercero"""
+        self.backend.cargar(self.datos)
+        self.datos['riego'][1] = {"Rosa": {"frecuencia": 3, "ultimo_riego": "2024-01-10"}}
+        self.backend.marcar(1)
+        self.datos['riego'][2] = {"Cactus": {"frecuencia": 10, "ultimo_riego": "2024-01-01"}}
+        self.backend.marcar(2)
+        self.datos['plantas'][3] = ["Helecho"]
+        self.backend.marcar(3)
+        self.guardar({'riego': {1, 2}, 'plantas': {3}})
+
+    def test_resumen_de_riegos(self):
+        """Prueba que los riegos se listan desde el resumen sin cargar usuarios"""
+        self.guardar_riegos()
+        backend = ShardedBackend()
+        backend.cargar(self.datos)
+        self.assertEqual(sorted(backend.riegos(self.datos)), [
+            (1, {"Rosa": {"frecuencia": 3, "ultimo_riego": "2024-01-10"}}),
+            (2, {"Cactus": {"frecuencia": 10, "ultimo_riego": "2024-01-01"}}),
+        ])
+        self.assertEqual(backend.cache.en_memoria(), 0)
+
+        # Los cambios sin guardar se ven y, al guardar, pasan al resumen
+        del self.datos['riego'][1]
+        self.backend.marcar(1)
+        self.assertEqual([u for u, _ in self.backend.riegos(self.datos)], [2])
+        self.guardar({'riego': {1}})
+        backend.cargar(self.datos)
+        self.assertEqual([u for u, _ in backend.riegos(self.datos)], [2])
+
+        # Sin resumen (archivos de una versión anterior) se rehace una vez
+        os.remove(self.backend.ruta_resumen)
+        backend.cargar(self.datos)
+        self.assertEqual([u for u, _ in backend.riegos(self.datos)], [2])
+        self.assertTrue(os.path.exists(self.backend.ruta_resumen))
+
+    def test_arranque_no_carga_usuarios(self):
+        """Prueba que arrancar el bot monta la agenda de riegos y el índice
+        de vencimientos sin leer ningún archivo de usuario"""
+        from src import bot
+        self.guardar_riegos()
+        leidos = []
+
+        def leer(ruta):
+            leidos.append(ruta)
+            return leer_json_con_respaldo(ruta)
+
+        leer_json_con_respaldo = shards.leer_json_con_respaldo
+        agenda, indice = AgendaRiegos(), IndiceVencimientos()
+        vistas = {
+            dominio: VistaDominio(dominio, lambda: storage.obtener_backend().cache)
+            for dominio in storage.DOMINIOS
+        }
+        self.addCleanup(storage.cerrar_almacenamiento)
+        with patch.dict(storage.DOMINIOS, vistas), \
+                patch.object(storage, '_backend', None), \
+                patch.object(Config, 'STORAGE_BACKEND', 'shards'), \
+                patch.object(Config, 'LEADER_ELECTION', False), \
+                patch.object(shards, 'leer_json_con_respaldo', side_effect=leer), \
+                patch.object(bot, 'agenda_riegos', agenda), \
+                patch.object(bot, 'indice_vencimientos', indice), \
+                patch.object(bot, 'ApplicationBuilder'), \
+                patch.object(bot, 'setup_logger', return_value=logging.getLogger('plantas_bot')), \
+                patch.object(Config, 'BOT_TOKEN', 'token'):
+            bot.run_bot()
+            self.assertEqual(storage.obtener_backend().cache.en_memoria(), 0)
+            storage.cerrar_almacenamiento()
+
+        self.assertEqual(leidos, [self.backend.ruta_resumen])
+        self.assertEqual(len(agenda), 2)
+        self.assertEqual(indice.entre(date(2024, 1, 1), date(2024, 1, 31)), [
+            (date(2024, 1, 11), 2, "Cactus"),
+            (date(2024, 1, 13), 1, "Rosa"),
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -147,6 +147,17 @@ class TestValidators(unittest.TestCase):
                 with self.assertRaises(ValidationError):
                     CommandValidator.validate_frequency(freq_str)
     
+    def test_validate_upcoming_days_args(self):
+        """Prueba los días del comando de próximos riegos"""
+        self.assertEqual(CommandValidator.validate_upcoming_days_args([]), 7)
+        self.assertEqual(CommandValidator.validate_upcoming_days_args(["0"]), 0)
+        self.assertEqual(CommandValidator.validate_upcoming_days_args(["30"]), 30)
+        
+        for args in (["-1"], ["366"], ["abc"], ["1", "2"]):
+            with self.subTest(args=args):
+                with self.assertRaises(ValidationError):
+                    CommandValidator.validate_upcoming_days_args(args)
+    
     def test_validate_user_has_plants(self):
         """Prueba validación de plantas del usuario"""
         # Usuario con plantas válidas